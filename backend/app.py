@@ -3,6 +3,15 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routes import auth, holdings, portfolio, fyers
 from db import client
+from services.nav_store import nav_history_store
+from services.amfi_service import amfi_service
+from services.close_store import close_price_store
+from services.bhavcopy_service import bhavcopy_service
+from services.security_master import security_master
+from services.scheme_search import scheme_search_index
+from services.nav_service import nav_service
+from services.scheduler import scheduler, DailyTimesTrigger, parse_times
+from services.market_feed import market_feed
 from core.logging import setup_logging, get_logger
 from core.config import settings
 
@@ -36,9 +45,60 @@ def startup_db_client():
     try:
         client.admin.command('ismaster')
         logger.info("Connected to MongoDB successfully!")
+        nav_history_store.ensure_indexes()
+        amfi_service.ensure_indexes()
+        close_price_store.ensure_indexes()
     except Exception as e:
         logger.critical(f"MongoDB Startup Error: {e}")
 
+@app.on_event("startup")
+def warm_security_master():
+    security_master.warm_start()
+
+@app.on_event("startup")
+def warm_scheme_search():
+    scheme_search_index.warm_start()
+
+@app.on_event("startup")
+async def start_scheduler():
+    if not settings.SCHEDULER_ENABLED:
+        logger.info("Background scheduler disabled")
+        return
+    scheduler.add_job(
+        "nav_prewarm",
+        nav_service.run_scheduled_prewarm,
+        DailyTimesTrigger(parse_times(settings.NAV_PREWARM_TIMES)),
+    )
+    scheduler.add_job(
+        "symbol_repair",
+        nav_service.run_symbol_repair,
+        DailyTimesTrigger(parse_times(settings.SYMBOL_REPAIR_TIMES)),
+    )
+    scheduler.add_job(
+        "security_master",
+        security_master.run_scheduled_refresh,
+        DailyTimesTrigger(parse_times(settings.SECURITY_MASTER_TIMES)),
+    )
+    scheduler.add_job(
+        "bhavcopy",
+        bhavcopy_service.run_scheduled_ingest,
+        DailyTimesTrigger(parse_times(settings.BHAVCOPY_TIMES)),
+    )
+    scheduler.start()
+
+@app.on_event("startup")
+def start_market_feed():
+    if settings.MARKET_FEED_ENABLED:
+        market_feed.start()
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
+
+@app.on_event("shutdown")
+def stop_market_feed():
+    market_feed.stop()
+
 # Routes
 app.include_router(auth.router)
 app.include_router(holdings.router)
@@ -26,4 +26,56 @@ class Settings:
         else "http://localhost:8000/api/fyers/callback"
     )
 
+    # NAV History Cache (in-process, shared across users)
+    NAV_CACHE_MAX_BYTES: int = int(os.getenv("NAV_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Live quote table: seconds a fetched percent change is reused across funds and users
+    QUOTE_TTL_SECONDS: float = float(os.getenv("QUOTE_TTL_SECONDS", "5"))
+
+    # Streaming market data (Fyers data socket) feeding the quote table; needs a Fyers login
+    MARKET_FEED_ENABLED: bool = os.getenv("MARKET_FEED_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    # Fyers REST quotes: published API limits (per second / per minute) shared by all batches,
+    # and the timeout of a single 50-symbol batch
+    FYERS_RATE_PER_SECOND: float = float(os.getenv("FYERS_RATE_PER_SECOND", "10"))
+    FYERS_RATE_PER_MINUTE: float = float(os.getenv("FYERS_RATE_PER_MINUTE", "200"))
+    FYERS_QUOTE_TIMEOUT_SECONDS: float = float(os.getenv("FYERS_QUOTE_TIMEOUT_SECONDS", "5"))
+    # D-1 estimation: parallel Fyers daily-close fetches, and the overall time allowed before
+    # it settles for the coverage reached so far (late fetches still land in the close store)
+    HISTORICAL_FETCH_WORKERS: int = int(os.getenv("HISTORICAL_FETCH_WORKERS", "8"))
+    HISTORICAL_FETCH_DEADLINE_SECONDS: float = float(os.getenv("HISTORICAL_FETCH_DEADLINE_SECONDS", "8"))
+
+    # NSE quote fallback: request rate (token bucket), in-flight cap and per-batch latency budget
+    NSE_RATE_PER_SECOND: float = float(os.getenv("NSE_RATE_PER_SECOND", "6"))
+    NSE_RATE_BURST: float = float(os.getenv("NSE_RATE_BURST", "10"))
+    NSE_MAX_CONCURRENCY: int = int(os.getenv("NSE_MAX_CONCURRENCY", "5"))
+    NSE_FETCH_BUDGET_SECONDS: float = float(os.getenv("NSE_FETCH_BUDGET_SECONDS", "12"))
+    # Index snapshots fetched first in the NSE fallback (comma separated); per-symbol calls cover the rest
+    NSE_SNAPSHOT_INDICES: list[str] = [i.strip() for i in os.getenv("NSE_SNAPSHOT_INDICES", "NIFTY 500").split(",") if i.strip()]
+
+    # Dashboard SSE stream: minimum seconds between recomputes per connection, forced refresh
+    # when quotes have not moved (so they get re-fetched past their TTL), idle heartbeat
+    PORTFOLIO_STREAM_MIN_INTERVAL_SECONDS: float = float(os.getenv("PORTFOLIO_STREAM_MIN_INTERVAL_SECONDS", "2"))
+    PORTFOLIO_STREAM_REFRESH_SECONDS: float = float(os.getenv("PORTFOLIO_STREAM_REFRESH_SECONDS", "15"))
+    PORTFOLIO_STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("PORTFOLIO_STREAM_HEARTBEAT_SECONDS", "15"))
+    # Lifetime of the stream-scoped token sent in the EventSource query string (only needed to connect)
+    PORTFOLIO_STREAM_TOKEN_SECONDS: int = int(os.getenv("PORTFOLIO_STREAM_TOKEN_SECONDS", "60"))
+
+    # Background scheduler (disable on all but one worker when running several)
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+    # IST times (HH:MM, comma separated) at which held schemes' NAV histories are refreshed:
+    # just after the evening publish window closes and just before market open
+    NAV_PREWARM_TIMES: list[str] = os.getenv("NAV_PREWARM_TIMES", "00:05,09:05").split(",")
+    # IST times at which holdings' persisted FYERS symbols are filled in / re-resolved
+    SYMBOL_REPAIR_TIMES: list[str] = os.getenv("SYMBOL_REPAIR_TIMES", "08:30").split(",")
+    # IST times at which the day's NSE / BSE bhavcopies are loaded into the daily close store
+    BHAVCOPY_TIMES: list[str] = os.getenv("BHAVCOPY_TIMES", "19:00").split(",")
+    # IST times at which the security master (NSE EQUITY_L + FYERS NSE_CM / BSE_CM) is rebuilt
+    SECURITY_MASTER_TIMES: list[str] = os.getenv("SECURITY_MASTER_TIMES", "07:45").split(",")
+    # Gzipped JSON snapshot of the security master, loaded on startup instead of the downloads
+    SECURITY_MASTER_PATH: str = os.getenv(
+        "SECURITY_MASTER_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "security_master.json.gz"),
+    )
+
 settings = Settings()
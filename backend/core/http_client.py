@@ -0,0 +1,131 @@
+"""
+Shared HTTP client layer for all upstream calls.
+
+Every upstream host (mfapi, NSE, BSE, AMFI, FYERS public masters, Brevo) gets a named
+policy with its own keep-alive connection pool, default timeouts, retry/backoff
+rules and a concurrency cap. Callers use http_client.get/post with a plain URL;
+the policy is picked from the URL's host, so connections (and TLS sessions) are
+reused across requests instead of being re-established on every call.
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.common import BSE_HEADERS, NSE_HEADERS
+from core.logging import get_logger
+
+logger = get_logger("HttpClient")
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """Connection, timeout and retry policy for a group of upstream hosts."""
+    name: str
+    hosts: Tuple[str, ...] = ()
+    timeout: Tuple[float, float] = (3.05, 10)  # (connect, read) seconds
+    retries: int = 2
+    backoff_factor: float = 0.5
+    status_forcelist: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    retry_methods: Tuple[str, ...] = ("GET", "HEAD")
+    pool_maxsize: int = 10
+    max_concurrency: int = 10
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+DEFAULT_POLICY = HostPolicy(name="default")
+
+POLICIES = (
+    HostPolicy(name="mfapi", hosts=("api.mfapi.in",), timeout=(3.05, 10), retries=2, max_concurrency=8),
+    # NSE throttles aggressively; callers implement their own retry/backoff around it
+    HostPolicy(
+        name="nse",
+        hosts=("www.nseindia.com", "nseindia.com", "nsearchives.nseindia.com"),
+        timeout=(3.05, 10),
+        retries=0,
+        max_concurrency=5,
+        headers=NSE_HEADERS,
+    ),
+    HostPolicy(name="bse", hosts=("www.bseindia.com",), timeout=(5, 30), retries=2, max_concurrency=2, headers=BSE_HEADERS),
+    HostPolicy(name="amfi", hosts=("www.amfiindia.com", "portal.amfiindia.com"), timeout=(5, 60), retries=2, max_concurrency=2),
+    HostPolicy(name="fyers_public", hosts=("public.fyers.in",), timeout=(5, 30), retries=2, max_concurrency=2),
+    # POST is not in retry_methods, so sends are only retried on connection failures
+    HostPolicy(name="brevo", hosts=("api.brevo.com",), timeout=(5, 15), retries=1, max_concurrency=4),
+)
+
+
+class HttpClient:
+    """Per-host pooled requests sessions with timeouts, retries and concurrency limits."""
+
+    def __init__(self, policies=POLICIES, default_policy: HostPolicy = DEFAULT_POLICY):
+        self._policies = {p.name: p for p in policies}
+        self._policies.setdefault(default_policy.name, default_policy)
+        self._default = default_policy
+        self._by_host = {host: p for p in policies for host in p.hosts}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._semaphores = {name: threading.BoundedSemaphore(p.max_concurrency) for name, p in self._policies.items()}
+        self._lock = threading.Lock()
+
+    def policy_for(self, url: str) -> HostPolicy:
+        host = (urlsplit(url).hostname or "").lower()
+        return self._by_host.get(host, self._default)
+
+    def _build_session(self, policy: HostPolicy) -> requests.Session:
+        retry = Retry(
+            total=policy.retries,
+            connect=policy.retries,
+            read=policy.retries,
+            status=policy.retries,
+            backoff_factor=policy.backoff_factor,
+            status_forcelist=policy.status_forcelist,
+            allowed_methods=frozenset(policy.retry_methods),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=policy.pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if policy.headers:
+            session.headers.update(policy.headers)
+        return session
+
+    def session(self, name: str) -> requests.Session:
+        """Returns the shared session for a named policy (e.g. 'nse' keeps its cookies across calls)."""
+        policy = self._policies.get(name, self._default)
+        with self._lock:
+            if policy.name not in self._sessions:
+                self._sessions[policy.name] = self._build_session(policy)
+            return self._sessions[policy.name]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request through the host's pooled session.
+        The per-host concurrency cap covers sending the request and receiving headers;
+        bodies of stream=True responses are consumed outside it.
+        """
+        policy = self.policy_for(url)
+        kwargs.setdefault("timeout", policy.timeout)
+        session = self.session(policy.name)
+        with self._semaphores[policy.name]:
+            return session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Singleton instance
+http_client = HttpClient()
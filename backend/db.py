@@ -22,3 +22,8 @@ except (InvalidURI, ConfigurationError) as e:
 db = client[settings.MONGO_DB]
 holdings_collection = db["holdings"]
 users_collection = db["users"]
+nav_history_collection = db["nav_history"]
+nav_sync_state_collection = db["nav_sync_state"]
+amfi_navs_collection = db["amfi_navs"]
+daily_closes_collection = db["daily_closes"]
+close_sync_state_collection = db["close_sync_state"]
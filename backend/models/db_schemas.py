@@ -8,6 +8,8 @@ class HoldingItem(BaseModel):
     ISIN: str
     Name: str
     Symbol: str
+    # Exchange-qualified FYERS symbol resolved at upload (e.g. NSE:RELIANCE-EQ, BSE:SBICARD-A)
+    FyersSymbol: Optional[str] = None
     Weight: float = Field(..., gt=0)
 
 class SIPInstallment(BaseModel):
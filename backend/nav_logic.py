@@ -1,11 +1,11 @@
 from datetime import datetime, timedelta
 import pandas as pd
-import requests
 import csv
 import time
 from io import StringIO
 
 from db import get_holdings, save_holdings
+from core.http_client import http_client
 
 # ---------------- NSE SESSION SETUP ----------------
 NSE_HEADERS = {
@@ -15,8 +15,8 @@ NSE_HEADERS = {
     "Referer": "https://www.nseindia.com/"
 }
 
-session = requests.Session()
-session.headers.update(NSE_HEADERS)
+# Shared pooled NSE session (same one the services use)
+session = http_client.session("nse")
 
 # ---------------- NSE HELPERS ----------------
 
@@ -107,7 +107,7 @@ def get_latest_nav(scheme_code, limit=1):
     """
     try:
         url = f"https://api.mfapi.in/mf/{scheme_code}"
-        response = requests.get(url)
+        response = http_client.get(url)
         if response.status_code == 200:
             data = response.json()
             if data.get("status") == "SUCCESS":
@@ -135,7 +135,7 @@ def get_nav_at_date(scheme_code, target_date_str):
     """
     try:
         url = f"https://api.mfapi.in/mf/{scheme_code}"
-        response = requests.get(url)
+        response = http_client.get(url)
         if response.status_code == 200:
             data = response.json()
             if data.get("status") == "SUCCESS":
@@ -352,7 +352,7 @@ def search_scheme_code(query):
     """
     try:
         url = f"https://api.mfapi.in/mf/search?q={query}"
-        response = requests.get(url)
+        response = http_client.get(url)
         if response.status_code == 200:
             data = response.json()
             if data and len(data) > 0:
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 import os
@@ -35,7 +35,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def _user_from_token(token: str, purpose: str = None):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -44,7 +44,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        # Login tokens carry no purpose; scoped tokens are only accepted where that scope is expected
+        if username is None or payload.get("purpose") != purpose:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
@@ -54,6 +55,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    return _user_from_token(token)
+
+async def get_current_user_from_query(token: str = Query(...)):
+    """
+    For EventSource streams (browsers cannot set headers on them). Accepts only the short-lived
+    stream token from /portfolio/stream-token, never the login token, since URLs end up in logs.
+    """
+    return _user_from_token(token, purpose="portfolio_stream")
+
 @router.post("/forgot-password", response_model=dict)
 def forgot_password(request: ForgotPasswordRequest):
     """
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from services.holdings_service import holdings_service
 from services.nav_service import nav_service
 from services.cas_service import cas_service
+from services.market_feed import market_feed
 from services.auth_service import AuthService
 from routes.auth import get_current_user
 
@@ -17,6 +18,7 @@ def remove_fund(fund_id: str, current_user: dict = Depends(get_current_user)):
     user_id = str(current_user["_id"])
     success = holdings_service.delete_fund(fund_id, user_id)
     if success:
+        market_feed.request_resync()
         return {"message": f"Deleted fund {fund_id}"}
     return {"error": "Fund not found"}, 404
 
@@ -188,6 +190,7 @@ async def upload(
     analysis = None
         
     if save_result.get("id"):
+        market_feed.request_resync()
         analysis = nav_service.calculate_pnl(save_result["id"], user_id, amount_float, invested_date)
 
     return {
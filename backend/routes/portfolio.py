@@ -1,7 +1,12 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from models.schemas import PortfolioAnalysisRequest
+from core.config import settings
+from services.auth_service import auth_service
 from services.nav_service import nav_service
-from routes.auth import get_current_user
+from services.portfolio_stream import PortfolioStream
+from routes.auth import get_current_user, get_current_user_from_query
 
 router = APIRouter(tags=["Portfolio"])
 
@@ -17,3 +22,35 @@ async def analyze_portfolio(
         request.investment_amount, 
         request.investment_date
     )
+
+@router.get("/portfolio/summary")
+def portfolio_summary(current_user: dict = Depends(get_current_user)):
+    """Prices all of the user's funds in one request (shared NAV histories and live quotes)."""
+    user_id = str(current_user["_id"])
+    return nav_service.calculate_portfolio_summary(user_id)
+
+@router.post("/portfolio/stream-token")
+def portfolio_stream_token(current_user: dict = Depends(get_current_user)):
+    """Short-lived token for opening /portfolio/stream (EventSource can only pass it in the URL)."""
+    return {
+        "token": auth_service.create_stream_token(current_user["username"]),
+        "expires_in": settings.PORTFOLIO_STREAM_TOKEN_SECONDS,
+    }
+
+@router.get("/portfolio/stream")
+async def portfolio_stream(
+    fund_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user_from_query)
+):
+    """
+    Server-Sent Events: a snapshot of the user's funds (or one fund), then throttled deltas
+    whenever live quotes move. Authenticated with ?token= (a stream token from /portfolio/stream-token)
+    since EventSource cannot send headers.
+    """
+    user_id = str(current_user["_id"])
+    stream = PortfolioStream(user_id, fund_id=fund_id)
+    return StreamingResponse(
+        stream.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
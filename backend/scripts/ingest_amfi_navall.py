@@ -0,0 +1,24 @@
+"""
+AMFI NAVAll Ingestion Script
+============================
+Downloads AMFI's daily NAVAll file (or reads a local copy) and upserts the
+latest NAV of every scheme into the 'amfi_navs' collection.
+
+Usage:
+    python scripts/ingest_amfi_navall.py                 # download from AMFI
+    python scripts/ingest_amfi_navall.py NAVAll.txt      # local file
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.amfi_service import amfi_service
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else None
+    amfi_service.ensure_indexes()
+    summary = amfi_service.ingest_navall(source)
+    print(f"✅ Ingested {summary['schemes']} schemes (latest NAV date: {summary['latest_date']})")
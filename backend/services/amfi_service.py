@@ -0,0 +1,184 @@
+"""
+AMFI Service - Bulk ingestion of AMFI's daily NAVAll file.
+
+NAVAll.txt lists the latest official NAV of every scheme in one download.
+It is stream-parsed line by line and upserted into the 'amfi_navs' collection
+(one document per scheme code), so today's official NAV for every fund held by
+every user is available locally without a per-scheme mfapi call.
+
+File layout (semicolon separated, with section header lines in between):
+    Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date
+    Open Ended Schemes(Equity Scheme - Large Cap Fund)
+    <Fund House Name>
+    119551;INF209KA12Z1;INF209KA13Z9;<Scheme Name>;105.3894;16-Oct-2026
+"""
+from datetime import datetime, date
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from db import amfi_navs_collection
+from utils.common import AMFI_NAVALL_URL
+from core.logging import get_logger
+from core.http_client import http_client
+
+logger = get_logger("AmfiService")
+
+_SCHEME_CATEGORY_PREFIXES = ("Open Ended Schemes", "Close Ended Schemes", "Interval Fund Schemes")
+_UPSERT_BATCH_SIZE = 1000
+
+
+def _clean_isin(value: str) -> Optional[str]:
+    value = (value or "").strip().upper()
+    return value if len(value) == 12 else None
+
+
+def parse_navall(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream-parses NAVAll lines. Yields one dict per scheme row:
+    {scheme_code, scheme_name, nav, date, isin_growth, isin_reinvestment, fund_house, category}
+    Rows without a numeric NAV (e.g. 'N.A.') or a parseable date are skipped.
+    """
+    category = None
+    fund_house = None
+    for raw in lines:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", errors="ignore")
+        line = raw.strip()
+        if not line:
+            continue
+
+        parts = line.split(";")
+        if len(parts) < 6:
+            # Section header: scheme category or fund house name
+            if line.startswith(_SCHEME_CATEGORY_PREFIXES):
+                category = line
+            else:
+                fund_house = line
+            continue
+
+        scheme_code = parts[0].strip()
+        if not scheme_code.isdigit():
+            continue  # Column header row
+
+        try:
+            nav = float(parts[4].strip())
+            nav_date = datetime.strptime(parts[5].strip(), "%d-%b-%Y").date()
+        except ValueError:
+            continue
+        if nav <= 0:
+            continue
+
+        yield {
+            "scheme_code": scheme_code,
+            "scheme_name": parts[3].strip(),
+            "nav": nav,
+            "date": nav_date,
+            "isin_growth": _clean_isin(parts[1]),
+            "isin_reinvestment": _clean_isin(parts[2]),
+            "fund_house": fund_house,
+            "category": category,
+        }
+
+
+class AmfiService:
+    """Ingests NAVAll and serves the latest official NAV per scheme from Mongo."""
+
+    def __init__(self, collection=None):
+        self.collection = collection if collection is not None else amfi_navs_collection
+
+    def ensure_indexes(self):
+        try:
+            self.collection.create_index([("scheme_code", ASCENDING)], unique=True, name="scheme_code")
+        except Exception as e:
+            logger.error(f"Failed to create AMFI NAV indexes: {e}")
+
+    def _iter_source_lines(self, source: Optional[str]):
+        """Yields lines from a local file path, or streams them from AMFI when source is None/URL."""
+        if source and not source.startswith(("http://", "https://")):
+            with open(source, "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    yield line
+            return
+
+        with http_client.get(source or AMFI_NAVALL_URL, stream=True) as r:
+            r.raise_for_status()
+            for line in r.iter_lines(decode_unicode=True):
+                if line:
+                    yield line
+
+    def iter_navall(self, source: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Parsed NAVAll rows from a local file path, or streamed from AMFI."""
+        return parse_navall(self._iter_source_lines(source))
+
+    def ingest_navall(self, source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Downloads (or reads) NAVAll and upserts the latest NAV of every scheme in one pass.
+        Older rows never overwrite a newer stored NAV.
+        Returns a summary: {"schemes": n, "latest_date": "DD-MM-YYYY" | None}
+        """
+        started = datetime.utcnow()
+        ops: List[UpdateOne] = []
+        count = 0
+        latest: Optional[date] = None
+
+        try:
+            for row in self.iter_navall(source):
+                row_dt = datetime.combine(row["date"], datetime.min.time())
+                doc = {**row, "date": row_dt, "updated_at": started}
+                ops.append(UpdateOne(
+                    {"scheme_code": row["scheme_code"], "date": {"$not": {"$gt": row_dt}}},
+                    {"$set": doc},
+                    upsert=True,
+                ))
+                count += 1
+                if latest is None or row["date"] > latest:
+                    latest = row["date"]
+                if len(ops) >= _UPSERT_BATCH_SIZE:
+                    self._flush(ops)
+                    ops = []
+            if ops:
+                self._flush(ops)
+        except Exception as e:
+            logger.error(f"NAVAll ingestion failed after {count} schemes: {e}")
+            raise
+
+        duration = (datetime.utcnow() - started).total_seconds()
+        logger.info(f"NAVAll ingested: {count} schemes (latest {latest}) in {duration:.2f}s")
+        return {"schemes": count, "latest_date": latest.strftime("%d-%m-%Y") if latest else None}
+
+    def _flush(self, ops: List[UpdateOne]):
+        try:
+            self.collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate-key errors here mean a newer NAV is already stored (the date filter
+            # did not match, so the upsert tried to insert) - safe to ignore.
+            other = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+            if other:
+                raise
+
+    def list_schemes(self) -> List[Tuple[str, str]]:
+        """(scheme_code, scheme_name) of every scheme stored by the last NAVAll ingestion."""
+        try:
+            cursor = self.collection.find({}, {"_id": 0, "scheme_code": 1, "scheme_name": 1})
+            return [(doc["scheme_code"], doc["scheme_name"]) for doc in cursor if doc.get("scheme_name")]
+        except Exception as e:
+            logger.warning(f"Failed to list AMFI schemes: {e}")
+            return []
+
+    def get_latest_nav(self, scheme_code) -> Optional[Dict[str, Any]]:
+        """Returns {"nav": float, "date": "DD-MM-YYYY"} from the last NAVAll ingestion, or None."""
+        if not scheme_code:
+            return None
+        try:
+            doc = self.collection.find_one({"scheme_code": str(scheme_code)}, {"_id": 0, "nav": 1, "date": 1})
+            if doc and doc.get("date"):
+                return {"nav": float(doc["nav"]), "date": doc["date"].strftime("%d-%m-%Y")}
+        except Exception as e:
+            logger.debug(f"AMFI NAV lookup failed for {scheme_code}: {e}")
+        return None
+
+
+# Singleton instance
+amfi_service = AmfiService()
@@ -107,6 +107,17 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
         return encoded_jwt
 
+    @staticmethod
+    def create_stream_token(username: str) -> str:
+        """Generate a short-lived JWT that only opens the portfolio stream (it travels in a URL)."""
+        expire = datetime.utcnow() + timedelta(seconds=settings.PORTFOLIO_STREAM_TOKEN_SECONDS)
+        to_encode = {
+            "sub": username,
+            "purpose": "portfolio_stream",
+            "exp": expire
+        }
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
     @staticmethod
     def reset_password(token: str, new_password: str) -> bool:
         """Validate reset token and update user password."""
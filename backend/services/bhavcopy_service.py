@@ -0,0 +1,182 @@
+"""
+Bhavcopy Service - Bulk ingestion of the exchanges' end-of-day bhavcopies.
+
+NSE and BSE each publish one UDiFF CSV per trading day with the close and the
+previous close of every listed security. A file is stream-parsed in one pass
+into the daily close store, keyed by the FYERS symbol of each row, so D-1
+estimates for every fund have closes locally without per-symbol history calls.
+
+UDiFF layout (comma separated, header row first; only these columns are used):
+    TradDt,...,ISIN,TckrSymb,SctySrs,...,ClsPric,...,PrvsClsgPric,...
+    2026-10-14,...,INE467B01029,TCS,EQ,...,4105.5,...,4051.2,...
+"""
+import csv
+import io
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from core.logging import get_logger
+from core.http_client import http_client
+from services.close_store import ClosePriceStore, close_price_store
+from utils.common import BSE_BHAVCOPY_URL, NSE_BHAVCOPY_URL
+from utils.date_utils import get_current_ist_time, is_trading_day
+
+logger = get_logger("BhavcopyService")
+
+BHAVCOPY_URLS = {"NSE": NSE_BHAVCOPY_URL, "BSE": BSE_BHAVCOPY_URL}
+
+# A failed download (usually: not published yet) is retried on demand after this long
+_RETRY_AFTER_SECONDS = 30 * 60
+
+
+def _price(value: str) -> Optional[float]:
+    try:
+        price = float((value or "").strip())
+    except ValueError:
+        return None
+    return price if price > 0 else None
+
+
+def parse_bhavcopy(lines: Iterable[str], exchange: str = "NSE") -> Iterator[Dict[str, Any]]:
+    """
+    Stream-parses UDiFF bhavcopy lines. Yields one dict per security:
+    {symbol ("NSE:TCS-EQ"), date, close, prev_close, isin}
+    Rows without a symbol, series, trade date or positive close are skipped.
+    """
+    exchange = exchange.upper()
+    for row in csv.DictReader(line.decode("utf-8", errors="ignore") if isinstance(line, bytes) else line for line in lines):
+        ticker = (row.get("TckrSymb") or "").strip().upper()
+        series = (row.get("SctySrs") or "").strip().upper()
+        close = _price(row.get("ClsPric"))
+        if not ticker or not series or close is None:
+            continue
+        try:
+            trade_date = datetime.strptime((row.get("TradDt") or "").strip(), "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        yield {
+            "symbol": f"{exchange}:{ticker}-{series}",
+            "date": trade_date,
+            "close": close,
+            "prev_close": _price(row.get("PrvsClsgPric")),
+            "isin": (row.get("ISIN") or "").strip().upper() or None,
+        }
+
+
+class BhavcopyService:
+    """Loads NSE / BSE bhavcopies into the daily close store."""
+
+    def __init__(self, store: ClosePriceStore = None):
+        self.store = store if store is not None else close_price_store
+        # (exchange, date) -> monotonic time of the last attempt, None once ingested
+        self._attempts: Dict[Tuple[str, date], Optional[float]] = {}
+        self._lock = threading.Lock()
+        # On-demand ingests run here, so a request only waits as long as its own budget
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bhavcopy")
+        self._inflight: Dict[date, Future] = {}
+
+    def _iter_source_lines(self, source: str) -> Iterator[str]:
+        """Yields CSV lines from a local path or URL; zipped files are read from their first member."""
+        if source.startswith(("http://", "https://")):
+            with http_client.get(source) as r:
+                r.raise_for_status()
+                f = io.BytesIO(r.content)
+        else:
+            f = open(source, "rb")
+
+        with f:
+            if zipfile.is_zipfile(f):
+                with zipfile.ZipFile(f) as zf, zf.open(zf.namelist()[0]) as member:
+                    yield from io.TextIOWrapper(member, encoding="utf-8", errors="ignore", newline="")
+            else:
+                f.seek(0)
+                yield from io.TextIOWrapper(f, encoding="utf-8", errors="ignore", newline="")
+
+    def ingest(self, trade_date: date, exchange: str = "NSE", source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Downloads (or reads) one exchange's bhavcopy and upserts every close in one pass.
+        Ingested symbols are marked synced through the file's date, so the close store
+        does not ask Fyers for them.
+        Returns a summary: {"exchange", "rows", "date": "YYYY-MM-DD" | None}
+        """
+        exchange = exchange.upper()
+        source = source or BHAVCOPY_URLS[exchange].format(date=trade_date.strftime("%Y%m%d"))
+        started = time.perf_counter()
+        symbols = []
+        latest: Optional[date] = None
+
+        def rows():
+            nonlocal latest
+            for row in parse_bhavcopy(self._iter_source_lines(source), exchange):
+                symbols.append(row["symbol"])
+                if latest is None or row["date"] > latest:
+                    latest = row["date"]
+                yield row
+
+        written = self.store.upsert_closes(rows(), source=f"bhavcopy_{exchange.lower()}")
+        if latest is not None:
+            self.store.mark_checked(symbols, latest)
+
+        duration = time.perf_counter() - started
+        logger.info(f"{exchange} bhavcopy for {latest or trade_date} ingested: {written} rows in {duration:.2f}s")
+        return {"exchange": exchange, "rows": written, "date": latest.isoformat() if latest else None}
+
+    def ensure_ingested(self, trade_date: date, exchanges: Iterable[str] = ("NSE", "BSE")) -> int:
+        """
+        Ingests each exchange's bhavcopy for trade_date unless this process already did.
+        Failures are retried no sooner than _RETRY_AFTER_SECONDS. Returns rows written.
+        """
+        written = 0
+        for exchange in exchanges:
+            key = (exchange.upper(), trade_date)
+            with self._lock:
+                if key in self._attempts:
+                    last = self._attempts[key]
+                    if last is None or time.monotonic() - last < _RETRY_AFTER_SECONDS:
+                        continue
+                self._attempts[key] = time.monotonic()
+            try:
+                written += self.ingest(trade_date, exchange)["rows"]
+                with self._lock:
+                    self._attempts[key] = None
+            except Exception as e:
+                logger.warning(f"{key[0]} bhavcopy for {trade_date} unavailable: {e}")
+        return written
+
+    def ensure_ingested_within(self, trade_date: date, timeout: float) -> int:
+        """
+        ensure_ingested on a background thread, waiting at most timeout seconds.
+        A download still running at the timeout keeps going (later requests find its
+        rows in the store) and 0 is returned. Concurrent callers share one ingest.
+        """
+        with self._lock:
+            future = self._inflight.get(trade_date)
+            if future is None:
+                future = self._inflight[trade_date] = self._executor.submit(self.ensure_ingested, trade_date)
+                future.add_done_callback(lambda _: self._forget_inflight(trade_date))
+        try:
+            return future.result(timeout=max(0.0, timeout))
+        except FuturesTimeout:
+            logger.info(f"Bhavcopy ingest for {trade_date} still running after {timeout:.1f}s; continuing in background")
+        except Exception as e:
+            logger.warning(f"Bhavcopy ingest for {trade_date} failed: {e}")
+        return 0
+
+    def _forget_inflight(self, trade_date: date):
+        with self._lock:
+            self._inflight.pop(trade_date, None)
+
+    def run_scheduled_ingest(self) -> int:
+        """Scheduler job: ingest today's bhavcopies after the exchanges publish them."""
+        today = get_current_ist_time()
+        if not is_trading_day(today):
+            return 0
+        return self.ensure_ingested(today.date())
+
+
+# Singleton instance
+bhavcopy_service = BhavcopyService()
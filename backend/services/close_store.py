@@ -0,0 +1,219 @@
+"""
+Close Price Store - Persistent daily closes per exchange-qualified symbol.
+
+Rows live in the 'daily_closes' collection (one document per symbol/date,
+optionally carrying the exchange's previous close). Each symbol is filled once
+with a short backfill and then extended incrementally; per-symbol bookkeeping
+(the date it was last checked through) lives in 'close_sync_state' so holidays
+and suspended symbols are not refetched. Every fund and request shares the
+same rows, so a D-1 estimate is two closes read from Mongo per holding.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+
+from db import daily_closes_collection, close_sync_state_collection
+from services.quote_table import qualify_symbol
+from core.logging import get_logger
+from utils.date_utils import get_current_ist_time
+
+logger = get_logger("ClosePriceStore")
+
+# First fill of a symbol covers this many calendar days before the requested date
+BACKFILL_DAYS = 30
+
+# Closes older than this before the target date are not used as the previous close
+_PREV_CLOSE_LOOKBACK_DAYS = 10
+
+_UPSERT_BATCH_SIZE = 1000
+
+
+def _as_datetime(d: date) -> datetime:
+    return datetime.combine(d, datetime.min.time())
+
+
+def _as_date(d) -> date:
+    return d.date() if isinstance(d, datetime) else d
+
+
+class ClosePriceStore:
+    """Mongo-backed daily closes keyed by (symbol, date)."""
+
+    def __init__(self, collection=None, state_collection=None):
+        self.collection = collection if collection is not None else daily_closes_collection
+        self.state_collection = state_collection if state_collection is not None else close_sync_state_collection
+
+    def ensure_indexes(self):
+        """Creates the (symbol, date) compound index used by point and range reads."""
+        try:
+            self.collection.create_index(
+                [("symbol", ASCENDING), ("date", ASCENDING)],
+                unique=True,
+                name="symbol_date",
+            )
+            self.state_collection.create_index([("symbol", ASCENDING)], unique=True, name="symbol")
+        except Exception as e:
+            logger.error(f"Failed to create daily close indexes: {e}")
+
+    def upsert_closes(self, rows: Iterable[dict], source: str = None) -> int:
+        """
+        Stores rows {"symbol", "date", "close", optional "prev_close"} (symbols in any form).
+        Returns the number of rows written.
+        """
+        written = 0
+        ops: List[UpdateOne] = []
+        for row in rows:
+            try:
+                close = float(row["close"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if close <= 0:
+                continue
+            symbol = qualify_symbol(row["symbol"])
+            row_dt = _as_datetime(_as_date(row["date"]))
+            doc = {"symbol": symbol, "date": row_dt, "close": close, "source": source}
+            if row.get("prev_close"):
+                doc["prev_close"] = float(row["prev_close"])
+            ops.append(UpdateOne({"symbol": symbol, "date": row_dt}, {"$set": doc}, upsert=True))
+            if len(ops) >= _UPSERT_BATCH_SIZE:
+                self.collection.bulk_write(ops, ordered=False)
+                written += len(ops)
+                ops = []
+        if ops:
+            self.collection.bulk_write(ops, ordered=False)
+            written += len(ops)
+        return written
+
+    def get_checked_through(self, symbols: Iterable[str]) -> Dict[str, date]:
+        """Date each symbol was last synced through (symbols never synced are absent)."""
+        keys = {qualify_symbol(s): s for s in symbols}
+        result = {}
+        for doc in self.state_collection.find({"symbol": {"$in": list(keys)}}, {"_id": 0, "symbol": 1, "checked_through": 1}):
+            if doc.get("checked_through") and doc["symbol"] in keys:
+                result[keys[doc["symbol"]]] = doc["checked_through"].date()
+        return result
+
+    def mark_checked(self, symbols: Iterable[str], through: date):
+        ops = [
+            UpdateOne(
+                {"symbol": qualify_symbol(s)},
+                {"$max": {"checked_through": _as_datetime(through)}, "$set": {"synced_at": datetime.utcnow()}},
+                upsert=True,
+            )
+            for s in symbols
+        ]
+        if ops:
+            self.state_collection.bulk_write(ops, ordered=False)
+
+    def pending_sync(self, symbols: Iterable[str], through: date) -> List[Tuple[str, date]]:
+        """(symbol, from_date) for every symbol not yet synced through the given date."""
+        symbols = list(dict.fromkeys(symbols))
+        checked = self.get_checked_through(symbols)
+        pending = []
+        for sym in symbols:
+            last = checked.get(sym)
+            if last is not None and last >= through:
+                continue
+            # Long-unsynced symbols only need the backfill window, not the whole gap
+            start = through - timedelta(days=BACKFILL_DAYS)
+            if last is not None:
+                start = max(start, last + timedelta(days=1))
+            pending.append((sym, start))
+        return pending
+
+    def sync(
+        self,
+        symbols: Iterable[str],
+        through: date,
+        fetch_closes: Callable[[str, date, date], Optional[List[dict]]],
+        deadline: Optional[float] = None,
+        max_workers: int = 1,
+    ) -> int:
+        """
+        Extends every symbol not yet synced through `through` with
+        fetch_closes(symbol, from_date, to_date) -> [{"date", "close"}] (None on failure,
+        which leaves the symbol to be retried). A symbol is marked checked through
+        `through` once that day has ended, else only through its latest returned candle. Symbols are fetched on up to max_workers
+        threads; after `deadline` seconds the call returns with whatever has been stored
+        (fetches already in flight still store their rows, queued ones are dropped).
+        Returns rows written before returning.
+        """
+        pending = self.pending_sync(symbols, through)
+        if not pending:
+            return 0
+        today = get_current_ist_time().date()
+
+        def fill(sym: str, start: date) -> int:
+            rows = fetch_closes(sym, start, through)
+            if rows is None:
+                return 0
+            written = self.upsert_closes(({"symbol": sym, **row} for row in rows), source="fyers")
+            # A day that has ended has its candle if it traded (no candle = holiday / suspension);
+            # for today, only the candles actually returned are final
+            if through < today:
+                checked = through
+            else:
+                checked = max((_as_date(row["date"]) for row in rows), default=None)
+            if checked is not None:
+                self.mark_checked([sym], checked)
+            return written
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending))), thread_name_prefix="close-sync")
+        futures = [executor.submit(fill, sym, start) for sym, start in pending]
+        written = 0
+        done = 0
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                done += 1
+                try:
+                    written += future.result()
+                except Exception as e:
+                    logger.debug(f"Daily close sync failed: {e}")
+        except FuturesTimeout:
+            logger.warning(f"Daily close sync hit its {deadline}s deadline with {done}/{len(pending)} symbols done")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return written
+
+    def pct_changes_on(self, symbols: Iterable[str], target: date) -> Dict[str, float]:
+        """
+        Percent change of each symbol on `target` (symbols as passed in), from the target
+        close and its stored previous close, or else the latest earlier stored close.
+        Symbols without a close on `target` are omitted.
+        """
+        keys = {}
+        for s in symbols:
+            if s:
+                keys.setdefault(qualify_symbol(s), []).append(s)
+        if not keys:
+            return {}
+
+        query = {
+            "symbol": {"$in": list(keys)},
+            "date": {
+                "$gte": _as_datetime(target - timedelta(days=_PREV_CLOSE_LOOKBACK_DAYS)),
+                "$lte": _as_datetime(target),
+            },
+        }
+        rows: Dict[str, List[dict]] = {}
+        for doc in self.collection.find(query, {"_id": 0, "symbol": 1, "date": 1, "close": 1, "prev_close": 1}).sort("date", ASCENDING):
+            rows.setdefault(doc["symbol"], []).append(doc)
+
+        result = {}
+        for key, docs in rows.items():
+            last = docs[-1]
+            if _as_date(last["date"]) != target:
+                continue
+            prev = last.get("prev_close") or (docs[-2]["close"] if len(docs) > 1 else None)
+            if not prev or prev <= 0:
+                continue
+            pct = (last["close"] - prev) / prev * 100
+            for original in keys[key]:
+                result[original] = pct
+        return result
+
+
+# Singleton instance
+close_price_store = ClosePriceStore()
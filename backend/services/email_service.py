@@ -4,8 +4,8 @@ For development: emails are logged to console when BREVO_API_KEY is not set
 For production: emails are sent via Brevo API
 """
 import os
-import requests
 from core.logging import get_logger
+from core.http_client import http_client
 
 logger = get_logger("EmailService")
 
@@ -42,7 +42,7 @@ class EmailService:
             return True
         
         try:
-            response = requests.post(
+            response = http_client.post(
                 "https://api.brevo.com/v3/smtp/email",
                 headers={
                     "api-key": self.api_key,
@@ -4,16 +4,30 @@ Fyers API Service - Handles authentication and market data fetching
 import os
 import json
 import time
-from datetime import datetime, timedelta
+import asyncio
+from datetime import date, datetime, timedelta
 from typing import Optional, Dict, List, Any
 from pathlib import Path
 
 from fyers_apiv3 import fyersModel
 from core.config import settings
 from core.logging import get_logger
+from services.quote_table import qualify_symbol
+from utils.async_bridge import get_background_loop, run_sync
+from utils.date_utils import IST
+from utils.rate_limit import TokenBucket
 
 logger = get_logger("FyersService")
 
+# Symbols per quotes request (Fyers maximum)
+QUOTE_BATCH_SIZE = 50
+
+# Shared across every quote and daily-close request: Fyers' per-second and per-minute API limits
+_QUOTE_LIMITS = (
+    TokenBucket(settings.FYERS_RATE_PER_SECOND),
+    TokenBucket(settings.FYERS_RATE_PER_MINUTE / 60.0, settings.FYERS_RATE_PER_MINUTE),
+)
+
 # Token storage path
 TOKEN_FILE = Path(__file__).parent.parent / ".fyers_token.json"
 
@@ -25,6 +39,7 @@ class FyersService:
     """
     _instance = None
     _fyers: Optional[fyersModel.FyersModel] = None
+    _async_fyers: Optional[fyersModel.FyersModel] = None
     _access_token: Optional[str] = None
     _token_expiry: Optional[datetime] = None
 
@@ -77,6 +92,24 @@ class FyersService:
                 is_async=False,
                 log_path=""
             )
+        self._reset_async_model()
+
+    def _reset_async_model(self):
+        """Drops the async model so the next request uses the current token; its aiohttp session is closed on the background loop."""
+        old, self._async_fyers = self._async_fyers, None
+        if old is not None:
+            asyncio.run_coroutine_threadsafe(old.service.close(), get_background_loop())
+
+    def _get_async_model(self) -> Optional[fyersModel.FyersModel]:
+        """Async Fyers model for concurrent quote batches (created lazily, used only on the background loop)."""
+        if self._async_fyers is None and self._access_token:
+            self._async_fyers = fyersModel.FyersModel(
+                client_id=self.app_id,
+                token=self._access_token,
+                is_async=True,
+                log_path=""
+            )
+        return self._async_fyers
 
     def get_auth_url(self) -> str:
         """
@@ -139,6 +172,12 @@ class FyersService:
             return False
         return datetime.now() < self._token_expiry
 
+    def get_data_socket_token(self) -> Optional[str]:
+        """Access token in the 'APP_ID:TOKEN' form the market data socket expects (None if not authenticated)."""
+        if not self.is_authenticated():
+            return None
+        return f"{self.app_id}:{self._access_token}"
+
     def validate_token_live(self) -> bool:
         """
         Perform a lightweight API call to verify the token is actually valid.
@@ -165,6 +204,7 @@ class FyersService:
         self._access_token = None
         self._token_expiry = None
         self._fyers = None
+        self._reset_async_model()
         try:
             if TOKEN_FILE.exists():
                 TOKEN_FILE.unlink()
@@ -188,34 +228,75 @@ class FyersService:
             return symbol  # Already formatted
         return f"{exchange}:{symbol}-EQ"
 
+    async def _fetch_quote_batch(self, model, batch: List[str], index: int) -> Dict[str, Optional[float]]:
+        """One rate-limited quotes request. The caller (the quote table's get_or_fetch) stores the results."""
+        for bucket in _QUOTE_LIMITS:
+            await bucket.acquire()
+        start = time.monotonic()
+        quotes: Dict[str, Optional[float]] = {}
+        try:
+            response = await asyncio.wait_for(
+                model.quotes({"symbols": ",".join(batch)}), settings.FYERS_QUOTE_TIMEOUT_SECONDS
+            )
+            if response.get("s") == "ok" and response.get("d"):
+                for quote in response["d"]:
+                    v = quote.get("v", {})
+                    sym = quote.get("n")
+                    pct = v.get("chp")
+                    if sym:
+                        quotes[sym] = float(pct) if pct is not None else None
+            else:
+                logger.debug(f"Fyers quotes batch {index} failed: {response}")
+        except Exception as e:
+            logger.debug(f"Fyers quotes batch {index} error: {e}")
+
+        latency_ms = (time.monotonic() - start) * 1000
+        logger.info(f"Fyers quotes batch {index}: {len(quotes)}/{len(batch)} symbols in {latency_ms:.0f}ms")
+        return quotes
+
+    async def fetch_quotes_pct_change_async(
+        self, formatted_symbols: List[str], timeout: float = None
+    ) -> Dict[str, Optional[float]]:
+        """
+        Sends every 50-symbol batch concurrently under the shared rate limits; returns the merged quotes.
+        Batches still running when timeout passes are cancelled, the ones that finished are kept.
+        """
+        model = self._get_async_model()
+        if model is None or not formatted_symbols:
+            return {}
+        batches = [formatted_symbols[i:i + QUOTE_BATCH_SIZE] for i in range(0, len(formatted_symbols), QUOTE_BATCH_SIZE)]
+        tasks = [asyncio.ensure_future(self._fetch_quote_batch(model, b, i)) for i, b in enumerate(batches)]
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Fyers quotes: {len(pending)}/{len(tasks)} batches timed out")
+        merged: Dict[str, Optional[float]] = {}
+        for task in done:
+            merged.update(task.result())
+        return merged
+
     def _get_pct_change_for_formatted_symbols(self, formatted_symbols: List[str]) -> Dict[str, Optional[float]]:
         """Fetch pct change for already-formatted FYERS symbols (e.g., 'BSE:SBICARD-A').
 
+        Batches go out concurrently on the async Fyers client.
         Returns dict keyed by the formatted symbol string.
         """
         result: Dict[str, Optional[float]] = {}
         if not self.is_authenticated() or not formatted_symbols:
             return result
 
+        symbols = list(dict.fromkeys(formatted_symbols))
+        batches = -(-len(symbols) // QUOTE_BATCH_SIZE)
+        # Worst case every batch waits its turn in the per-second limiter, then times out
+        timeout = batches / settings.FYERS_RATE_PER_SECOND + settings.FYERS_QUOTE_TIMEOUT_SECONDS + 1
+        start = time.monotonic()
         try:
-            batch_size = 50
-            for i in range(0, len(formatted_symbols), batch_size):
-                batch = formatted_symbols[i:i + batch_size]
-                symbols_str = ",".join(batch)
-                response = self._fyers.quotes({"symbols": symbols_str})
-                if response.get("s") == "ok" and response.get("d"):
-                    for quote in response["d"]:
-                        v = quote.get("v", {})
-                        sym = quote.get("n")
-                        pct = v.get("chp")
-                        if sym:
-                            result[sym] = float(pct) if pct is not None else None
-
-                if i + batch_size < len(formatted_symbols):
-                    time.sleep(0.1)
+            # The coroutine returns partial results at timeout; the outer bound only guards a stuck loop
+            result = run_sync(self.fetch_quotes_pct_change_async(symbols, timeout=timeout), timeout=timeout + 1)
         except Exception as e:
             logger.debug(f"Formatted quotes error: {e}")
-
+        logger.info(f"Fyers quotes: {len(result)}/{len(symbols)} symbols in {batches} batches, {time.monotonic() - start:.2f}s")
         return result
 
     def get_quotes(self, symbols: List[str]) -> Dict[str, Any]:
@@ -267,51 +348,17 @@ class FyersService:
 
     def get_quote_pct_change(self, symbol: str) -> Optional[float]:
         """
-        Get the percent change for a single symbol.
-        Tries NSE first, then BSE as fallback.
+        Get the percent change for a single symbol with one quotes request.
+        Plain symbols are sent as their NSE listing (qualify_symbol); BSE-only stocks
+        arrive already qualified through the holding's persisted FyersSymbol.
         Returns float (e.g., 1.25 for +1.25%) or None.
         """
-        # If caller already provided a full FYERS symbol (e.g., BSE:SBICARD-A), use it directly.
-        if ":" in (symbol or ""):
-            if not self.is_authenticated():
-                return None
-            try:
-                response = self._fyers.quotes({"symbols": symbol})
-                if response.get("s") == "ok" and response.get("d"):
-                    for quote in response["d"]:
-                        v = quote.get("v", {})
-                        pct = v.get("chp")
-                        if pct is not None:
-                            return float(pct)
-            except Exception as e:
-                logger.debug(f"Quote fetch failed for formatted symbol {symbol}: {e}")
+        if not self.is_authenticated() or not symbol:
             return None
 
-        plain_sym = symbol.upper().replace(".NS", "").replace(".BO", "").replace("-EQ", "")
-        
-        # Try NSE first
-        nse_result = self._get_quote_for_exchange(plain_sym, "NSE")
-        if nse_result is not None:
-            return nse_result
-        
-        # Fallback to BSE
-        bse_result = self._get_quote_for_exchange(plain_sym, "BSE")
-        if bse_result is not None:
-            logger.debug(f"Found {plain_sym} on BSE (not on NSE)")
-            return bse_result
-        
-        return None
-
-    def _get_quote_for_exchange(self, symbol: str, exchange: str) -> Optional[float]:
-        """Helper to get quote from a specific exchange."""
-        if not self.is_authenticated():
-            return None
-        
+        formatted = qualify_symbol(symbol)
         try:
-            formatted = self.format_symbol(symbol, exchange)
-            data = {"symbols": formatted}
-            response = self._fyers.quotes(data)
-            
+            response = self._fyers.quotes({"symbols": formatted})
             if response.get("s") == "ok" and response.get("d"):
                 for quote in response["d"]:
                     v = quote.get("v", {})
@@ -319,8 +366,7 @@ class FyersService:
                     if pct is not None:
                         return float(pct)
         except Exception as e:
-            logger.debug(f"Quote fetch failed for {symbol} on {exchange}: {e}")
-        
+            logger.debug(f"Quote fetch failed for {formatted}: {e}")
         return None
 
     def get_historical_data(
@@ -387,125 +433,48 @@ class FyersService:
             logger.error(f"Fyers history error for {symbol}: {e}")
             return None
 
-    def get_historical_pct_change(self, symbol: str, target_date: datetime) -> Optional[float]:
+    def get_daily_closes(self, symbol: str, from_date: date, to_date: date) -> Optional[List[Dict]]:
         """
-        Calculate percent change for a specific historical date.
-        Tries NSE first, then BSE as fallback.
-        
-        Returns float or None.
+        Daily closes [{"date", "close"}] between two dates (inclusive), dated by the IST session.
+        Returns [] when the range has no candles (holidays, suspension) and None on failure.
         """
-        # If caller already provided a full FYERS symbol, use it directly.
-        if ":" in (symbol or ""):
-            try:
-                from_date = target_date - timedelta(days=7)
-                to_date = target_date + timedelta(days=1)
-                candles = self.get_historical_data(symbol, "D", from_date, to_date)
-                if not candles or len(candles) < 2:
-                    return None
-
-                target_str = target_date.strftime("%Y-%m-%d")
-                target_candle = None
-                prev_candle = None
-                for i, c in enumerate(candles):
-                    if c["date"] == target_str:
-                        target_candle = c
-                        if i > 0:
-                            prev_candle = candles[i - 1]
-                        break
-
-                if target_candle and prev_candle and prev_candle["close"] > 0:
-                    return ((target_candle["close"] - prev_candle["close"]) / prev_candle["close"]) * 100
-            except Exception as e:
-                logger.debug(f"Historical pct change failed for formatted symbol {symbol}: {e}")
-            return None
-
-        plain_sym = symbol.upper().replace(".NS", "").replace(".BO", "").replace("-EQ", "")
-        
-        # Try NSE first
-        result = self._get_historical_pct_for_exchange(plain_sym, target_date, "NSE")
-        if result is not None:
-            return result
-        
-        # Fallback to BSE
-        result = self._get_historical_pct_for_exchange(plain_sym, target_date, "BSE")
-        if result is not None:
-            logger.debug(f"Found historical data for {plain_sym} on BSE")
-            return result
-        
-        return None
-
-    def _get_historical_pct_for_exchange(self, symbol: str, target_date: datetime, exchange: str) -> Optional[float]:
-        """Helper to get historical percent change from a specific exchange."""
-        try:
-            from_date = target_date - timedelta(days=7)
-            to_date = target_date + timedelta(days=1)
-            
-            candles = self._get_historical_data_for_exchange(symbol, "D", from_date, to_date, exchange)
-            if not candles or len(candles) < 2:
-                return None
-
-            target_str = target_date.strftime("%Y-%m-%d")
-            target_candle = None
-            prev_candle = None
-            
-            for i, c in enumerate(candles):
-                if c["date"] == target_str:
-                    target_candle = c
-                    if i > 0:
-                        prev_candle = candles[i - 1]
-                    break
-
-            if target_candle and prev_candle and prev_candle["close"] > 0:
-                pct = ((target_candle["close"] - prev_candle["close"]) / prev_candle["close"]) * 100
-                return pct
-        except Exception as e:
-            logger.debug(f"Historical pct change error for {symbol} on {exchange}: {e}")
-        
-        return None
-
-    def _get_historical_data_for_exchange(
-        self, symbol: str, resolution: str, from_date: datetime, to_date: datetime, exchange: str
-    ) -> Optional[List[Dict]]:
-        """Helper to get historical data from a specific exchange."""
         if not self.is_authenticated():
             return None
 
         try:
-            formatted_symbol = self.format_symbol(symbol, exchange)
-            
             data = {
-                "symbol": formatted_symbol,
-                "resolution": resolution,
-                "date_format": "0",  # 0 = epoch timestamps (int), 1 = YYYY-MM-DD strings
-                "range_from": int(from_date.timestamp()),
-                "range_to": int(to_date.timestamp()),
+                "symbol": self.format_symbol(symbol),
+                "resolution": "D",
+                "date_format": "1",  # range as YYYY-MM-DD; candles still carry epoch timestamps
+                "range_from": from_date.strftime("%Y-%m-%d"),
+                "range_to": to_date.strftime("%Y-%m-%d"),
                 "cont_flag": "1"
             }
-            
+            # Called from several sync threads at once; blocks until the shared limits allow it
+            for bucket in _QUOTE_LIMITS:
+                bucket.acquire_sync()
             response = self._fyers.history(data)
-            
-            if response.get("s") == "ok" and response.get("candles"):
-                candles = []
-                for c in response["candles"]:
-                    candles.append({
-                        "timestamp": c[0],
-                        "date": datetime.fromtimestamp(c[0]).strftime("%Y-%m-%d"),
-                        "open": c[1],
-                        "high": c[2],
-                        "low": c[3],
-                        "close": c[4],
-                        "volume": c[5]
-                    })
-                return candles
+            status = response.get("s")
+            if status == "no_data":
+                return []
+            if status != "ok":
+                logger.debug(f"Daily closes failed for {symbol}: {response}")
+                return None
+            return [
+                # [timestamp, open, high, low, close, volume]; server-local time would misdate sessions
+                {"date": datetime.fromtimestamp(c[0], IST).date(), "close": c[4]}
+                for c in response.get("candles") or []
+            ]
         except Exception as e:
-            logger.debug(f"History fetch error for {symbol} on {exchange}: {e}")
-        
-        return None
+            logger.debug(f"Daily closes error for {symbol}: {e}")
+            return None
 
     def get_bulk_quotes_pct_change(self, symbols: List[str]) -> Dict[str, Optional[float]]:
         """
         Get percent changes for multiple symbols.
-        Tries NSE first for all, then BSE for any that failed.
+        Exchange-qualified symbols (the FyersSymbol persisted at upload) are sent as-is,
+        one request per batch. Plain symbols from older uploads try NSE first, then BSE
+        for any that failed, until the symbol repair job has qualified them.
         
         Returns dict: symbol -> pct_change (or None if failed)
         """
@@ -560,30 +529,11 @@ class FyersService:
         if not self.is_authenticated() or not symbols:
             return result
 
-        try:
-            # Fyers API limit is ~50 symbols per request
-            batch_size = 50
-            for i in range(0, len(symbols), batch_size):
-                batch = symbols[i:i + batch_size]
-                formatted = [self.format_symbol(s, exchange) for s in batch]
-                symbols_str = ",".join(formatted)
-                
-                response = self._fyers.quotes({"symbols": symbols_str})
-                
-                if response.get("s") == "ok" and response.get("d"):
-                    for quote in response["d"]:
-                        v = quote.get("v", {})
-                        # Extract symbol name without exchange prefix
-                        sym = quote.get("n", "").replace(f"{exchange}:", "").replace("-EQ", "")
-                        pct = v.get("chp")
-                        if pct is not None:
-                            result[sym] = float(pct)
-                
-                if i + batch_size < len(symbols):
-                    time.sleep(0.1)
-        except Exception as e:
-            logger.debug(f"Bulk quotes error on {exchange}: {e}")
-        
+        formatted = [self.format_symbol(s, exchange) for s in symbols]
+        for fsym, pct in self._get_pct_change_for_formatted_symbols(formatted).items():
+            if pct is not None:
+                # Extract symbol name without exchange prefix
+                result[fsym.replace(f"{exchange}:", "").replace("-EQ", "")] = pct
         return result
 
 
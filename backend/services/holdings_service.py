@@ -1,158 +1,171 @@
 import pandas as pd
 import csv
-import requests
 import os
-import re
+import threading
 import time
 from io import StringIO
 from bson import ObjectId
 from db import holdings_collection, users_collection
 from typing import List, Optional
-import difflib
 
 from datetime import datetime
-from utils.common import NSE_HEADERS, NSE_CSV_URL, FYERS_BSE_CM_URL
+from utils.common import NSE_CSV_URL, MFAPI_BASE_URL
 from utils.date_utils import format_date_for_api, parse_date_from_str, get_current_ist_time
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 from core.logging import get_logger
+from core.http_client import http_client
+from services.security_master import security_master
+from services.scheme_search import scheme_search_index, score_scheme_name
 
 logger = get_logger("HoldingsService")
 
 # Dev-only debug logging - set to True to enable
 DEBUG_HOLDINGS = os.getenv("DEBUG_HOLDINGS", "false").lower() == "true"
 
-session = requests.Session()
-session.headers.update(NSE_HEADERS)
+def load_fyers_bse_isin_map() -> dict:
+    """Mapping of ISIN -> FYERS BSE symbol (e.g., 'BSE:SBICARD-A') from the security master."""
+    return security_master.bse_symbols()
 
-_FYERS_BSE_ISIN_MAP = None  # type: Optional[dict]
-_FYERS_BSE_ISIN_MAP_LOADED_AT = 0.0
-_FYERS_BSE_ISIN_MAP_TTL_SECONDS = 24 * 60 * 60
-_ISIN_RE = re.compile(r"\b[A-Z0-9]{12}\b")
+def load_nse_csv():
+    """Downloads the NSE Equity Master List (CSV) rows. Lookups go through the security master, which caches them."""
+    url = NSE_CSV_URL
+    try:
+        r = http_client.get(url, timeout=(3.05, 20))
+        f = StringIO(r.text)
+        return list(csv.DictReader(f))
+    except Exception as e:
+        logger.error(f"Error downloading NSE CSV: {e}")
+        return []
+
+def build_nse_isin_index(rows) -> dict:
+    """ISIN -> (symbol, series) from NSE master rows; the header columns are detected once per table."""
+    if not rows:
+        return {}
+
+    headers = rows[0].keys()
+    isin_col = next((col for col in headers if "isin" in col.lower().replace(" ", "")), None)
+    symbol_col = next((col for col in headers if col.lower().strip() in ["symbol", "tradingsymbol", "sc_symbol"]), None)
+    series_col = next((col for col in headers if col.lower().strip() == "series"), None)
 
+    if not symbol_col: # Fallback
+         symbol_col = next((col for col in headers if "symbol" in col.lower()), None)
 
-def _extract_fyers_symbol(line: str, exchange_prefix: str) -> Optional[str]:
-    idx = line.find(f"{exchange_prefix}:")
-    if idx < 0:
-        return None
-    end = line.find(",", idx)
-    if end < 0:
-        end = len(line)
-    sym = line[idx:end].strip()
-    return sym or None
+    if not isin_col or not symbol_col:
+        return {}
 
+    index = {}
+    for row in rows:
+        isin = (row.get(isin_col) or "").strip().upper()
+        symbol = row.get(symbol_col)
+        if isin and symbol:
+            # First listing wins, as with the old top-to-bottom scan
+            index.setdefault(isin, (symbol, row.get(series_col) if series_col else None))
+    return index
 
-def load_fyers_bse_isin_map(force: bool = False) -> dict:
-    """Loads a mapping of ISIN -> FYERS BSE symbol (e.g., 'BSE:SBICARD-A').
 
-    Uses FYERS public BSE symbol master file and caches it in-memory.
+class NseIsinIndex:
     """
-    global _FYERS_BSE_ISIN_MAP, _FYERS_BSE_ISIN_MAP_LOADED_AT
+    The NSE equity master as an in-memory ISIN index, downloaded at most once per TTL.
 
-    now = time.time()
-    if (
-        not force
-        and _FYERS_BSE_ISIN_MAP is not None
-        and (now - _FYERS_BSE_ISIN_MAP_LOADED_AT) < _FYERS_BSE_ISIN_MAP_TTL_SECONDS
-    ):
-        return _FYERS_BSE_ISIN_MAP
+    A refresh builds a new dict and swaps it in whole, so concurrent lookups never see
+    a half-built index; only one thread downloads at a time. A failed download keeps
+    serving the previous index and is retried after retry_seconds.
+    """
 
-    mapping: dict = {}
-    try:
-        with requests.get(FYERS_BSE_CM_URL, stream=True, timeout=30) as r:
-            r.raise_for_status()
-            for raw in r.iter_lines(decode_unicode=True):
-                if not raw:
-                    continue
-                line = raw.strip()
-                if "BSE:" not in line:
-                    continue
+    def __init__(self, loader=None, ttl_seconds: float = 24 * 60 * 60, retry_seconds: float = 5 * 60):
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self._index: Optional[dict] = None
+        self._expires_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def get(self, force: bool = False) -> dict:
+        if not force and time.monotonic() < self._expires_at:
+            return self._index or {}
+
+        with self._refresh_lock:
+            # Another thread may have refreshed while this one waited
+            if not force and time.monotonic() < self._expires_at:
+                return self._index or {}
+            rows = self._loader() if self._loader else load_nse_csv()
+            index = build_nse_isin_index(rows)
+            if index:
+                self._index = index
+                self._expires_at = time.monotonic() + self.ttl_seconds
+                logger.info(f"NSE ISIN index loaded: {len(index)} listings")
+            else:
+                logger.warning("NSE equity master unavailable; keeping the previous ISIN index")
+                self._expires_at = time.monotonic() + self.retry_seconds
+            return self._index or {}
 
-                m = _ISIN_RE.search(line)
-                if not m:
-                    continue
-                isin = m.group(0).upper()
+    def clear(self):
+        with self._refresh_lock:
+            self._index = None
+            self._expires_at = 0.0
 
-                sym = _extract_fyers_symbol(line, "BSE")
-                if sym:
-                    mapping[isin] = sym
 
-        _FYERS_BSE_ISIN_MAP = mapping
-        _FYERS_BSE_ISIN_MAP_LOADED_AT = now
-        return mapping
-    except Exception as e:
-        logger.warning(f"Failed to load FYERS BSE symbol master: {e}")
-        _FYERS_BSE_ISIN_MAP = {}
-        _FYERS_BSE_ISIN_MAP_LOADED_AT = now
-        return _FYERS_BSE_ISIN_MAP
+nse_isin_index = NseIsinIndex()
 
-def load_nse_csv():
-    """Downloads and caches the NSE Equity Master List (CSV)."""
-    url = NSE_CSV_URL
-    try:
-        r = session.get(url, timeout=20)
-        f = StringIO(r.text)
-        return list(csv.DictReader(f))
-    except Exception as e:
-        logger.error(f"Error downloading NSE CSV: {e}")
-        return []
+def _find_nse_listing(isin, nse_table=None):
+    """
+    Resolves ISIN to its NSE (symbol, series) row values, or (None, None).
+    nse_table is an ISIN index (default: the security master's NSE listings) or raw master rows.
+    """
+    if not nse_table:
+        nse_table = security_master.nse_listings()
+    elif not isinstance(nse_table, dict):
+        nse_table = build_nse_isin_index(nse_table)
+    return nse_table.get((isin or "").strip().upper(), (None, None))
 
 def isin_to_symbol_nse(isin, nse_table=None):
     """Resolves ISIN to NSE Symbol."""
-    if not nse_table:
-        nse_table = load_nse_csv()
-    if not nse_table: return None
-    
-    headers = nse_table[0].keys()
-    isin_col = next((col for col in headers if "isin" in col.lower().replace(" ", "")), None)
-    symbol_col = next((col for col in headers if col.lower().strip() in ["symbol", "tradingsymbol", "sc_symbol"]), None)
-    
-    if not symbol_col: # Fallback
-         symbol_col = next((col for col in headers if "symbol" in col.lower()), None)
+    return _find_nse_listing(isin, nse_table)[0]
 
-    if not isin_col or not symbol_col: return None
+def nse_fyers_symbol(symbol, series=None):
+    """FYERS cash-market symbol for an NSE listing (RELIANCE, EQ -> NSE:RELIANCE-EQ)."""
+    series = (series or "").strip().upper() or "EQ"
+    return f"NSE:{symbol.strip().upper()}-{series}"
 
-    for row in nse_table:
-        if row.get(isin_col, "").strip() == isin:
-            return row.get(symbol_col)
-    return None
+def resolve_fyers_symbols(isin, nse_table=None, bse_isin_map=None):
+    """
+    Candidate exchange-qualified FYERS symbols for an ISIN, best first:
+    the NSE listing (with its series), then the FYERS BSE master entry.
+    Returns (plain NSE symbol or None, [candidates]).
+    """
+    candidates = []
+    ticker, series = _find_nse_listing(isin, nse_table)
+    if ticker:
+        candidates.append(nse_fyers_symbol(ticker, series))
+    bse_symbol = (bse_isin_map or {}).get(isin)
+    if bse_symbol:
+        candidates.append(bse_symbol)
+    return ticker, candidates
 
 def search_scheme_code(query):
     # DEPRECATED: Use get_scheme_candidates logic instead
     return None
 
 def get_scheme_candidates(query):
-    """Returns top matches with scores."""
+    """Returns top matches with scores, from the local scheme-name index (mfapi search only if it is empty)."""
+    candidates = scheme_search_index.search(query)
+    if candidates or len(scheme_search_index):
+        return candidates
+    return _search_mfapi_candidates(query)
+
+def _search_mfapi_candidates(query):
     try:
-        url = f"https://api.mfapi.in/mf/search?q={query}"
-        response = requests.get(url, timeout=5)
+        url = f"{MFAPI_BASE_URL}/search"
+        response = http_client.get(url, params={"q": query})
         if response.status_code == 200:
              data = response.json()
              if not data: return []
-             
-             # Scoring Logic
-             def get_score(item):
-                 name = item["schemeName"]
-                 # Base similarity
-                 ratio = difflib.SequenceMatcher(None, query.lower(), name.lower()).ratio()
-                 
-                 # Heuristics
-                 if "Direct" in name: ratio += 0.05
-                 if "Growth" in name: ratio += 0.05
-                 if "Regular" in name: ratio -= 0.05
-                 if "IDCW" in name or "Dividend" in name: ratio -= 0.05
-                 
-                 # Strict Penalty for 'Bonus' unless query has it
-                 if "Bonus" in name and "Bonus" not in query: ratio -= 0.2
-                 
-                 return ratio
-
-             # Calculate all scores
-             scored = []
-             for item in data:
-                 s = get_score(item)
-                 scored.append({"schemeCode": str(item["schemeCode"]), "schemeName": item["schemeName"], "score": s})
-             
+
+             scored = [
+                 {"schemeCode": str(item["schemeCode"]), "schemeName": item["schemeName"], "score": score_scheme_name(query, item["schemeName"])}
+                 for item in data
+             ]
              # Sort desc
              scored.sort(key=lambda x: x["score"], reverse=True)
              return scored[:5] # Return top 5
@@ -335,6 +348,146 @@ class HoldingsService:
         except:
             return None
 
+    @staticmethod
+    def get_user_holdings_docs(user_id):
+        """Loads every holdings document of a user in one query (used by the portfolio summary)."""
+        try:
+            docs = list(holdings_collection.find({"user_id": user_id}))
+        except Exception as e:
+            logger.error(f"Failed to load holdings for user {user_id}: {e}")
+            return []
+        for doc in docs:
+            doc["is_stale"] = HoldingsService._is_portfolio_stale(doc.get("created_at"))
+        return docs
+
+    @staticmethod
+    def get_all_scheme_codes():
+        """Distinct scheme codes held by any user (used to pre-warm NAV histories)."""
+        try:
+            return [str(code) for code in holdings_collection.distinct("scheme_code") if code]
+        except Exception as e:
+            logger.error(f"Failed to list held scheme codes: {e}")
+            return []
+
+    @staticmethod
+    def get_all_symbols():
+        """
+        Distinct quote symbols across every stored holdings document (market feed universe):
+        the persisted FyersSymbol where present, the plain Symbol for older uploads.
+        """
+        try:
+            symbols = {}
+            cursor = holdings_collection.find({}, {"holdings.Symbol": 1, "holdings.FyersSymbol": 1})
+            for doc in cursor:
+                for h in doc.get("holdings", []):
+                    sym = h.get("FyersSymbol") or h.get("Symbol")
+                    if sym:
+                        symbols[sym] = None
+            return list(symbols)
+        except Exception as e:
+            logger.error(f"Failed to list held symbols: {e}")
+            return []
+
+    @staticmethod
+    def repair_fyers_symbols(quote_probe=None):
+        """
+        Background repair of the persisted FyersSymbol of every holding.
+        Fills it for holdings uploaded before it existed and, when quote_probe
+        (FYERS symbols -> {symbol: pct or None}) is given, re-resolves symbols that no
+        longer quote (delisted / moved exchange). Probes are batched: one call for the
+        stored symbols, one for the replacement candidates. A probe that fails or prices
+        nothing is treated as unknown (an outage, not every listing dying), so that run
+        repairs only missing symbols.
+        Returns {"holdings": n, "repaired": n, "unresolved": [isins]}.
+        """
+        docs = list(holdings_collection.find({}, {"holdings": 1}))
+        # ISIN -> stored symbols across every holding (the same ISIN can sit in many funds)
+        stored_by_isin = {}
+        missing = set()
+        for doc in docs:
+            for h in doc.get("holdings", []):
+                isin = h.get("ISIN")
+                if not isin:
+                    continue
+                symbols = stored_by_isin.setdefault(isin, {})
+                if h.get("FyersSymbol"):
+                    symbols[h["FyersSymbol"]] = None
+                else:
+                    missing.add(isin)
+
+        def probe(symbols):
+            """symbol -> pct, or None when the probe failed or priced nothing."""
+            try:
+                quotes = quote_probe(symbols) or {}
+            except Exception as e:
+                logger.warning(f"FYERS symbol repair probe failed: {e}")
+                return None
+            if not any(pct is not None for pct in quotes.values()):
+                logger.warning(f"FYERS symbol repair probe priced none of {len(symbols)} symbols; skipping dead-symbol repair")
+                return None
+            return quotes
+
+        dead = set()
+        stored = list(dict.fromkeys(sym for symbols in stored_by_isin.values() for sym in symbols))
+        if quote_probe and stored:
+            quotes = probe(stored)
+            if quotes is not None:
+                dead = {sym for sym in stored if quotes.get(sym) is None}
+
+        needs_repair = [
+            isin for isin, symbols in stored_by_isin.items()
+            if isin in missing or any(sym in dead for sym in symbols)
+        ]
+        if not needs_repair:
+            return {"holdings": len(stored_by_isin), "repaired": 0, "unresolved": []}
+
+        # A symbol another holding already has (and that still quotes) is reused as-is
+        replacements = {}
+        to_resolve = []
+        for isin in needs_repair:
+            good = [sym for sym in stored_by_isin[isin] if sym not in dead]
+            if good:
+                replacements[isin] = good[0]
+            else:
+                to_resolve.append(isin)
+
+        if to_resolve:
+            nse_table = security_master.nse_listings()
+            bse_isin_map = load_fyers_bse_isin_map()
+            candidates = {}
+            for isin in to_resolve:
+                _, found = resolve_fyers_symbols(isin, nse_table, bse_isin_map)
+                candidates[isin] = [sym for sym in found if sym not in dead]
+
+            to_probe = list(dict.fromkeys(sym for found in candidates.values() for sym in found))
+            if quote_probe and to_probe:
+                quotes = probe(to_probe)
+                if quotes is not None:
+                    candidates = {isin: [sym for sym in found if quotes.get(sym) is not None] for isin, found in candidates.items()}
+
+            replacements.update({isin: found[0] for isin, found in candidates.items() if found})
+        unresolved = [isin for isin in needs_repair if isin not in replacements]
+
+        repaired = 0
+        for doc in docs:
+            updates = {}
+            match = {"_id": doc["_id"]}
+            for i, h in enumerate(doc.get("holdings", [])):
+                new_symbol = replacements.get(h.get("ISIN"))
+                current = h.get("FyersSymbol")
+                # Only holdings without a symbol or with a dead one are rewritten
+                if new_symbol and current != new_symbol and (not current or current in dead):
+                    updates[f"holdings.{i}.FyersSymbol"] = new_symbol
+                    # Positions come from the snapshot read above; a re-upload since then must not match
+                    match[f"holdings.{i}.ISIN"] = h["ISIN"]
+            if updates:
+                res = holdings_collection.update_one(match, {"$set": updates})
+                if res.matched_count:
+                    repaired += len(updates)
+
+        logger.info(f"FYERS symbol repair: {repaired} holdings updated, {len(dead)} dead symbols, {len(unresolved)} unresolved")
+        return {"holdings": len(stored_by_isin), "repaired": repaired, "unresolved": unresolved}
+
     @staticmethod
     def delete_fund(fund_id_str, user_id):
         try:
@@ -467,7 +620,7 @@ class HoldingsService:
         df["Weight"] = df["Weight"].apply(clean_weight)
 
         # 5. Resolve Tickers (NSE first, then FYERS BSE fallback)
-        nse_source = load_nse_csv()
+        nse_source = security_master.nse_listings()
         holdings_list = []
         unresolved = []
         zero_weight_skipped = []
@@ -484,9 +637,13 @@ class HoldingsService:
                 zero_weight_skipped.append(f"{name} ({isin})")
                 continue
             
-            ticker = isin_to_symbol_nse(isin, nse_table=nse_source)
+            ticker, series = _find_nse_listing(isin, nse_table=nse_source)
             if ticker:
-                holdings_list.append({"ISIN": isin, "Name": name, "Symbol": ticker, "Weight": weight})
+                # FyersSymbol records the exact listing so quotes never probe NSE then BSE
+                holdings_list.append({
+                    "ISIN": isin, "Name": name, "Symbol": ticker,
+                    "FyersSymbol": nse_fyers_symbol(ticker, series), "Weight": weight,
+                })
                 resolved_nse += 1
             else:
                 if bse_isin_map is None:
@@ -495,7 +652,7 @@ class HoldingsService:
                 bse_symbol = (bse_isin_map or {}).get(isin)
                 if bse_symbol:
                     # Store fully-qualified FYERS symbol so downstream quotes work (e.g., BSE:SBICARD-A)
-                    holdings_list.append({"ISIN": isin, "Name": name, "Symbol": bse_symbol, "Weight": weight})
+                    holdings_list.append({"ISIN": isin, "Name": name, "Symbol": bse_symbol, "FyersSymbol": bse_symbol, "Weight": weight})
                     resolved_bse += 1
                 else:
                     unresolved.append(f"{name} ({isin})")
@@ -728,6 +885,7 @@ class HoldingsService:
         """
         Updates the status of a specific SIP installment.
         If PAID, calculates units based on NAV and adds to future_sip_units.
+        Other PAID installments still pending NAV are reconciled in the same batch lookup.
         """
         try:
             doc = holdings_collection.find_one({"_id": ObjectId(fund_id), "user_id": user_id})
@@ -749,53 +907,14 @@ class HoldingsService:
                     updated = True
                     
                     if action == "PAID":
-                        # User confirmed payment - invested_amount will be updated below
-                        # Now check if NAV is available for unit allocation
-                        from services.nav_service import nav_service  # Local import to avoid circular dep
-                        from utils.date_utils import parse_date_from_str, get_current_ist_time
-                        
-                        # Get the next official NAV on or after the SIP date
-                        nav_res = nav_service.get_next_nav_after_date(scheme_code, date_str)
-                        
-                        if nav_res:
-                            nav = nav_res[0]
-                            nav_date_used = nav_res[1] if len(nav_res) > 1 else None
-                            
-                            # Check if this NAV is actually from the SIP date or later
-                            # (not from before, which would mean NAV API returned old data)
-                            try:
-                                sip_date = parse_date_from_str(date_str).date()
-                                used_date = parse_date_from_str(nav_date_used).date() if nav_date_used else None
-                                
-                                if used_date and used_date >= sip_date:
-                                    # NAV is available for this SIP date or later
-                                    # Calculate units - marked as ESTIMATED (T+1 settlement)
-                                    units = sip_amount / nav
-                                    inst["units"] = units
-                                    inst["nav"] = nav
-                                    inst["nav_date"] = nav_date_used
-                                    inst["allocation_status"] = "ESTIMATED"
-                                    inst["is_estimated"] = True
-                                else:
-                                    # NAV is from before SIP date - units pending
-                                    inst["units"] = None
-                                    inst["nav"] = None
-                                    inst["nav_date"] = None
-                                    inst["allocation_status"] = "PENDING_NAV"
-                                    inst["is_estimated"] = False
-                            except:
-                                # Date parsing failed - treat as pending
-                                inst["units"] = None
-                                inst["nav"] = None
-                                inst["allocation_status"] = "PENDING_NAV"
-                                inst["is_estimated"] = False
-                        else:
-                            # No NAV available at all - units pending
-                            inst["units"] = None
-                            inst["nav"] = None
-                            inst["nav_date"] = None
-                            inst["allocation_status"] = "PENDING_NAV"
-                            inst["is_estimated"] = False
+                        # User confirmed payment - invested_amount will be updated below.
+                        # Units are allocated below together with any other PAID installment
+                        # still waiting for its NAV (one history fetch for all of them).
+                        inst["units"] = None
+                        inst["nav"] = None
+                        inst["nav_date"] = None
+                        inst["allocation_status"] = "PENDING_NAV"
+                        inst["is_estimated"] = False
                             
                     elif action == "SKIPPED":
                         inst["units"] = None
@@ -808,6 +927,28 @@ class HoldingsService:
             if not updated:
                 return {"error": "Installment for date not found"}
             
+            # Allocate units for every PAID installment still pending NAV (including this one)
+            pending = [inst for inst in installments if inst["status"] == "PAID" and inst.get("units") is None]
+            if pending and scheme_code:
+                from services.nav_service import nav_service  # Local import to avoid circular dep
+                lookups = nav_service.get_navs_at_dates(scheme_code, [inst["date"] for inst in pending])
+                for inst, lookup in zip(pending, lookups):
+                    # Units use the first official NAV on or after the SIP date (next business
+                    # day if market was closed). No such NAV yet -> units stay pending.
+                    nav_res = lookup.get("on_or_after")
+                    if not nav_res:
+                        continue
+                    nav, nav_date_used = nav_res
+                    amount = sip_amount if inst["date"] == date_str else float(inst.get("amount") or sip_amount)
+                    if not nav or not amount:
+                        continue
+                    # Calculate units - marked as ESTIMATED (T+1 settlement)
+                    inst["units"] = amount / nav
+                    inst["nav"] = nav
+                    inst["nav_date"] = nav_date_used
+                    inst["allocation_status"] = "ESTIMATED"
+                    inst["is_estimated"] = True
+
             # Recalculate Totals
             # INVESTED AMOUNT: All PAID installments add to invested (money is gone)
             # UNITS: Only installments with allocated units (not None) count
@@ -0,0 +1,187 @@
+"""
+Incremental Estimator - Running weighted sums of live changes per fund.
+
+Each registered fund keeps sum(weight * pct) and the weight covered by priced
+symbols. A symbol -> funds inverted index means a quote update adjusts only
+the funds holding that symbol, in O(affected holdings), instead of re-summing
+every holding of every fund. The estimator listens to the quote table's streamed
+ticks only, so the streaming feed keeps thousands of funds current without
+recomputes; fetched (REST / snapshot) quotes expire on the table's TTL and are
+never summed here, where nothing would age them out.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Mapping, Optional, Tuple
+
+from core.logging import get_logger
+from services.quote_table import QuoteTable, qualify_symbol, quote_table
+from utils.portfolio_matrix import normalize_weights, quote_symbol
+
+logger = get_logger("IncrementalEstimator")
+
+# Covered weight below this is treated as nothing priced (float drift of add/subtract)
+_EPSILON = 1e-9
+
+
+class _FundState:
+    __slots__ = ("weights", "weighted", "covered", "priced", "updates")
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+        self.weighted = 0.0
+        self.covered = 0.0
+        self.priced = 0
+        self.updates = 0
+
+
+class IncrementalEstimator:
+    """
+    Thread-safe fund_key -> (weighted change, covered weight) with per-symbol updates.
+
+    Fund keys are opaque (the nav service uses (scheme_code, holdings_version)).
+    Each fund is re-summed from scratch every rebuild_every updates to bound float
+    drift, and the least recently read funds are dropped beyond max_funds.
+    """
+
+    def __init__(self, table: QuoteTable = None, max_funds: int = 5000, rebuild_every: int = 1000):
+        self._table = table if table is not None else quote_table
+        self.max_funds = max_funds
+        self.rebuild_every = rebuild_every
+        self._funds: "OrderedDict[Hashable, _FundState]" = OrderedDict()
+        self._index: Dict[str, Dict[Hashable, float]] = {}
+        self._pct: Dict[str, Optional[float]] = {}
+        self._seen_generation: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.symbol_updates = 0
+        self.fund_updates = 0
+        self._table.add_tick_listener(self.on_quotes)
+        self._table.add_release_listener(self.release)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._funds
+
+    def __len__(self) -> int:
+        return len(self._funds)
+
+    def register(self, key: Hashable, holdings: Iterable[Mapping]):
+        """Adds a fund (no-op if already registered), seeding it from the latest known quotes."""
+        with self._lock:
+            if key in self._funds:
+                self._funds.move_to_end(key)
+                return
+
+            valid = [h for h in holdings if h.get("Symbol") and (h.get("Weight", 0) or 0) > 0]
+            fractions = normalize_weights([float(h["Weight"]) for h in valid]).tolist() if valid else []
+            weights: Dict[str, float] = {}
+            for h, w in zip(valid, fractions):
+                sym = qualify_symbol(quote_symbol(h))
+                weights[sym] = weights.get(sym, 0.0) + w
+
+            for sym in weights:
+                if sym not in self._pct:
+                    # Ticks streamed before this symbol was of interest
+                    entry = self._table.get(sym)
+                    if entry is not None and entry.get("streamed"):
+                        self._apply(sym, entry["pct"])
+
+            state = _FundState(weights)
+            self._rebuild(state)
+            self._funds[key] = state
+            for sym, w in weights.items():
+                self._index.setdefault(sym, {})[key] = w
+
+            while len(self._funds) > self.max_funds:
+                self._drop(next(iter(self._funds)))
+
+    def unregister(self, key: Hashable):
+        with self._lock:
+            if key in self._funds:
+                self._drop(key)
+
+    def estimate(self, key: Hashable) -> Optional[Tuple[Optional[float], float]]:
+        """(weighted pct change or None if nothing priced, covered weight), or None if not registered."""
+        with self._lock:
+            state = self._funds.get(key)
+            if state is None:
+                return None
+            self._funds.move_to_end(key)
+            if state.covered <= _EPSILON:
+                return None, 0.0
+            return state.weighted / state.covered, state.covered
+
+    def on_quotes(self, updates: Mapping[str, Optional[float]], generation: int):
+        """Quote table tick listener: applies each symbol's new pct to the funds holding it."""
+        with self._lock:
+            for sym, pct in updates.items():
+                # Listeners run outside the table lock; never let an older store win
+                if generation < self._seen_generation.get(sym, -1):
+                    continue
+                self._seen_generation[sym] = generation
+                self._apply(sym, pct)
+
+    def release(self, symbols: Iterable[str]):
+        """
+        Quote table release listener: forgets the streamed pct of symbols no longer streamed,
+        so a later session never sums values left over from the previous one.
+        """
+        with self._lock:
+            for sym in symbols:
+                if sym in self._pct:
+                    self._apply(sym, None)
+                    del self._pct[sym]
+
+    def _apply(self, sym: str, new: Optional[float]):
+        old = self._pct.get(sym)
+        self._pct[sym] = new
+        if old == new:
+            return
+        self.symbol_updates += 1
+        for key, w in self._index.get(sym, {}).items():
+            state = self._funds[key]
+            if old is not None:
+                state.weighted -= w * old
+                state.covered -= w
+                state.priced -= 1
+            if new is not None:
+                state.weighted += w * new
+                state.covered += w
+                state.priced += 1
+            state.updates += 1
+            self.fund_updates += 1
+            if state.updates >= self.rebuild_every:
+                self._rebuild(state)
+
+    def _rebuild(self, state: _FundState):
+        state.weighted = 0.0
+        state.covered = 0.0
+        state.priced = 0
+        for sym, w in state.weights.items():
+            pct = self._pct.get(sym)
+            if pct is not None:
+                state.weighted += w * pct
+                state.covered += w
+                state.priced += 1
+        state.updates = 0
+
+    def _drop(self, key: Hashable):
+        state = self._funds.pop(key)
+        for sym in state.weights:
+            funds = self._index.get(sym)
+            if funds is not None:
+                funds.pop(key, None)
+                if not funds:
+                    del self._index[sym]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "funds": len(self._funds),
+                "symbols_indexed": len(self._index),
+                "symbol_updates": self.symbol_updates,
+                "fund_updates": self.fund_updates,
+            }
+
+
+# Singleton instance (listens to the shared quote table)
+incremental_estimator = IncrementalEstimator()
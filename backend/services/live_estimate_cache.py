@@ -0,0 +1,168 @@
+"""
+Live Estimate Cache - Per-scheme memo of the intraday (D0) portfolio change.
+
+Every user holding the same scheme with the same holdings file gets the same
+weighted change from the same quotes, so it is computed once per scheme and
+holdings version and reused until a quote of one of its own holdings changes
+(or the quote freshness window passes). A re-upload changes the holdings
+version, so it never reads an estimate made from the previous holdings.
+"""
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+from core.logging import get_logger
+from services.quote_table import QuoteTable, qualify_symbol, quote_table
+from utils.date_utils import get_current_ist_time
+from utils.portfolio_matrix import holdings_version, quote_symbol
+
+logger = get_logger("LiveEstimateCache")
+
+# Above this many entries, a put first drops every stale one
+_PRUNE_THRESHOLD = 2048
+
+
+def _quote_symbols(holdings: Sequence[Mapping]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(sym for sym in map(quote_symbol, holdings) if sym))
+
+
+class LiveEstimateCache:
+    """
+    Thread-safe (scheme_code, holdings_version) -> live change memo.
+
+    Entries are {"change_pct", "coverage", "computed_at"} (change_pct None when
+    coverage was insufficient) and are valid while none of the fund's own symbols
+    has been stored again in the quote table (quotes of other schemes do not
+    matter) and they are younger than its TTL. Concurrent misses for the same key
+    share one computation. A computed entry counts a symbol's quote as included only
+    if it was there before the computation or stored by the computation's own fetch;
+    a tick landing meanwhile leaves the entry stale.
+    """
+
+    def __init__(self, table: QuoteTable = None, max_age_seconds: float = None, clock: Callable[[], float] = time.monotonic):
+        self._table = table if table is not None else quote_table
+        self._max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._entries: Dict[Tuple[str, str], dict] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.computations = 0
+
+    @property
+    def max_age_seconds(self) -> float:
+        if self._max_age_seconds is not None:
+            return self._max_age_seconds
+        return self._table.ttl_seconds
+
+    def _key(self, scheme_code, holdings) -> Tuple[str, str]:
+        return str(scheme_code), holdings_version(holdings)
+
+    def _valid(self, entry: Optional[dict], now: float) -> bool:
+        return (
+            entry is not None
+            and now - entry["stored_at"] < self.max_age_seconds
+            and self._table.versions_of(entry["symbols"]) == entry["quote_versions"]
+        )
+
+    @staticmethod
+    def _public(entry: dict) -> dict:
+        return {k: entry[k] for k in ("change_pct", "coverage", "computed_at")}
+
+    def get(self, scheme_code, holdings) -> Optional[dict]:
+        """Returns the valid entry for a scheme's holdings, or None."""
+        key = self._key(scheme_code, holdings)
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._valid(entry, self._clock()):
+                self.hits += 1
+                return self._public(entry)
+            self.misses += 1
+            return None
+
+    def put(self, scheme_code, holdings, change_pct: Optional[float], coverage: float) -> dict:
+        """Stores an estimate made against the current quotes of the holdings' symbols."""
+        symbols = _quote_symbols(holdings)
+        return self._put(self._key(scheme_code, holdings), symbols, self._table.versions_of(symbols), change_pct, coverage)
+
+    def _put(self, key, symbols: Tuple[str, ...], quote_versions: Tuple[int, ...], change_pct: Optional[float], coverage: float) -> dict:
+        now = self._clock()
+        entry = {
+            "change_pct": change_pct,
+            "coverage": coverage,
+            "computed_at": get_current_ist_time().isoformat(),
+            "symbols": symbols,
+            "quote_versions": quote_versions,
+            "stored_at": now,
+        }
+        with self._lock:
+            if len(self._entries) > _PRUNE_THRESHOLD:
+                for stale in [k for k, e in self._entries.items() if not self._valid(e, now)]:
+                    self._entries.pop(stale, None)
+                    self._key_locks.pop(stale, None)
+            self._entries[key] = entry
+        return self._public(entry)
+
+    def get_or_compute(
+        self,
+        scheme_code,
+        holdings,
+        compute: Callable[[], Tuple[Optional[float], float]],
+    ) -> dict:
+        """
+        Returns the valid entry or calls compute() -> (change_pct or None, coverage) once to fill it.
+        Only one thread computes a given scheme/holdings version at a time; the others wait and reuse it.
+        """
+        key = self._key(scheme_code, holdings)
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._valid(entry, self._clock()):
+                self.hits += 1
+                return self._public(entry)
+            self.misses += 1
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have computed it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if self._valid(entry, self._clock()):
+                    return self._public(entry)
+
+            self.computations += 1
+            symbols = _quote_symbols(holdings)
+            before = self._table.versions_of(symbols)
+            with self._table.record_stores() as stored:
+                change_pct, coverage = compute()
+            after = self._table.versions_of(symbols)
+            # Only the compute's own stores are known to be in its result; anything else keeps the old version
+            seen = tuple(
+                now if stored.get(qualify_symbol(sym)) == now else old
+                for sym, old, now in zip(symbols, before, after)
+            )
+            return self._put(key, symbols, seen, change_pct, coverage)
+
+    def invalidate(self, scheme_code=None):
+        """Drops every holdings version of one scheme (or everything when scheme_code is None)."""
+        with self._lock:
+            if scheme_code is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == str(scheme_code)]:
+                    self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "computations": self.computations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Singleton instance
+live_estimate_cache = LiveEstimateCache()
@@ -0,0 +1,300 @@
+"""
+Market Feed - Streams live quotes from the Fyers market data socket into the quote table.
+
+The feed subscribes to the union of symbols across all stored holdings and writes
+every tick (last price, percent change) into the shared quote table, so live NAV
+estimation reads quotes from memory instead of polling REST per request.
+
+Tick sources are pluggable: FyersTickSource talks to the real data socket and
+ReplayTickSource replays recorded ticks from a JSONL file (one tick per line,
+e.g. {"symbol": "NSE:TCS-EQ", "ltp": 3500.5, "chp": 1.25}) for tests and demos.
+"""
+import json
+import random
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Set
+
+from services.quote_table import quote_table, qualify_symbol
+from services.fyers_service import fyers_service
+from services.holdings_service import holdings_service
+from core.logging import get_logger
+
+logger = get_logger("MarketFeed")
+
+_SUBSCRIBE_BATCH_SIZE = 100
+_CONNECT_TIMEOUT_SECONDS = 10
+
+
+def parse_tick(message) -> Optional[dict]:
+    """
+    Extracts {"symbol", "pct", "ltp"} from a data socket message.
+    Control messages (connection/subscription acks) and ticks without a price return None.
+    """
+    if not isinstance(message, dict):
+        return None
+    symbol = message.get("symbol")
+    ltp = message.get("ltp")
+    if not symbol or ltp is None:
+        return None
+    pct = message.get("chp")
+    if pct is None:
+        prev_close = message.get("prev_close_price")
+        if not prev_close:
+            return None
+        pct = (float(ltp) / float(prev_close) - 1) * 100
+    return {"symbol": symbol, "pct": float(pct), "ltp": float(ltp)}
+
+
+class FyersTickSource:
+    """Fyers v3 market data socket (full mode, so ticks carry percent change)."""
+
+    def __init__(self, token_provider: Callable[[], Optional[str]] = fyers_service.get_data_socket_token):
+        self._token_provider = token_provider
+        self._socket = None
+
+    def connect(self, on_tick: Callable[[dict], None], on_disconnect: Callable[[str], None]):
+        token = self._token_provider()
+        if not token:
+            raise ConnectionError("Fyers not authenticated")
+
+        from fyers_apiv3.FyersWebsocket import data_ws
+
+        connected = threading.Event()
+        self._socket = data_ws.FyersDataSocket(
+            access_token=token,
+            log_path="",
+            litemode=False,
+            write_to_file=False,
+            reconnect=False,  # MarketFeed owns reconnect/backoff and resubscription
+            on_connect=connected.set,
+            on_message=on_tick,
+            on_error=lambda msg: logger.warning(f"Data socket error: {msg}"),
+            on_close=lambda msg: on_disconnect(str(msg)),
+        )
+        self._socket.connect()
+        if not connected.wait(_CONNECT_TIMEOUT_SECONDS) or not self._socket.is_connected():
+            self.close()
+            raise ConnectionError("Data socket did not connect")
+
+    def subscribe(self, symbols: List[str]):
+        self._socket.subscribe(symbols=symbols, data_type="SymbolUpdate")
+
+    def unsubscribe(self, symbols: List[str]):
+        self._socket.unsubscribe(symbols=symbols, data_type="SymbolUpdate")
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close_connection()
+            except Exception as e:
+                logger.debug(f"Data socket close failed: {e}")
+            self._socket = None
+
+
+class ReplayTickSource:
+    """
+    Replays recorded ticks (a JSONL path or an iterable of dicts) to subscribed symbols.
+    A tick may carry "delay" (seconds to wait before emitting it). When the ticks run
+    out the source disconnects, unless hold_open is set.
+    """
+
+    def __init__(self, ticks, interval: float = 0.0, hold_open: bool = False):
+        self._ticks = ticks
+        self._interval = interval
+        self._hold_open = hold_open
+        self._subscribed: Set[str] = set()
+        self._closed = threading.Event()
+        self._thread = None
+        self.done = threading.Event()
+
+    def _iter_ticks(self) -> Iterable[dict]:
+        if isinstance(self._ticks, str):
+            with open(self._ticks, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            yield from self._ticks
+
+    def connect(self, on_tick: Callable[[dict], None], on_disconnect: Callable[[str], None]):
+        def run():
+            for tick in self._iter_ticks():
+                if self._closed.wait(tick.get("delay", self._interval)):
+                    return
+                if qualify_symbol(tick.get("symbol")) in self._subscribed:
+                    on_tick(tick)
+            self.done.set()
+            if not self._hold_open:
+                on_disconnect("replay finished")
+
+        self._thread = threading.Thread(target=run, name="tick-replay", daemon=True)
+        self._thread.start()
+
+    def subscribe(self, symbols: List[str]):
+        self._subscribed.update(symbols)
+
+    def unsubscribe(self, symbols: List[str]):
+        self._subscribed.difference_update(symbols)
+
+    def close(self):
+        self._closed.set()
+
+
+class MarketFeed:
+    """
+    Keeps one streaming connection alive and subscribed to every held symbol.
+
+    Runs in a daemon thread: connects, diffs subscriptions against the holdings
+    universe (on request and every resync_interval), and reconnects with jittered
+    exponential backoff when the source drops. While connected the quote table
+    treats streamed entries as fresh; once disconnected they fall back to TTL expiry,
+    so REST polling takes over transparently.
+    """
+
+    def __init__(
+        self,
+        table=quote_table,
+        source_factory: Callable[[], object] = FyersTickSource,
+        symbol_provider: Callable[[], Iterable[str]] = holdings_service.get_all_symbols,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 60.0,
+        resync_interval: float = 300.0,
+    ):
+        self.table = table
+        self._source_factory = source_factory
+        self._symbol_provider = symbol_provider
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.resync_interval = resync_interval
+
+        self._source = None
+        self._connected = False
+        self._subscribed: Set[str] = set()
+        self._resync_requested = False
+        self._disconnected = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.ticks = 0
+        self.reconnects = 0
+        self.last_tick_at = None
+        self.table.attach_stream(self.is_live)
+
+    def is_live(self) -> bool:
+        return self._connected
+
+    @property
+    def subscribed(self) -> Set[str]:
+        return set(self._subscribed)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="market-feed", daemon=True)
+        self._thread.start()
+        logger.info("Market feed started")
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        logger.info("Market feed stopped")
+
+    def request_resync(self):
+        """Asks the feed to re-read the holdings universe (e.g. after an upload or delete)."""
+        self._resync_requested = True
+        self._wake.set()
+
+    def _desired_symbols(self) -> Set[str]:
+        return {qualify_symbol(s) for s in self._symbol_provider() if s}
+
+    def _on_tick(self, message):
+        tick = parse_tick(message)
+        if tick is None:
+            return
+        self.table.put_tick(tick["symbol"], tick["pct"], tick["ltp"])
+        self.ticks += 1
+        self.last_tick_at = time.time()
+
+    def _on_disconnect(self, reason: str):
+        logger.warning(f"Market feed disconnected: {reason}")
+        self._disconnected = True
+        self._wake.set()
+
+    def _sync_subscriptions(self, source):
+        desired = self._desired_symbols()
+        if not desired and self._subscribed:
+            # An empty universe is far more likely a failed holdings query than every fund deleted
+            logger.warning("Holdings symbol universe came back empty, keeping current subscriptions")
+            return
+        to_remove = sorted(self._subscribed - desired)
+        to_add = sorted(desired - self._subscribed)
+        if to_remove:
+            source.unsubscribe(to_remove)
+            self._subscribed.difference_update(to_remove)
+            self.table.release_stream(to_remove)
+        for i in range(0, len(to_add), _SUBSCRIBE_BATCH_SIZE):
+            batch = to_add[i:i + _SUBSCRIBE_BATCH_SIZE]
+            source.subscribe(batch)
+            self._subscribed.update(batch)
+        if to_add or to_remove:
+            logger.info(f"Market feed subscriptions: +{len(to_add)} -{len(to_remove)} (total {len(self._subscribed)})")
+
+    def _run(self):
+        backoff = self.backoff_initial
+        while not self._stop.is_set():
+            source = None
+            try:
+                source = self._source_factory()
+                self._disconnected = False
+                source.connect(self._on_tick, self._on_disconnect)
+                self._source = source
+                self._connected = True
+                backoff = self.backoff_initial
+                logger.info("Market feed connected")
+
+                self._sync_subscriptions(source)
+                next_resync = time.monotonic() + self.resync_interval
+                while not self._stop.is_set() and not self._disconnected:
+                    self._wake.wait(max(0.0, next_resync - time.monotonic()))
+                    self._wake.clear()
+                    if self._stop.is_set() or self._disconnected:
+                        break
+                    if self._resync_requested or time.monotonic() >= next_resync:
+                        self._resync_requested = False
+                        self._sync_subscriptions(source)
+                        next_resync = time.monotonic() + self.resync_interval
+            except Exception as e:
+                logger.warning(f"Market feed connection failed: {e}")
+            finally:
+                self._connected = False
+                self.table.release_stream(self._subscribed)
+                self._subscribed = set()
+                self._source = None
+                if source is not None:
+                    source.close()
+
+            if self._stop.is_set():
+                break
+            # Jittered exponential backoff before reconnecting
+            delay = backoff * (0.5 + random.random() / 2)
+            self.reconnects += 1
+            logger.info(f"Market feed reconnecting in {delay:.1f}s")
+            self._stop.wait(delay)
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self._connected,
+            "subscribed": len(self._subscribed),
+            "ticks": self.ticks,
+            "reconnects": self.reconnects,
+            "last_tick_at": self.last_tick_at,
+        }
+
+
+# Singleton instance
+market_feed = MarketFeed()
@@ -0,0 +1,139 @@
+"""
+NAV History Cache - In-process cache of parsed NAV histories keyed by scheme code.
+
+One download serves every lookup (latest / at-date / next-after-date) and every
+user holding the same scheme until the next AMFI publish checkpoint.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from utils.date_utils import get_current_ist_time, get_next_nav_refresh_time
+
+logger = get_logger("NavHistoryCache")
+
+# Rough in-memory footprint of one mfapi history row ({"date": str, "nav": str})
+_ROW_BYTES_ESTIMATE = 300
+
+
+def estimate_history_bytes(history: Any) -> int:
+    """Approximate memory footprint of a cached history, used for the memory cap."""
+    if hasattr(history, "nbytes"):
+        # Parsed NavSeries: array payload plus object/meta overhead
+        return int(history.nbytes) + 1024
+    rows = history.get("data") or []
+    return len(rows) * _ROW_BYTES_ESTIMATE + 1024
+
+
+class NavHistoryCache:
+    """
+    Thread-safe LRU cache with a TTL tied to the AMFI publish cycle.
+
+    Entries expire at the next NAV refresh checkpoint (see get_next_nav_refresh_time),
+    and the least recently used schemes are evicted once the memory cap is exceeded.
+    Concurrent misses for the same scheme share a single load.
+    """
+
+    def __init__(self, max_bytes: int = None, sizeof: Callable[[Any], int] = estimate_history_bytes):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.NAV_CACHE_MAX_BYTES
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, entry: dict, now) -> bool:
+        return now >= entry["expires_at"]
+
+    def get(self, scheme_code) -> Optional[Any]:
+        """Returns the cached history for a scheme, or None if missing/expired."""
+        key = str(scheme_code)
+        now = get_current_ist_time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry, now):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, scheme_code, value: Any, expires_at=None):
+        """Stores a history, evicting least recently used entries beyond the memory cap."""
+        key = str(scheme_code)
+        size = self._sizeof(value)
+        if expires_at is None:
+            expires_at = get_next_nav_refresh_time()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {"value": value, "size": size, "expires_at": expires_at}
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_load(self, scheme_code, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """
+        Returns the cached history or calls loader() once to fill it.
+        Only one thread loads a given scheme at a time; the others wait and reuse it.
+        Failed loads (None) are not cached.
+        """
+        key = str(scheme_code)
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have filled it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and not self._expired(entry, get_current_ist_time()):
+                    self._entries.move_to_end(key)
+                    return entry["value"]
+
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+            return value
+
+    def invalidate(self, scheme_code=None):
+        """Drops one scheme (or everything when scheme_code is None)."""
+        with self._lock:
+            if scheme_code is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            elif str(scheme_code) in self._entries:
+                self._remove(str(scheme_code))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry["size"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Singleton instance
+nav_history_cache = NavHistoryCache()
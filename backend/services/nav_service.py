@@ -1,23 +1,42 @@
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 import time
-import requests
-from services.holdings_service import holdings_service, session
+from services.holdings_service import holdings_service
 from services.fyers_service import fyers_service
+from services.nav_history_cache import nav_history_cache
+from services.nav_store import nav_history_store
+from services.close_store import close_price_store
+from services.bhavcopy_service import bhavcopy_service
+from services.yf_close_cache import yf_close_cache
+from services.amfi_service import amfi_service
+from services.scheme_search import scheme_search_index
+from services.quote_table import quote_table, nse_plain_symbol
+from services.live_estimate_cache import live_estimate_cache, holdings_version
+from services.incremental_estimator import incremental_estimator
+from services.nse_client import nse_client
 from utils.date_utils import (
     is_market_open,
     get_current_ist_time,
     is_trading_day,
     get_previous_business_day,
     format_date_for_api,
-    parse_date_from_str,
     MARKET_OPEN_TIME,
 )
-from utils.common import NSE_API_URL, NSE_BASE_URL
+from utils.common import MFAPI_BASE_URL
 from utils.xirr import calculate_sip_xirr
+from utils.nav_series import NavSeries, to_ordinal
+from utils.portfolio_matrix import PortfolioMatrix, compiled_funds, symbol_universe, quote_symbol
 from core.logging import get_logger
+from core.http_client import http_client
+from core.config import settings
 
 logger = get_logger("NavService")
 
+# Minimum fraction of a fund's weight that must be priced for a reliable estimate
+MIN_QUOTE_COVERAGE = 0.75
+
+# Marks "not precomputed" for calculate_pnl's live_change (None means insufficient coverage)
+_NOT_COMPUTED = object()
+
 
 class NavService:
     # ==================== FYERS-BASED METHODS (PRIMARY) ====================
@@ -51,68 +70,129 @@ class NavService:
 
     # ==================== NSE FALLBACK METHODS ====================
 
-    @staticmethod
-    def ensure_nse_cookies():
-        """Ensures that the session has valid cookies from NSE home page."""
-        if not session.cookies.get("nsit"):  # Check for a specific NSE cookie if possible, or just length
-             # If no cookies, or we want to be safe, visit home
-             try:
-                 # Check if we already have some cookies
-                 if len(session.cookies) > 0:
-                     return
-
-                 logger.info("Initializing NSE cookies (visiting home page)...")
-                 # User-Agent is already in headers
-                 session.get(NSE_BASE_URL, timeout=10)
-             except Exception as e:
-                 logger.error(f"Failed to initialize NSE cookies: {e}")
-
     @staticmethod
     def get_live_price_change_nse(symbol, max_retries=3):
         """Fetches live P-Change from NSE for a symbol (FALLBACK method).
-        Includes retry logic with exponential backoff for robustness.
+        Retries with jittered, non-blocking backoff inside the async NSE client.
         """
-        for attempt in range(max_retries):
-            try:
-                r = session.get(NSE_API_URL, params={"symbol": symbol}, timeout=10)
-                content_type = r.headers.get("Content-Type", "")
-                
-                # Handle rate limiting (429) or server errors (5xx)
-                if r.status_code == 429 or r.status_code >= 500:
-                    wait_time = (attempt + 1) * 2  # 2s, 4s, 6s
-                    logger.debug(f"NSE rate limit/error for {symbol}, retry {attempt+1} after {wait_time}s")
-                    time.sleep(wait_time)
-                    continue
-                    
-                if "application/json" not in content_type:
-                    # Sometimes NSE returns HTML on overload, retry
-                    if attempt < max_retries - 1:
-                        time.sleep(1)
-                        continue
-                    logger.debug(f"NSE returned non-json for {symbol}: {content_type}")
-                    return None
-                    
-                data = r.json()
-                # defensive access
-                price_info = data.get("priceInfo") or {}
-                p_change = price_info.get("pChange")
-                return float(p_change) if p_change is not None else None
-                
-            except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    logger.debug(f"Timeout for {symbol}, retry {attempt+1}")
-                    time.sleep(1)
-                    continue
-                logger.debug(f"get_live_price_change_nse({symbol}) timed out after {max_retries} attempts")
+        return nse_client.get_pct_changes([symbol], max_retries=max_retries).get(symbol)
+
+    @staticmethod
+    def _fetch_nav_history(scheme_code, start_date=None):
+        """
+        Downloads the mfapi NAV history payload (newest-first). Returns dict or None.
+        With start_date, only the tail from that date onwards is requested.
+        """
+        try:
+            url = f"{MFAPI_BASE_URL}/{scheme_code}"
+            params = None
+            if start_date:
+                params = {
+                    "startDate": start_date.strftime("%Y-%m-%d"),
+                    "endDate": get_current_ist_time().date().strftime("%Y-%m-%d"),
+                }
+            response = http_client.get(url, params=params)
+            if response.status_code != 200:
                 return None
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(0.5)
-                    continue
-                logger.debug(f"get_live_price_change_nse({symbol}) failed: {e}")
+            data = response.json()
+            if data.get("status") != "SUCCESS":
                 return None
+            return data
+        except Exception as e:
+            logger.error(f"Error fetching NAV history for {scheme_code}: {e}")
         return None
 
+    @staticmethod
+    def _load_nav_history(scheme_code):
+        """
+        Cache loader: reads the persistent NAV store first and only calls mfapi
+        for the dates newer than the last stored row (full backfill the first time).
+        Falls back to a plain download if the store is unavailable.
+        """
+        try:
+            if not nav_history_store.needs_sync(scheme_code):
+                stored = nav_history_store.load_history(scheme_code)
+                if stored:
+                    return stored
+
+            last_date = nav_history_store.get_last_date(scheme_code)
+            start_date = last_date + timedelta(days=1) if last_date else None
+            fetched = NavService._fetch_nav_history(scheme_code, start_date=start_date)
+            if fetched:
+                nav_history_store.append(scheme_code, fetched.get("data") or [], meta=fetched.get("meta"))
+            return nav_history_store.load_history(scheme_code) or fetched
+        except Exception as e:
+            logger.warning(f"NAV store unavailable for {scheme_code}, fetching directly: {e}")
+        return NavService._fetch_nav_history(scheme_code)
+
+    @staticmethod
+    def _load_nav_series(scheme_code):
+        """Cache loader: parses the stored/fetched history once into a date-indexed NavSeries."""
+        payload = NavService._load_nav_history(scheme_code)
+        if not payload:
+            return None
+        series = NavSeries.from_mfapi(payload, scheme_code=scheme_code)
+        return series if len(series) else None
+
+    @staticmethod
+    def get_nav_history(scheme_code):
+        """
+        Returns the parsed NavSeries for a scheme (or None).
+        Served from the shared in-process cache, backed by the persistent NAV store.
+        """
+        if not scheme_code:
+            return None
+        return nav_history_cache.get_or_load(
+            scheme_code, lambda: NavService._load_nav_series(scheme_code)
+        )
+
+    @staticmethod
+    def prewarm_nav_histories(scheme_codes=None, max_workers=4):
+        """
+        Reloads the NAV history of every held scheme (or the given ones) into the store and cache,
+        so the first dashboard load after a publish checkpoint does not wait on mfapi.
+        Returns {"schemes": n, "loaded": n, "failed": [...], "duration": seconds}.
+        """
+        import concurrent.futures
+
+        start_time = time.time()
+        if scheme_codes is None:
+            scheme_codes = holdings_service.get_all_scheme_codes()
+        scheme_codes = list(dict.fromkeys(str(c) for c in scheme_codes if c))
+
+        def refresh(code):
+            nav_history_cache.invalidate(code)
+            return NavService.get_nav_history(code) is not None
+
+        failed = []
+        if scheme_codes:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for code, ok in zip(scheme_codes, executor.map(refresh, scheme_codes)):
+                    if not ok:
+                        failed.append(code)
+
+        duration = time.time() - start_time
+        logger.info(f"NAV prewarm: {len(scheme_codes) - len(failed)}/{len(scheme_codes)} schemes loaded in {duration:.2f}s")
+        if failed:
+            logger.warning(f"NAV prewarm failed for: {failed}")
+        return {"schemes": len(scheme_codes), "loaded": len(scheme_codes) - len(failed), "failed": failed, "duration": round(duration, 2)}
+
+    @staticmethod
+    def run_scheduled_prewarm():
+        """Scheduler job: refresh AMFI NAVAll and the scheme search index, then pre-warm every held scheme's NAV history."""
+        try:
+            amfi_service.ingest_navall()
+            scheme_search_index.refresh(force=True)
+        except Exception as e:
+            logger.warning(f"NAVAll ingestion failed during prewarm: {e}")
+        return NavService.prewarm_nav_histories()
+
+    @staticmethod
+    def run_symbol_repair():
+        """Scheduler job: fill / repair holdings' persisted FYERS symbols, probing quotes when logged in."""
+        probe = fyers_service.get_bulk_quotes_pct_change if fyers_service.is_authenticated() else None
+        return holdings_service.repair_fyers_symbols(quote_probe=probe)
+
     @staticmethod
     def get_latest_nav(scheme_code, limit=1):
         """
@@ -121,28 +201,12 @@ class NavService:
         Always returns a list (empty if none).
         """
         try:
-            url = f"https://api.mfapi.in/mf/{scheme_code}"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("status") == "SUCCESS":
-                    nav_data = data.get("data") or []
-                    if nav_data:
-                        # nav_data is usually newest-first; slice defensively
-                        recent = nav_data[:limit]
-                        results = []
-                        for item in recent:
-                            try:
-                                results.append(
-                                    {
-                                        "date": item["date"],
-                                        "nav": float(item["nav"]),
-                                        "meta": data.get("meta"),
-                                    }
-                                )
-                            except Exception:
-                                continue
-                        return results
+            series = NavService.get_nav_history(scheme_code)
+            if series:
+                return [
+                    {"date": nav_date, "nav": nav, "meta": series.meta}
+                    for nav, nav_date in series.latest(limit)
+                ]
         except Exception as e:
             logger.error(f"Error fetching NAV for {scheme_code}: {e}")
         return []
@@ -155,26 +219,10 @@ class NavService:
         Returns (nav_float, nav_date_str) or None.
         """
         try:
-            url = f"https://api.mfapi.in/mf/{scheme_code}"
-            response = requests.get(url, timeout=5)
-            if response.status_code != 200:
-                return None
-
-            data = response.json()
-            if data.get("status") != "SUCCESS":
+            series = NavService.get_nav_history(scheme_code)
+            if not series:
                 return None
-
-            target_date = parse_date_from_str(target_date_str).date()
-            nav_data = data.get("data") or []
-
-            # iterate through nav_data (assumed newest-first); find first entry <= target_date
-            for entry in nav_data:
-                try:
-                    entry_date = datetime.strptime(entry["date"], "%d-%m-%Y").date()
-                    if entry_date <= target_date:
-                        return (float(entry["nav"]), entry["date"])
-                except Exception:
-                    continue
+            return series.on_or_before(target_date_str)
         except Exception as e:
             logger.error(f"Error fetching historical NAV for {scheme_code} date {target_date_str}: {e}")
         return None
@@ -189,176 +237,193 @@ class NavService:
         Returns (nav_float, nav_date_str) or None.
         """
         try:
-            url = f"https://api.mfapi.in/mf/{scheme_code}"
-            response = requests.get(url, timeout=5)
-            if response.status_code != 200:
-                return None
-
-            data = response.json()
-            if data.get("status") != "SUCCESS":
+            series = NavService.get_nav_history(scheme_code)
+            if not series:
                 return None
 
-            target_date = parse_date_from_str(target_date_str).date()
-            nav_data = data.get("data") or []
+            result = series.on_or_after(target_date_str)
+            if result:
+                return result
 
-            # nav_data is newest-first, so we need to find the earliest entry >= target_date
-            # We'll collect all entries >= target_date, then take the oldest one (smallest date)
-            candidates = []
-            for entry in nav_data:
-                try:
-                    entry_date = datetime.strptime(entry["date"], "%d-%m-%Y").date()
-                    if entry_date >= target_date:
-                        candidates.append((entry_date, float(entry["nav"]), entry["date"]))
-                except Exception:
-                    continue
-            
-            if candidates:
-                # Sort by date ascending and take the first (oldest/earliest)
-                candidates.sort(key=lambda x: x[0])
-                _, nav, nav_date_str = candidates[0]
-                return (nav, nav_date_str)
-            
             # If no NAV on or after target_date, fall back to latest available
-            if nav_data:
-                latest = nav_data[0]
-                return (float(latest["nav"]), latest["date"])
-                
+            latest = series.latest(1)
+            return latest[0] if latest else None
         except Exception as e:
             logger.error(f"Error fetching next NAV for {scheme_code} date {target_date_str}: {e}")
         return None
 
     @staticmethod
-    def calculate_portfolio_change(holdings):
+    def get_navs_at_dates(scheme_code, target_dates):
         """
-        Calculates the weighted average percent change (intraday live) of the portfolio.
-        Uses Fyers bulk quotes if authenticated, falls back to parallel NSE fetching.
-        
-        Returns weighted pct change (e.g., 1.23 for +1.23%) or None if insufficient coverage.
+        Batch lookup for many dates against a single NAV history (one fetch, one vectorised pass).
+        Used for installment allocation and reconciliation (SIP / CAS).
+
+        Returns a list aligned with target_dates:
+            {"date": <input>, "on_or_before": (nav, date_str) | None, "on_or_after": (nav, date_str) | None}
+        Unparseable dates resolve to None on both sides. Empty list if the history is unavailable.
         """
-        import concurrent.futures
+        if not target_dates:
+            return []
+        series = NavService.get_nav_history(scheme_code)
+        if not series:
+            return []
+
+        parsed = []
+        for d in target_dates:
+            try:
+                parsed.append(to_ordinal(d))
+            except Exception:
+                parsed.append(None)
+
+        valid = [o for o in parsed if o is not None]
+        lookups = iter(series.lookup_many(valid))
+        results = []
+        for original, ordinal in zip(target_dates, parsed):
+            if ordinal is None:
+                results.append({"date": original, "on_or_before": None, "on_or_after": None})
+            else:
+                results.append({"date": original, **next(lookups)})
+        return results
 
-        total_prod = 0.0
-        total_wt = 0.0
-        stocks_checked = 0
+    @staticmethod
+    def _weighted_change(stocks, pct_changes, scheme_code=None):
+        """
+        Weighted average percent change over the stocks that have a quote (vectorised).
+        The stocks are compiled once per (scheme, holdings version) and priced from their own symbols.
+        Returns (weighted_pct or None, covered_weight, stocks_checked).
+        """
+        return compiled_funds.get(scheme_code, stocks).change_from(pct_changes)
 
-        # Filter valid stocks first
-        valid_stocks = [s for s in holdings if s.get("Symbol") and s.get("Weight", 0) > 0]
-        total_stocks = len(valid_stocks)
-        if total_stocks == 0:
-            return None
+    @staticmethod
+    def _fetch_nse_pct_changes(symbols):
+        """
+        Fetches live percent changes from NSE for plain symbols (FALLBACK path).
+        All symbols are fetched concurrently by the async NSE client under its rate
+        limit and latency budget. Returns dict symbol -> pct for the symbols that resolved.
+        """
+        if not symbols:
+            return {}
+        return nse_client.get_pct_changes(symbols)
 
-        logger.info(f"Starting live price fetch for {total_stocks} stocks...")
+    @staticmethod
+    def _fetch_live_pct_changes_upstream(symbols):
+        """
+        One upstream round for the given symbols: Fyers bulk quotes if authenticated
+        (exchange-qualified symbols go out as-is, one request per batch),
+        then NSE index snapshots, then per-symbol NSE calls for the leftovers.
+        Returns dict symbol -> pct.
+        """
+        result = {}
         start_time = time.time()
-
-        # ============ TRY FYERS BULK QUOTES FIRST ============
         if fyers_service.is_authenticated():
-            logger.info("Using Fyers API for bulk quotes...")
-            symbols = [s.get("Symbol") for s in valid_stocks]
-            pct_changes = fyers_service.get_bulk_quotes_pct_change(symbols)
-            
-            for stock in valid_stocks:
-                sym = stock.get("Symbol")
-                wt = float(stock.get("Weight", 0) or 0)
-                if wt > 1:
-                    wt = wt / 100.0
-                
-                pct = pct_changes.get(sym)
-                if pct is not None:
-                    total_prod += (wt * pct)
-                    total_wt += wt
-                    stocks_checked += 1
+            bulk = fyers_service.get_bulk_quotes_pct_change(symbols)
+            result.update({sym: pct for sym, pct in bulk.items() if pct is not None})
+            logger.info(f"Fyers bulk fetch: {len(result)}/{len(symbols)} symbols")
+
+        # NSE fallback only knows NSE listings, by their plain trading symbol
+        nse_names = {s: nse_plain_symbol(s) for s in symbols if s not in result}
+        missing = [s for s, name in nse_names.items() if name]
+        if missing and settings.NSE_SNAPSHOT_INDICES:
+            # One index snapshot covers most holdings; every constituent goes into the shared table
+            snapshot = nse_client.get_index_snapshots(settings.NSE_SNAPSHOT_INDICES)
+            if snapshot:
+                quote_table.put_many({sym: q["pct"] for sym, q in snapshot.items()}, source="nse_index")
+                for sym in missing:
+                    quote = snapshot.get(nse_names[sym])
+                    if quote is not None:
+                        result[sym] = quote["pct"]
+                missing = [s for s in missing if s not in result]
+        if missing:
+            logger.info(f"Using NSE per-symbol fallback for {len(missing)} symbols...")
+            fetched = NavService._fetch_nse_pct_changes(list(dict.fromkeys(nse_names[s] for s in missing)))
+            for sym in missing:
+                if nse_names[sym] in fetched:
+                    result[sym] = fetched[nse_names[sym]]
+
+        logger.info(f"Live quotes for {len(symbols)} symbols fetched in {time.time() - start_time:.2f}s. Resolved: {len(result)}")
+        return result
 
-            duration = time.time() - start_time
-            logger.info(f"Fyers bulk fetch completed in {duration:.2f}s. Valid: {stocks_checked}/{total_stocks}, Coverage: {total_wt*100:.1f}%")
-
-            if total_wt >= 0.75:
-                return total_prod / total_wt
-            else:
-                logger.warning(f"Insufficient Fyers coverage ({total_wt*100:.1f}% < 75%), trying NSE fallback...")
-
-        # ============ FALLBACK TO NSE SCRAPING ============
-        logger.info("Using NSE scraping fallback...")
-        total_prod = 0.0
-        total_wt = 0.0
-        stocks_checked = 0
+    @staticmethod
+    def fetch_live_pct_changes(symbols):
+        """
+        Returns live percent changes {symbol: pct} for a set of symbols (unpriced symbols omitted).
+        Served from the shared quote table; only symbols whose quote is older than the
+        freshness window go upstream, once, however many funds/users ask concurrently.
+        """
+        return quote_table.get_or_fetch(symbols, NavService._fetch_live_pct_changes_upstream, source="live")
 
-        # NSE fallback can only handle plain NSE symbols (no exchange prefix)
-        valid_stocks = [s for s in valid_stocks if ":" not in (s.get("Symbol") or "")]
+    @staticmethod
+    def _live_portfolio_change(holdings, live_changes=None, scheme_code=None):
+        """
+        Weighted intraday percent change of a portfolio and the weight it covers.
+        Returns (pct or None if insufficient coverage, covered_weight).
+        """
+        # Filter valid stocks first
+        valid_stocks = [s for s in holdings if s.get("Symbol") and s.get("Weight", 0) > 0]
         total_stocks = len(valid_stocks)
         if total_stocks == 0:
-            return None
-        
-        # Ensure we have cookies before starting parallel requests
-        NavService.ensure_nse_cookies()
-        
-        # Track results and failures for retry
-        results = {}  # symbol -> (weight, pct_change)
-        failed_stocks = []
-
-        def fetch_price(stock):
-            sym = stock.get("Symbol")
-            # normalize weight to fraction
-            wt = float(stock.get("Weight", 0) or 0)
-            if wt > 1:
-                wt = wt / 100.0
-            pct = NavService.get_live_price_change_nse(sym)
-            return (sym, wt, pct)
-
-        # PASS 1: Parallel fetch with reduced concurrency to avoid rate limiting
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_stock = {executor.submit(fetch_price, stock): stock for stock in valid_stocks}
-            for future in concurrent.futures.as_completed(future_to_stock):
-                stock = future_to_stock[future]
-                try:
-                    sym, wt, pct = future.result()
-                    if pct is not None:
-                        results[sym] = (wt, pct)
-                        total_prod += (wt * pct)
-                        total_wt += wt
-                        stocks_checked += 1
-                    else:
-                        failed_stocks.append(stock)
-                except Exception as exc:
-                    logger.debug(f"Stock fetch exception for {stock.get('Symbol')}: {exc}")
-                    failed_stocks.append(stock)
-
-        # PASS 2: Sequential retry for failed stocks with delay between requests
-        if failed_stocks:
-            logger.info(f"Retrying {len(failed_stocks)} failed stocks sequentially...")
-            for stock in failed_stocks:
-                sym = stock.get("Symbol")
-                wt = float(stock.get("Weight", 0) or 0)
-                if wt > 1:
-                    wt = wt / 100.0
-                
-                # Small delay to avoid rate limiting
-                time.sleep(0.3)
-                
-                # Retry with fresh cookie refresh if many failures
-                if len(failed_stocks) > 20 and failed_stocks.index(stock) == 0:
-                    try:
-                        session.cookies.clear()
-                        session.get(NSE_BASE_URL, timeout=10)
-                    except Exception:
-                        pass
-                
-                pct = NavService.get_live_price_change_nse(sym, max_retries=2)
-                if pct is not None:
-                    results[sym] = (wt, pct)
-                    total_prod += (wt * pct)
-                    total_wt += wt
-                    stocks_checked += 1
+            return None, 0.0
 
-        duration = time.time() - start_time
-        logger.info(f"NSE fetch completed in {duration:.2f}s. Valid: {stocks_checked}/{total_stocks}, Coverage: {total_wt*100:.1f}%")
+        if live_changes is None:
+            live_changes = NavService.fetch_live_pct_changes([quote_symbol(s) for s in valid_stocks])
+
+        change, total_wt, stocks_checked = NavService._weighted_change(valid_stocks, live_changes, scheme_code)
+        logger.info(f"Live change. Valid: {stocks_checked}/{total_stocks}, Coverage: {total_wt*100:.1f}%")
 
         # require at least 75% of portfolio weight coverage for reliable estimation
-        if total_wt >= 0.75:
+        if total_wt >= MIN_QUOTE_COVERAGE:
             # normalized weighted average percent change
-            return total_prod / total_wt
-        else:
-            logger.warning(f"Insufficient coverage ({total_wt*100:.1f}% < 75%), skipping D0 estimation")
-        return None
+            return change, total_wt
+        logger.warning(f"Insufficient coverage ({total_wt*100:.1f}% < 75%), skipping D0 estimation")
+        return None, total_wt
+
+    @staticmethod
+    def calculate_portfolio_change(holdings, live_changes=None):
+        """
+        Calculates the weighted average percent change (intraday live) of the portfolio.
+        Quotes come from the shared quote table (Fyers bulk quotes if authenticated, NSE fallback).
+        If live_changes (symbol -> pct) is given, those prefetched quotes are used instead.
+        
+        Returns weighted pct change (e.g., 1.23 for +1.23%) or None if insufficient coverage.
+        """
+        return NavService._live_portfolio_change(holdings, live_changes)[0]
+
+    @staticmethod
+    def get_live_estimate(scheme_code, holdings):
+        """
+        Live change of a scheme's holdings, memoised per scheme and holdings version:
+        {"change_pct" (None if insufficient coverage), "coverage", "computed_at"}.
+        A burst of users holding the same scheme triggers one computation per quote update;
+        while the market feed streams, the incremental estimator answers without recomputing
+        once enough of the holdings have ticked, and the quotes still missing are fetched otherwise.
+        """
+        streamed = NavService._streamed_live_estimate(scheme_code, holdings)
+        if streamed is not None:
+            return streamed
+        return live_estimate_cache.get_or_compute(
+            scheme_code, holdings, lambda: NavService._live_portfolio_change(holdings, scheme_code=scheme_code)
+        )
+
+    @staticmethod
+    def _streamed_live_estimate(scheme_code, holdings):
+        """
+        Live estimate from the incremental estimator's running sums, kept current by streamed
+        ticks (holdings are registered on first use). None when the feed is not streaming or
+        the streamed quotes do not yet cover MIN_QUOTE_COVERAGE of the holdings, so the caller
+        fetches the rest instead.
+        """
+        if not scheme_code or not quote_table.is_streaming():
+            return None
+        key = (str(scheme_code), holdings_version(holdings))
+        incremental_estimator.register(key, holdings)
+        change, coverage = incremental_estimator.estimate(key)
+        if coverage < MIN_QUOTE_COVERAGE:
+            return None
+        return {
+            "change_pct": change,
+            "coverage": coverage,
+            "computed_at": get_current_ist_time().isoformat(),
+        }
 
     @staticmethod
     def ensure_yf_symbol(sym):
@@ -371,159 +436,105 @@ class NavService:
     def get_historical_portfolio_change(holdings, target_date):
         """
         Calculates weighted average percent change for a specific historical date (target_date - a date object).
-        Uses Fyers if authenticated, falls back to yfinance.
         Returns weighted pct (e.g., 1.23 for +1.23%) or None if insufficient coverage.
         """
+        change, coverage = NavService.estimate_historical_change(holdings, target_date)
+        return change if coverage >= MIN_QUOTE_COVERAGE else None
+
+    @staticmethod
+    def estimate_historical_change(holdings, target_date, deadline=None):
+        """
+        Weighted percent change of the holdings on target_date and the weight it covers.
+        Reads the shared daily close store (filled from the exchange bhavcopies, then Fyers
+        candles fetched concurrently when authenticated), falls back to yfinance.
+        Every step shares one budget of `deadline` seconds (HISTORICAL_FETCH_DEADLINE_SECONDS
+        by default); when it runs out the best estimate reached so far is returned:
+        (pct or None, covered weight). Downloads cut short keep filling the stores.
+        """
         valid_stocks = [s for s in holdings if s.get("Symbol") and s.get("Weight", 0) > 0]
         if not valid_stocks:
-            return None
+            return None, 0.0
 
-        # ============ TRY FYERS FIRST ============
-        if fyers_service.is_authenticated():
-            logger.info(f"Using Fyers for historical data on {target_date}...")
-            total_prod = 0.0
-            total_wt = 0.0
-            stocks_checked = 0
-
-            # Convert target_date to datetime if needed
-            if isinstance(target_date, date) and not isinstance(target_date, datetime):
-                target_dt = datetime.combine(target_date, datetime.min.time())
-            else:
-                target_dt = target_date
+        started = time.monotonic()
+        deadline = settings.HISTORICAL_FETCH_DEADLINE_SECONDS if deadline is None else deadline
+        change, total_wt = None, 0.0
 
-            for stock in valid_stocks:
-                sym = stock["Symbol"]
-                wt = float(stock.get("Weight", 0) or 0)
-                if wt > 1:
-                    wt = wt / 100.0
+        # ============ LOCAL DAILY CLOSES (bhavcopies, then Fyers candles) ============
+        if isinstance(target_date, datetime):
+            target_date = target_date.date()
+        symbols = list(dict.fromkeys(quote_symbol(s) for s in valid_stocks))
 
-                pct = fyers_service.get_historical_pct_change(sym, target_dt)
-                if pct is not None:
-                    total_prod += wt * pct
-                    total_wt += wt
-                    stocks_checked += 1
-
-            logger.info(f"Fyers historical fetch complete. Valid: {stocks_checked}/{len(valid_stocks)}, Coverage: {total_wt*100:.1f}%")
+        try:
+            pct_changes = close_price_store.pct_changes_on(symbols, target_date)
+            change, total_wt, stocks_checked = NavService._weighted_change(valid_stocks, pct_changes)
+
+            remaining = deadline - (time.monotonic() - started)
+            if total_wt < MIN_QUOTE_COVERAGE and remaining > 0 and bhavcopy_service.ensure_ingested_within(target_date, remaining):
+                # One end-of-day file covers every listed symbol (a slow download finishes in the background)
+                pct_changes = close_price_store.pct_changes_on(symbols, target_date)
+                change, total_wt, stocks_checked = NavService._weighted_change(valid_stocks, pct_changes)
+
+            remaining = deadline - (time.monotonic() - started)
+            if total_wt < MIN_QUOTE_COVERAGE and remaining > 0 and fyers_service.is_authenticated():
+                # Only symbols not yet synced through target_date are fetched; holidays and
+                # delisted symbols are remembered, so this runs once per symbol per day
+                missing = [sym for sym in symbols if sym not in pct_changes]
+                logger.info(f"Syncing daily closes for {len(missing)} symbols through {target_date}...")
+                if close_price_store.sync(
+                    missing, target_date, fyers_service.get_daily_closes,
+                    deadline=remaining, max_workers=settings.HISTORICAL_FETCH_WORKERS,
+                ):
+                    pct_changes = close_price_store.pct_changes_on(symbols, target_date)
+                    change, total_wt, stocks_checked = NavService._weighted_change(valid_stocks, pct_changes)
+
+            logger.info(f"Stored close coverage for {target_date}. Valid: {stocks_checked}/{len(valid_stocks)}, Coverage: {total_wt*100:.1f}%")
+        except Exception as e:
+            logger.error(f"Daily close store lookup failed for {target_date}: {e}")
 
-            if total_wt >= 0.75:
-                return total_prod / total_wt
-            else:
-                logger.warning(f"Insufficient Fyers historical coverage ({total_wt*100:.1f}% < 75%), trying yfinance fallback...")
+        if total_wt >= MIN_QUOTE_COVERAGE:
+            return change, total_wt
+        if time.monotonic() - started >= deadline:
+            logger.warning(f"D-1 deadline reached at {total_wt*100:.1f}% coverage, skipping yfinance fallback")
+            return change, total_wt
 
         # ============ FALLBACK TO YFINANCE ============
-        return NavService._get_historical_portfolio_change_yfinance(holdings, target_date)
+        logger.warning(f"Insufficient stored close coverage ({total_wt*100:.1f}% < 75%), trying yfinance fallback...")
+        yf_change, yf_wt = NavService._get_historical_portfolio_change_yfinance(
+            holdings, target_date, timeout=deadline - (time.monotonic() - started),
+        )
+        if yf_wt > total_wt:
+            return yf_change, yf_wt
+        return change, total_wt
 
     @staticmethod
-    def _get_historical_portfolio_change_yfinance(holdings, target_date):
+    def _get_historical_portfolio_change_yfinance(holdings, target_date, timeout=None):
         """
-        FALLBACK: Uses yfinance to fetch historical close prices.
+        FALLBACK: Uses yfinance historical closes from the shared close panel
+        (one download covers every fund falling back for the same date), waiting at most
+        timeout seconds for a download.
+        Returns (weighted pct or None, covered weight).
         """
-        import os
-        from pathlib import Path
-        import yfinance as yf
-        import pandas as pd
-
-        # yfinance may fail to initialise its default Windows cache dir if a file exists
-        # where it expects a folder (e.g. %LOCALAPPDATA%\py-yfinance). Point it to a
-        # project-local, writable directory to avoid noisy logs.
-        try:
-            cache_dir = Path(__file__).resolve().parents[1] / "logs" / "py-yfinance"
-            cache_dir.mkdir(parents=True, exist_ok=True)
-            yf.set_tz_cache_location(str(cache_dir))
-        except Exception:
-            pass
-
         valid_stocks = [s for s in holdings if s.get("Symbol") and s.get("Weight", 0) > 0]
         if not valid_stocks:
-            return None
+            return None, 0.0
 
-        # Prepare tickers
-        tickers_map = {}
-        for s in valid_stocks:
-            sym = s["Symbol"]
-            yf_sym = NavService.ensure_yf_symbol(sym)
-            tickers_map[sym] = yf_sym
-        tickers_list = list(set(tickers_map.values()))
+        # Keyed like the compiled weights; yfinance itself wants the plain ticker
+        tickers_map = {quote_symbol(s): NavService.ensure_yf_symbol(s["Symbol"]) for s in valid_stocks}
 
         try:
-            # Fetch small window around target_date to get close[t-1] and close[t]
-            start_date = target_date - timedelta(days=7)
-            end_date = target_date + timedelta(days=2)  # yfinance end is exclusive, be generous
-            logger.info(f"Fetching historical data for {len(tickers_list)} stocks via yfinance between {start_date} and {end_date}")
-
-            data = yf.download(tickers_list, start=start_date, end=end_date, progress=False, threads=True, group_by='column')
-            if data is None or data.empty:
-                logger.warning("yfinance returned empty data")
-                return None
-
-            # 'Close' may be a DataFrame or a MultiIndex DataFrame depending on tickers count
-            if "Close" in data:
-                close_df = data["Close"]
-            else:
-                # data itself might be a simple DataFrame of Close if one ticker
-                close_df = data
-
-            # Ensure index is datetime
-            close_df.index = pd.to_datetime(close_df.index)
-
-            # Calculate percent change per ticker: (Close[t] - Close[t-1]) / Close[t-1] * 100
-            pct_df = close_df.pct_change() * 100
-
-            # Normalize target_date to date
-            if isinstance(target_date, str):
-                t_date = pd.to_datetime(target_date).date()
-            else:
-                t_date = target_date
-
-            # Find index row that matches target_date
-            idx_loc = None
-            for idx in pct_df.index:
-                if idx.date() == t_date:
-                    idx_loc = idx
-                    break
-
-            if idx_loc is None:
-                logger.warning(f"No yfinance pct row found for target date {t_date}")
-                return None
-
-            total_prod = 0.0
-            total_wt = 0.0
-            stocks_checked = 0
-
-            for stock in valid_stocks:
-                sym = stock["Symbol"]
-                wt = float(stock.get("Weight", 0) or 0)
-                if wt > 1:
-                    wt = wt / 100.0
-
-                yf_sym = tickers_map.get(sym)
-                # column names may be just yf_sym or a tuple depending on df shape; handle simple case
-                if yf_sym in pct_df.columns:
-                    val = pct_df.loc[idx_loc, yf_sym]
-                else:
-                    # try uppercase fallback
-                    found_col = next((c for c in pct_df.columns if str(c).upper() == yf_sym.upper()), None)
-                    val = pct_df.loc[idx_loc, found_col] if found_col is not None else None
-
-                if val is not None and not pd.isna(val):
-                    total_prod += wt * float(val)
-                    total_wt += wt
-                    stocks_checked += 1
+            ticker_pct = yf_close_cache.pct_changes(tickers_map.values(), target_date, timeout=timeout)
+            pct_changes = {sym: ticker_pct[t] for sym, t in tickers_map.items() if t in ticker_pct}
+            change, total_wt, stocks_checked = NavService._weighted_change(valid_stocks, pct_changes)
 
             logger.info(f"yfinance historical fetch complete. Valid: {stocks_checked}/{len(valid_stocks)}, Coverage: {total_wt*100:.1f}%")
-
-            # require at least 75% of portfolio weight coverage for reliable estimation
-            if total_wt >= 0.75:
-                return total_prod / total_wt
-            else:
-                logger.warning(f"Insufficient coverage ({total_wt*100:.1f}% < 75%), skipping D-1 estimation")
+            return change, total_wt
         except Exception as e:
             logger.error(f"yfinance history fetch failed: {e}")
 
-        return None
+        return None, 0.0
 
     @staticmethod
-    def calculate_pnl(fund_id, user_id, investment=None, input_date=None):
+    def calculate_pnl(fund_id, user_id, investment=None, input_date=None, doc=None, live_change=_NOT_COMPUTED, live_coverage=None):
         """
         Main entry: returns NAV, units, PnL, day PnL etc using the robust decision tree:
          - Prefer Official D0
@@ -531,8 +542,14 @@ class NavService:
          - Else Use Official D-1
          - Else Estimate D-1 using historical closes
          - Else fallback to D-2...
+
+        doc / live_change let the portfolio summary pass an already loaded holdings
+        document and a precomputed live portfolio change (pct, or None for insufficient
+        coverage) with the weight it covered (live_coverage) instead of loading and
+        pricing each fund separately.
         """
-        doc = holdings_service.get_holdings(fund_id, user_id)
+        if doc is None:
+            doc = holdings_service.get_holdings(fund_id, user_id)
         if not doc:
             return {"error": "Fund not found."}
 
@@ -560,6 +577,11 @@ class NavService:
         nav_map = {item["date"]: float(item["nav"]) for item in recent_navs} if recent_navs else {}
 
         official_d0 = nav_map.get(d0_str)
+        if official_d0 is None:
+            # NAVAll ingestion may already have today's official NAV before mfapi does
+            amfi_nav = amfi_service.get_latest_nav(scheme_code)
+            if amfi_nav and amfi_nav["date"] == d0_str:
+                official_d0 = amfi_nav["nav"]
         official_d_minus_1 = nav_map.get(d_minus_1_str)
         official_d_minus_2 = nav_map.get(d_minus_2_str)
         official_d_minus_3 = nav_map.get(d_minus_3_str)
@@ -592,7 +614,11 @@ class NavService:
 
         # BRANCH A: Estimate D0 (Live/Intraday) - only if official D0 missing and we believe live data maps to D0
         if official_d0 is None and data_is_d0:
-            port_change_d0 = NavService.calculate_portfolio_change(doc.get("holdings", []))
+            if live_change is _NOT_COMPUTED:
+                live = NavService.get_live_estimate(scheme_code, doc.get("holdings", []))
+                port_change_d0, live_coverage = live["change_pct"], live["coverage"]
+            else:
+                port_change_d0 = live_change
             if port_change_d0 is not None and official_d_minus_1 is not None:
                 # port_change_d0 is percent (e.g., 1.23), official_d_minus_1 is NAV
                 estimated_d0 = official_d_minus_1 * (1 + (port_change_d0 / 100.0))
@@ -600,8 +626,9 @@ class NavService:
 
         # BRANCH B: Estimate D-1 (Historical Close) - only if official D-1 missing
         if official_d_minus_1 is None:
-            port_change_d_minus_1 = NavService.get_historical_portfolio_change(doc.get("holdings", []), d_minus_1_date)
-            if port_change_d_minus_1 is not None and official_d_minus_2 is not None:
+            # Bounded by the historical fetch deadline; symbols still syncing are picked up next time
+            port_change_d_minus_1, d_minus_1_coverage = NavService.estimate_historical_change(doc.get("holdings", []), d_minus_1_date)
+            if port_change_d_minus_1 is not None and d_minus_1_coverage >= MIN_QUOTE_COVERAGE and official_d_minus_2 is not None:
                 estimated_d_minus_1 = official_d_minus_2 * (1 + (port_change_d_minus_1 / 100.0))
                 has_d_minus_1_prices = True
 
@@ -613,6 +640,7 @@ class NavService:
         last_updated_str = ""
         is_live_estimated = False
         active_change_pct = None  # percent used in note
+        reported_coverage = None
 
         if official_d0 is not None:
             # Case 1: Official NAV for D0 exists
@@ -637,6 +665,7 @@ class NavService:
                 # Case 2: Estimate D0 using Live prices
                 current_nav = estimated_d0
                 is_live_estimated = True
+                reported_coverage = live_coverage
                 # active change percent relative to official D-1
                 active_change_pct = ((estimated_d0 / official_d_minus_1 - 1) * 100) if official_d_minus_1 else None
 
@@ -671,6 +700,7 @@ class NavService:
                         # Case 4: Estimate D-1 using historical closes
                         current_nav = estimated_d_minus_1
                         is_live_estimated = True
+                        reported_coverage = d_minus_1_coverage
                         active_change_pct = ((estimated_d_minus_1 / official_d_minus_2 - 1) * 100) if official_d_minus_2 else None
 
                         last_updated_str = f"Est {d_minus_1_str}"
@@ -844,6 +874,8 @@ class NavService:
             "day_pnl_pct": round(day_pnl_pct, 2),
             "last_updated": last_updated_str,
             "note": note,
+            # Share of the fund's weight priced by live quotes (only for live D0 estimates)
+            "live_coverage": round(reported_coverage, 4) if reported_coverage is not None else None,
             "nickname": doc.get("nickname"),
             "investment_type": investment_type,
             "sip_pending_installments": sip_pending_installments,
@@ -852,5 +884,108 @@ class NavService:
             "pending_nav_amount": round(pending_nav_amount, 2)
         }
 
+    @staticmethod
+    def calculate_portfolio_summary(user_id, max_workers=8):
+        """
+        Prices every fund of a user in one pass:
+         - loads all holdings documents with a single query
+         - loads each distinct scheme's NAV history once (shared via the history cache)
+         - fetches live quotes once for the union of symbols of funds that need a D0 estimate
+           and derives all their live changes from one matrix-vector product
+         - computes each fund's PnL concurrently from the shared data
+        Returns {"funds": [...], "totals": {...}, "errors": [...]}.
+        """
+        import concurrent.futures
+
+        start_time = time.time()
+        docs = holdings_service.get_user_holdings_docs(user_id)
+
+        # 1. NAV histories: one load per distinct scheme, in parallel
+        scheme_codes = list(dict.fromkeys(str(d["scheme_code"]) for d in docs if d.get("scheme_code")))
+        series_by_scheme = {}
+        if scheme_codes:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(scheme_codes))) as executor:
+                for code, series in zip(scheme_codes, executor.map(NavService.get_nav_history, scheme_codes)):
+                    series_by_scheme[code] = series
+
+        # 2. Live quotes: one round for every symbol of funds still waiting for today's NAV,
+        #    then every such fund's weighted change from one matrix-vector product
+        live_estimates = {}
+        now = get_current_ist_time()
+        if is_trading_day(now) and now.time() >= MARKET_OPEN_TIME:
+            d0_str = format_date_for_api(now.date())
+            pending = []
+            for d in docs:
+                series = series_by_scheme.get(str(d.get("scheme_code")))
+                latest = series.latest(1) if series is not None else []
+                if latest and latest[0][1] == d0_str:
+                    continue  # Official D0 already published
+                # Streamed running sums, or schemes already estimated for the current quotes, are reused
+                cached = NavService._streamed_live_estimate(d.get("scheme_code"), d.get("holdings", []))
+                if cached is None:
+                    cached = live_estimate_cache.get(d.get("scheme_code"), d.get("holdings", []))
+                if cached is not None:
+                    live_estimates[str(d["_id"])] = (cached["change_pct"], cached["coverage"])
+                else:
+                    pending.append(d)
+            compiled = [compiled_funds.get(d.get("scheme_code"), d.get("holdings", [])) for d in pending]
+            names = symbol_universe.symbols
+            symbols = [names[c] for fund in compiled for c in fund.columns.tolist()]
+            if symbols:
+                live_changes = NavService.fetch_live_pct_changes(symbols)
+                matrix = PortfolioMatrix(symbol_universe, compiled)
+                changes, covered, _ = matrix.weighted_changes(symbol_universe.quote_vector(live_changes))
+                for d, change, cov in zip(pending, changes.tolist(), covered.tolist()):
+                    change = change if cov >= MIN_QUOTE_COVERAGE else None
+                    live_estimates[str(d["_id"])] = (change, cov)
+                    if d.get("scheme_code"):
+                        live_estimate_cache.put(d["scheme_code"], d.get("holdings", []), change, cov)
+
+        # 3. Per-fund PnL from the shared data
+        def price_fund(d):
+            fund_id = str(d["_id"])
+            try:
+                if fund_id in live_estimates:
+                    change, coverage = live_estimates[fund_id]
+                    res = NavService.calculate_pnl(fund_id, user_id, doc=d, live_change=change, live_coverage=coverage)
+                else:
+                    res = NavService.calculate_pnl(fund_id, user_id, doc=d)
+                return fund_id, res
+            except Exception as e:
+                logger.error(f"Portfolio summary failed for fund {fund_id}: {e}")
+                return fund_id, {"error": "Failed to price fund."}
+
+        funds = []
+        errors = []
+        if docs:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(docs))) as executor:
+                for fund_id, res in executor.map(price_fund, docs):
+                    if res.get("error"):
+                        errors.append({"fund_id": fund_id, "error": res["error"]})
+                    else:
+                        funds.append(res)
+
+        # 4. Aggregate totals
+        invested = sum(f["invested_amount"] for f in funds)
+        current_value = sum(f["current_value"] for f in funds)
+        day_pnl = sum(f["day_pnl"] for f in funds)
+        pnl = current_value - invested
+        prev_value = current_value - day_pnl
+
+        logger.info(f"Portfolio summary for {len(docs)} funds ({len(scheme_codes)} schemes) computed in {time.time() - start_time:.2f}s")
+        return {
+            "funds": funds,
+            "totals": {
+                "fund_count": len(funds),
+                "invested_amount": round(invested, 2),
+                "current_value": round(current_value, 2),
+                "pnl": round(pnl, 2),
+                "pnl_pct": round(pnl / invested * 100, 2) if invested > 0 else 0,
+                "day_pnl": round(day_pnl, 2),
+                "day_pnl_pct": round(day_pnl / prev_value * 100, 2) if prev_value > 0 else 0,
+            },
+            "errors": errors,
+        }
+
 
 nav_service = NavService()
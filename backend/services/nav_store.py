@@ -0,0 +1,139 @@
+"""
+NAV History Store - Persistent per-scheme NAV history in MongoDB.
+
+Each scheme is backfilled once from mfapi and then synced incrementally by
+appending only the dates newer than the last stored row. Rows live in the
+'nav_history' collection (one document per scheme/date); per-scheme sync
+bookkeeping (last stored date, next sync time, mfapi meta) lives in 'nav_sync_state'.
+"""
+from datetime import datetime, date
+from typing import Optional, List, Dict, Any
+
+import pytz
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from db import nav_history_collection, nav_sync_state_collection
+from utils.date_utils import get_next_nav_refresh_time
+from core.logging import get_logger
+
+logger = get_logger("NavHistoryStore")
+
+
+def _parse_mfapi_date(date_str: str) -> date:
+    """Parses mfapi's DD-MM-YYYY without strptime overhead."""
+    return date(int(date_str[6:10]), int(date_str[3:5]), int(date_str[0:2]))
+
+
+class NavHistoryStore:
+    """Mongo-backed NAV history keyed by (scheme_code, date)."""
+
+    def __init__(self, collection=None, state_collection=None):
+        self.collection = collection if collection is not None else nav_history_collection
+        self.state_collection = state_collection if state_collection is not None else nav_sync_state_collection
+
+    def ensure_indexes(self):
+        """Creates the (scheme_code, date) compound index used by point and range queries."""
+        try:
+            self.collection.create_index(
+                [("scheme_code", ASCENDING), ("date", ASCENDING)],
+                unique=True,
+                name="scheme_code_date",
+            )
+            self.state_collection.create_index([("scheme_code", ASCENDING)], unique=True, name="scheme_code")
+        except Exception as e:
+            logger.error(f"Failed to create NAV history indexes: {e}")
+
+    def get_state(self, scheme_code) -> Optional[dict]:
+        return self.state_collection.find_one({"scheme_code": str(scheme_code)})
+
+    def get_last_date(self, scheme_code) -> Optional[date]:
+        """Returns the newest stored NAV date for a scheme (None if never backfilled)."""
+        state = self.get_state(scheme_code)
+        if state and state.get("last_date"):
+            return state["last_date"].date()
+        doc = self.collection.find_one(
+            {"scheme_code": str(scheme_code)}, sort=[("date", DESCENDING)], projection={"date": 1}
+        )
+        return doc["date"].date() if doc else None
+
+    def needs_sync(self, scheme_code) -> bool:
+        """True if the scheme was never synced or its next publish checkpoint has passed."""
+        state = self.get_state(scheme_code)
+        if not state or not state.get("next_sync_at"):
+            return True
+        # Stored as naive UTC, like the rest of our Mongo timestamps
+        return datetime.utcnow() >= state["next_sync_at"]
+
+    def load_history(self, scheme_code, start: date = None, end: date = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns stored history in mfapi shape: {"meta": ..., "data": [{"date": "DD-MM-YYYY", "nav": float}, ...]}
+        newest-first, optionally limited to [start, end]. None if nothing is stored.
+        """
+        query: Dict[str, Any] = {"scheme_code": str(scheme_code)}
+        date_range = {}
+        if start:
+            date_range["$gte"] = datetime.combine(start, datetime.min.time())
+        if end:
+            date_range["$lte"] = datetime.combine(end, datetime.min.time())
+        if date_range:
+            query["date"] = date_range
+
+        rows = [
+            {"date": doc["date"].strftime("%d-%m-%Y"), "nav": doc["nav"]}
+            for doc in self.collection.find(query, {"_id": 0, "date": 1, "nav": 1}).sort("date", DESCENDING)
+        ]
+        if not rows:
+            return None
+        state = self.get_state(scheme_code) or {}
+        return {"meta": state.get("meta"), "data": rows, "status": "SUCCESS"}
+
+    def append(self, scheme_code, rows: List[dict], meta: dict = None) -> int:
+        """
+        Appends mfapi rows newer than the last stored date and records the sync.
+        Returns the number of rows written.
+        """
+        scheme_code = str(scheme_code)
+        last_date = self.get_last_date(scheme_code)
+
+        ops = []
+        newest = last_date
+        for row in rows or []:
+            try:
+                row_date = _parse_mfapi_date(row["date"])
+                nav = float(row["nav"])
+            except Exception:
+                continue
+            if last_date and row_date <= last_date:
+                continue
+            if nav <= 0:
+                continue
+            row_dt = datetime.combine(row_date, datetime.min.time())
+            ops.append(UpdateOne(
+                {"scheme_code": scheme_code, "date": row_dt},
+                {"$set": {"scheme_code": scheme_code, "date": row_dt, "nav": nav}},
+                upsert=True,
+            ))
+            if newest is None or row_date > newest:
+                newest = row_date
+
+        if ops:
+            self.collection.bulk_write(ops, ordered=False)
+
+        state_update: Dict[str, Any] = {
+            "scheme_code": scheme_code,
+            "synced_at": datetime.utcnow(),
+            "next_sync_at": get_next_nav_refresh_time().astimezone(pytz.utc).replace(tzinfo=None),
+        }
+        if newest:
+            state_update["last_date"] = datetime.combine(newest, datetime.min.time())
+        if meta:
+            state_update["meta"] = meta
+        self.state_collection.update_one({"scheme_code": scheme_code}, {"$set": state_update}, upsert=True)
+
+        if ops:
+            logger.info(f"Stored {len(ops)} new NAV rows for {scheme_code} (through {newest})")
+        return len(ops)
+
+
+# Singleton instance
+nav_history_store = NavHistoryStore()
@@ -0,0 +1,245 @@
+"""
+NSE Client - Async, rate-limited live quote fetcher (fallback when Fyers is unavailable).
+
+All symbols of a request are fetched concurrently on the shared background loop:
+ - one aiohttp session (keep-alive pool + cookie jar) reused across requests
+ - NSE cookies primed once and shared; re-primed once if NSE rejects them (401/403)
+ - a token bucket caps the request rate and a semaphore caps in-flight requests
+ - throttling / server errors / timeouts are retried with jittered backoff that
+   does not block any thread
+ - the whole batch runs under a latency budget; symbols still pending are dropped
+
+Index snapshots (equity-stockIndices, e.g. NIFTY 500) return hundreds of
+constituents' live quotes in one response and are used before per-symbol calls.
+"""
+import asyncio
+import random
+import time
+from typing import Dict, Iterable, Optional
+
+import aiohttp
+
+from core.config import settings
+from core.logging import get_logger
+from utils.async_bridge import run_sync
+from utils.common import NSE_API_URL, NSE_BASE_URL, NSE_HEADERS, NSE_INDEX_API_URL
+from utils.rate_limit import TokenBucket
+
+logger = get_logger("NseClient")
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_COOKIE_STATUSES = {401, 403}
+
+
+def parse_index_snapshot(payload: dict) -> Dict[str, dict]:
+    """
+    Parses an equity-stockIndices response into {symbol: {"pct", "ltp"}}.
+    The first row describes the index itself (priority 1, symbol == index name) and is skipped.
+    """
+    index_name = (payload or {}).get("name")
+    quotes: Dict[str, dict] = {}
+    for row in (payload or {}).get("data") or []:
+        symbol = (row.get("symbol") or "").strip().upper()
+        if not symbol or row.get("priority") == 1 or symbol == (index_name or "").upper():
+            continue
+        try:
+            pct = float(row["pChange"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        ltp = row.get("lastPrice")
+        quotes[symbol] = {"pct": pct, "ltp": float(ltp) if ltp is not None else None}
+    return quotes
+
+
+class AsyncNseClient:
+    """Async NSE quote-equity client shared by all requests."""
+
+    def __init__(
+        self,
+        rate_per_second: float = None,
+        burst: float = None,
+        max_concurrency: int = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        request_timeout: float = 10.0,
+    ):
+        self.limiter = TokenBucket(
+            rate_per_second or settings.NSE_RATE_PER_SECOND,
+            burst or settings.NSE_RATE_BURST,
+        )
+        self.max_concurrency = max_concurrency or settings.NSE_MAX_CONCURRENCY
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.request_timeout = request_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._cookie_lock: Optional[asyncio.Lock] = None
+        self._primed_at = 0.0
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session, semaphore and lock bind to the running (background) loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=NSE_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout, connect=3.05),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._cookie_lock = asyncio.Lock()
+            self._primed_at = 0.0
+        return self._session
+
+    async def prime_cookies(self, force: bool = False):
+        """Visits the NSE home page once to obtain cookies; concurrent callers share the visit."""
+        session = self._ensure_session()
+        requested_at = time.monotonic()
+        async with self._cookie_lock:
+            # Someone else primed while we waited
+            if self._primed_at and (not force or self._primed_at >= requested_at):
+                return
+            try:
+                await self.limiter.acquire()
+                async with session.get(NSE_BASE_URL) as r:
+                    await r.read()
+                self._primed_at = time.monotonic()
+                logger.info("NSE cookies primed")
+            except Exception as e:
+                logger.warning(f"Failed to prime NSE cookies: {e}")
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff (base * 2^attempt) with +/-50% jitter so retries spread out."""
+        return self.backoff_base * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def _get_json(self, url: str, params: dict, label: str, max_retries: int = None) -> Optional[dict]:
+        """GET a JSON endpoint under the rate limit with cookie re-priming and jittered retries."""
+        session = self._ensure_session()
+        retries = max_retries if max_retries is not None else self.max_retries
+        reprimed = False
+
+        for attempt in range(retries):
+            try:
+                await self.limiter.acquire()
+                async with self._semaphore:
+                    async with session.get(url, params=params) as r:
+                        status = r.status
+                        content_type = r.headers.get("Content-Type", "")
+                        data = await r.json(content_type=None) if "application/json" in content_type else None
+
+                if status in _COOKIE_STATUSES and not reprimed:
+                    reprimed = True
+                    await self.prime_cookies(force=True)
+                    continue
+                if status in _RETRY_STATUSES or (status == 200 and data is None):
+                    # Throttled, server error, or the HTML page NSE serves when overloaded
+                    logger.debug(f"NSE {status} for {label} ({content_type}), retry {attempt + 1}")
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                if data is None:
+                    logger.debug(f"NSE returned {status} for {label}")
+                    return None
+                return data
+            except (asyncio.TimeoutError, aiohttp.ClientError, ValueError) as e:
+                logger.debug(f"NSE fetch for {label} failed (attempt {attempt + 1}): {e}")
+                if attempt < retries - 1:
+                    await asyncio.sleep(self._backoff(attempt))
+        return None
+
+    async def fetch_pct_change(self, symbol: str, max_retries: int = None) -> Optional[float]:
+        """Returns NSE's live pChange for one symbol, or None."""
+        data = await self._get_json(NSE_API_URL, {"symbol": symbol}, symbol, max_retries)
+        if not data:
+            return None
+        p_change = (data.get("priceInfo") or {}).get("pChange")
+        return float(p_change) if p_change is not None else None
+
+    async def fetch_index_snapshot(self, index: str) -> Dict[str, dict]:
+        """All constituents of an index in one call: {symbol: {"pct", "ltp"}} (empty on failure)."""
+        data = await self._get_json(NSE_INDEX_API_URL, {"index": index}, index)
+        return parse_index_snapshot(data) if data else {}
+
+    async def fetch_index_snapshots(self, indices: Iterable[str], budget: float = None) -> Dict[str, dict]:
+        """Merged constituents of several index snapshots (the first index listing a symbol wins)."""
+        indices = [i for i in dict.fromkeys(indices) if i]
+        if not indices:
+            return {}
+        budget = budget if budget is not None else settings.NSE_FETCH_BUDGET_SECONDS
+        start_time = time.monotonic()
+
+        self._ensure_session()
+        if not self._primed_at:
+            await self.prime_cookies()
+
+        tasks = [asyncio.ensure_future(self.fetch_index_snapshot(index)) for index in indices]
+        remaining = max(0.0, budget - (time.monotonic() - start_time))
+        done, pending = await asyncio.wait(tasks, timeout=remaining)
+        for task in pending:
+            task.cancel()
+
+        merged: Dict[str, dict] = {}
+        for task in tasks:
+            if task in done and not task.cancelled() and task.exception() is None:
+                for symbol, quote in task.result().items():
+                    merged.setdefault(symbol, quote)
+
+        logger.info(f"NSE index snapshots {indices}: {len(merged)} symbols in {time.monotonic() - start_time:.2f}s")
+        return merged
+
+    async def fetch_pct_changes(self, symbols: Iterable[str], budget: float = None, max_retries: int = None) -> Dict[str, float]:
+        """
+        Fetches many symbols concurrently within `budget` seconds.
+        Returns {symbol: pct} for the symbols that resolved in time.
+        """
+        symbols = list(dict.fromkeys(s for s in symbols if s))
+        if not symbols:
+            return {}
+        budget = budget if budget is not None else settings.NSE_FETCH_BUDGET_SECONDS
+        start_time = time.monotonic()
+
+        self._ensure_session()
+        if not self._primed_at:
+            await self.prime_cookies()
+
+        tasks = {asyncio.ensure_future(self.fetch_pct_change(sym, max_retries)): sym for sym in symbols}
+        remaining = max(0.0, budget - (time.monotonic() - start_time))
+        done, pending = await asyncio.wait(tasks.keys(), timeout=remaining)
+        for task in pending:
+            task.cancel()
+
+        results = {}
+        for task in done:
+            if not task.cancelled() and task.exception() is None and task.result() is not None:
+                results[tasks[task]] = task.result()
+
+        duration = time.monotonic() - start_time
+        logger.info(
+            f"NSE fetch: {len(results)}/{len(symbols)} symbols in {duration:.2f}s"
+            + (f" ({len(pending)} dropped at {budget:.0f}s budget)" if pending else "")
+        )
+        return results
+
+    def get_pct_changes(self, symbols: Iterable[str], budget: float = None, max_retries: int = None) -> Dict[str, float]:
+        """Blocking wrapper for sync callers (runs on the shared background loop)."""
+        budget = budget if budget is not None else settings.NSE_FETCH_BUDGET_SECONDS
+        try:
+            # Small grace period over the budget for cancellation and cleanup
+            return run_sync(self.fetch_pct_changes(symbols, budget, max_retries), timeout=budget + 2)
+        except Exception as e:
+            logger.warning(f"NSE batch fetch failed: {e}")
+            return {}
+
+    def get_index_snapshots(self, indices: Iterable[str], budget: float = None) -> Dict[str, dict]:
+        """Blocking wrapper for fetch_index_snapshots."""
+        budget = budget if budget is not None else settings.NSE_FETCH_BUDGET_SECONDS
+        try:
+            return run_sync(self.fetch_index_snapshots(indices, budget), timeout=budget + 2)
+        except Exception as e:
+            logger.warning(f"NSE index snapshot fetch failed: {e}")
+            return {}
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+# Singleton instance
+nse_client = AsyncNseClient()
@@ -0,0 +1,247 @@
+"""
+Portfolio Stream - Server-Sent Events feed of a user's live fund values.
+
+A connected dashboard gets one full snapshot, then only the fields that moved
+(estimated NAV, value, P&L, day P&L, live coverage) whenever a quote of one of
+the user's own holdings changes. Every connection of the same user (and fund)
+shares one computation, which is throttled and served from the shared caches
+(NAV histories, quote table, per-scheme live estimates), so an open stream costs
+far less than a client re-posting /analyze-portfolio.
+"""
+import asyncio
+import json
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from core.config import settings
+from core.logging import get_logger
+from services.holdings_service import holdings_service
+from services.nav_service import nav_service
+from services.quote_table import QuoteTable, quote_table
+from utils.portfolio_matrix import quote_symbol
+
+logger = get_logger("PortfolioStream")
+
+# Fund fields pushed to the dashboard
+STREAM_FIELDS = (
+    "current_nav", "current_value", "pnl", "pnl_pct", "day_pnl", "day_pnl_pct",
+    "last_updated", "note", "live_coverage",
+)
+
+
+def format_event(event: str, data: dict) -> str:
+    """One SSE frame."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+def fund_views(result: dict) -> Tuple[Dict[str, dict], dict]:
+    """Streamed fields per fund_id plus totals from a portfolio summary."""
+    funds = {
+        str(f["fund_id"]): {k: f.get(k) for k in STREAM_FIELDS}
+        for f in result.get("funds", []) if f.get("fund_id")
+    }
+    return funds, dict(result.get("totals") or {})
+
+
+def diff_views(prev: Dict[str, dict], current: Dict[str, dict]) -> Tuple[Dict[str, dict], List[str]]:
+    """Changed fields per fund (new funds in full) and the fund_ids that disappeared."""
+    changed = {}
+    for fund_id, view in current.items():
+        old = prev.get(fund_id)
+        if old is None:
+            changed[fund_id] = view
+            continue
+        delta = {k: v for k, v in view.items() if old.get(k) != v}
+        if delta:
+            changed[fund_id] = delta
+    removed = [fund_id for fund_id in prev if fund_id not in current]
+    return changed, removed
+
+
+class StreamSummaryCache:
+    """
+    Thread-safe (user_id, fund_id) -> latest stream computation, shared by every open
+    connection of that user/fund so several dashboards cost one recompute per quote move.
+
+    Entries are {"result", "symbols", "quote_version", "computed_at"} built by the stream.
+    A key lives while at least one connection is attached; concurrent refreshes of the
+    same key share one computation.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, dict] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._refs: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.computations = 0
+
+    def attach(self, key: Hashable):
+        with self._lock:
+            self._refs[key] = self._refs.get(key, 0) + 1
+
+    def detach(self, key: Hashable):
+        """Drops the key's entry once its last connection has closed."""
+        with self._lock:
+            refs = self._refs.get(key, 0) - 1
+            if refs > 0:
+                self._refs[key] = refs
+                return
+            self._refs.pop(key, None)
+            self._entries.pop(key, None)
+            self._key_locks.pop(key, None)
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def refresh(self, key: Hashable, seen: Optional[dict], build: Callable[[], dict]) -> dict:
+        """
+        Replaces the entry the caller saw (`seen`) with build(), unless another connection
+        already replaced it while this one waited, in which case that newer entry is returned.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not seen:
+                    return entry
+
+            self.computations += 1
+            entry = build()
+            with self._lock:
+                if key in self._refs:
+                    self._entries[key] = entry
+            return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "connections": sum(self._refs.values()),
+                "computations": self.computations,
+            }
+
+
+# Singleton instance
+stream_summaries = StreamSummaryCache()
+
+
+class PortfolioStream:
+    """
+    Per-connection SSE generator.
+
+    Recomputes when a quote of one of the user's own symbols was stored again (or
+    every refresh_interval even if not, so quotes past their TTL get refreshed), never
+    more often than min_interval, and sends a comment heartbeat when idle so proxies
+    keep the connection open. The computation itself is shared through `summaries`
+    with the user's other connections; each connection diffs against what it sent.
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        fund_id: Optional[str] = None,
+        compute: Callable[[], dict] = None,
+        symbols: Callable[[], Iterable[str]] = None,
+        table: QuoteTable = None,
+        summaries: StreamSummaryCache = None,
+        min_interval: float = None,
+        refresh_interval: float = None,
+        heartbeat: float = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.user_id = user_id
+        self.fund_id = fund_id
+        self._compute = compute or self._default_compute
+        self._symbols = symbols or self._default_symbols
+        self._table = table if table is not None else quote_table
+        self._summaries = summaries if summaries is not None else stream_summaries
+        self.min_interval = min_interval if min_interval is not None else settings.PORTFOLIO_STREAM_MIN_INTERVAL_SECONDS
+        self.refresh_interval = refresh_interval if refresh_interval is not None else settings.PORTFOLIO_STREAM_REFRESH_SECONDS
+        self.heartbeat = heartbeat if heartbeat is not None else settings.PORTFOLIO_STREAM_HEARTBEAT_SECONDS
+        self._clock = clock
+
+    def _default_compute(self) -> dict:
+        if self.fund_id:
+            res = nav_service.calculate_pnl(self.fund_id, self.user_id)
+            return {"funds": [] if res.get("error") else [res], "totals": {}}
+        return nav_service.calculate_portfolio_summary(self.user_id)
+
+    def _default_symbols(self) -> Iterable[str]:
+        """Quote symbols of the streamed holdings, whose quote updates make the stream recompute."""
+        if self.fund_id:
+            doc = holdings_service.get_holdings(self.fund_id, self.user_id)
+            docs = [doc] if doc else []
+        else:
+            docs = holdings_service.get_user_holdings_docs(self.user_id)
+        return {sym for d in docs for sym in map(quote_symbol, d.get("holdings", [])) if sym}
+
+    def _build_entry(self) -> dict:
+        result = self._compute()
+        symbols = tuple(self._symbols())
+        return {
+            "result": result,
+            "symbols": symbols,
+            # Read after the compute: quotes it fetched itself must not trigger the next one
+            "quote_version": self._table.version_of(symbols),
+            "computed_at": self._clock(),
+        }
+
+    def _due(self, entry: Optional[dict], now: float) -> bool:
+        return (
+            entry is None
+            or now - entry["computed_at"] >= self.refresh_interval
+            or self._table.version_of(entry["symbols"]) != entry["quote_version"]
+        )
+
+    async def events(self) -> AsyncIterator[str]:
+        key = (self.user_id, self.fund_id)
+        self._summaries.attach(key)
+        try:
+            funds: Dict[str, dict] = {}
+            totals: dict = {}
+            snapshot_sent = False
+            sent_entry = None
+            last_attempt = None
+            last_sent = self._clock()
+            poll = min(self.min_interval, 0.5)
+
+            while True:
+                now = self._clock()
+                entry = self._summaries.get(key)
+                throttled = (
+                    (last_attempt is not None and now - last_attempt < self.min_interval)
+                    or (entry is not None and now - entry["computed_at"] < self.min_interval)
+                )
+                if self._due(entry, now) and not throttled:
+                    last_attempt = now
+                    try:
+                        entry = await asyncio.to_thread(self._summaries.refresh, key, entry, self._build_entry)
+                    except Exception as e:
+                        logger.error(f"Portfolio stream compute failed for user {self.user_id}: {e}")
+
+                if entry is not None and entry is not sent_entry:
+                    sent_entry = entry
+                    new_funds, new_totals = fund_views(entry["result"])
+                    if not snapshot_sent:
+                        frame = format_event("snapshot", {"funds": new_funds, "totals": new_totals})
+                        snapshot_sent = True
+                    else:
+                        changed, removed = diff_views(funds, new_funds)
+                        total_delta = {k: v for k, v in new_totals.items() if totals.get(k) != v}
+                        frame = None
+                        if changed or removed or total_delta:
+                            frame = format_event("delta", {"funds": changed, "removed": removed, "totals": total_delta})
+                    funds, totals = new_funds, new_totals
+                    if frame:
+                        yield frame
+                        last_sent = self._clock()
+                elif now - last_sent >= self.heartbeat:
+                    yield ": keep-alive\n\n"
+                    last_sent = now
+                await asyncio.sleep(poll)
+        finally:
+            self._summaries.detach(key)
@@ -0,0 +1,290 @@
+"""
+Quote Table - Process-wide cache of live percent changes keyed by exchange-qualified symbol.
+
+Every fund of every user reads the same table, so a symbol held by many funds
+(most large caps) is fetched from upstream at most once per freshness window.
+Plain symbols are keyed as NSE cash-market symbols (RELIANCE -> NSE:RELIANCE-EQ).
+Symbols that could not be priced are remembered too, so a dead symbol is not
+retried on every request inside the window.
+
+When the streaming market feed is attached, ticks are written here as well;
+streamed entries stay fresh for as long as the feed reports itself live.
+Listeners are told about every stored quote, so dependants can update
+incrementally instead of re-reading the table.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger("QuoteTable")
+
+# How long a request waits for another thread's in-flight fetch of the same symbol
+_INFLIGHT_WAIT_SECONDS = 30
+
+
+def qualify_symbol(symbol: str) -> str:
+    """Exchange-qualified key for a holding symbol (RELIANCE / RELIANCE.NS -> NSE:RELIANCE-EQ)."""
+    symbol = (symbol or "").upper().strip()
+    if ":" in symbol:
+        return symbol
+    if symbol.endswith(".NS") or symbol.endswith(".BO"):
+        symbol = symbol[:-3]
+    if symbol.endswith("-EQ"):
+        symbol = symbol[:-3]
+    return f"NSE:{symbol}-EQ"
+
+
+def nse_plain_symbol(symbol: str) -> Optional[str]:
+    """
+    Plain NSE trading symbol for NSE's own APIs (NSE:BAJAJ-AUTO-EQ / TCS.NS -> BAJAJ-AUTO / TCS);
+    None for listings on other exchanges.
+    """
+    symbol = (symbol or "").upper().strip()
+    if ":" in symbol:
+        exchange, _, name = symbol.partition(":")
+        if exchange != "NSE" or "-" not in name:
+            return None
+        return name.rsplit("-", 1)[0] or None
+    if symbol.endswith(".BO"):
+        return None
+    if symbol.endswith(".NS"):
+        symbol = symbol[:-3]
+    if symbol.endswith("-EQ"):
+        symbol = symbol[:-3]
+    return symbol or None
+
+
+class QuoteTable:
+    """
+    Thread-safe symbol -> percent change table with a short TTL.
+
+    get_or_fetch() serves fresh entries from memory and fetches only the stale
+    ones; concurrent callers asking for the same stale symbol share one fetch.
+    `generation` increases whenever new quotes are stored, so dependants can
+    tell cheaply whether anything changed; each entry keeps the generation it was
+    stored at, so version_of() tells whether any of a given set of symbols changed.
+    record_stores() tells a caller which of those stores its own fetches made.
+    """
+
+    def __init__(self, ttl_seconds: float = None, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.QUOTE_TTL_SECONDS
+        self._clock = clock
+        self._entries: Dict[str, dict] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stream_live: Callable[[], bool] = lambda: False
+        self._listeners: List[Callable[[Dict[str, Optional[float]], int], None]] = []
+        self._tick_listeners: List[Callable[[Dict[str, Optional[float]], int], None]] = []
+        self._release_listeners: List[Callable[[List[str]], None]] = []
+        self._recorders = threading.local()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    def _fresh(self, entry: Optional[dict], now: float) -> bool:
+        if entry is None:
+            return False
+        if entry.get("streamed") and self._stream_live():
+            return True
+        return now - entry["fetched_at"] < self.ttl_seconds
+
+    def attach_stream(self, is_live: Callable[[], bool]):
+        """Registers the streaming feed's liveness check (see put_tick)."""
+        self._stream_live = is_live
+
+    def is_streaming(self) -> bool:
+        """True while the attached streaming feed keeps streamed entries fresh."""
+        return bool(self._stream_live())
+
+    def add_listener(self, callback: Callable[[Dict[str, Optional[float]], int], None]):
+        """
+        Registers callback(updates, generation), called after every store with the
+        exchange-qualified symbol -> pct (None = unpriced) just written.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def add_tick_listener(self, callback: Callable[[Dict[str, Optional[float]], int], None]):
+        """Like add_listener(), but called only for streamed ticks (put_tick), never for fetched quotes."""
+        self._tick_listeners.append(callback)
+
+    def add_release_listener(self, callback: Callable[[List[str]], None]):
+        """Registers callback(symbols), called by release_stream() with the exchange-qualified symbols released."""
+        self._release_listeners.append(callback)
+
+    def _notify(self, updates: Dict[str, Optional[float]], generation: int, listeners=None):
+        for callback in list(listeners if listeners is not None else self._listeners):
+            try:
+                callback(updates, generation)
+            except Exception as e:
+                logger.warning(f"Quote listener failed: {e}")
+
+    def get(self, symbol: str) -> Optional[dict]:
+        """Returns the fresh entry {"pct", "source", "fetched_at"} for a symbol, or None."""
+        with self._lock:
+            entry = self._entries.get(qualify_symbol(symbol))
+            return dict(entry) if self._fresh(entry, self._clock()) else None
+
+    def put_many(self, quotes: Dict[str, Optional[float]], source: str = None):
+        """Stores quotes keyed by any symbol form; None records a failed lookup."""
+        if not quotes:
+            return
+        now = self._clock()
+        updates = {qualify_symbol(symbol): pct for symbol, pct in quotes.items()}
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            for key, pct in updates.items():
+                self._entries[key] = {"pct": pct, "source": source, "fetched_at": now, "version": generation}
+        for stored in getattr(self._recorders, "active", ()):
+            stored.update(dict.fromkeys(updates, generation))
+        self._notify(updates, generation)
+
+    def put_tick(self, symbol: str, pct: Optional[float], ltp: Optional[float] = None):
+        """Stores a streamed tick; it does not expire while the attached stream is live."""
+        now = self._clock()
+        key = qualify_symbol(symbol)
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            self._entries[key] = {
+                "pct": pct, "ltp": ltp, "source": "stream", "fetched_at": now, "streamed": True,
+                "version": generation,
+            }
+        self._notify({key: pct}, generation, self._listeners + self._tick_listeners)
+
+    def version_of(self, symbols: Iterable[str]) -> int:
+        """Latest generation at which any of the symbols was stored (0 if none is in the table)."""
+        with self._lock:
+            return max(
+                (entry["version"] for entry in map(self._entries.get, map(qualify_symbol, symbols)) if entry is not None),
+                default=0,
+            )
+
+    def versions_of(self, symbols: Iterable[str]) -> Tuple[int, ...]:
+        """Generation each symbol was last stored at (0 where it is not in the table), in order."""
+        with self._lock:
+            return tuple(
+                entry["version"] if entry is not None else 0
+                for entry in map(self._entries.get, map(qualify_symbol, symbols))
+            )
+
+    @contextmanager
+    def record_stores(self) -> Iterator[Dict[str, int]]:
+        """
+        Collects qualified symbol -> generation for every put_many() made by this thread
+        inside the block (its own fetches), as opposed to stores by other threads or ticks.
+        """
+        stored: Dict[str, int] = {}
+        active = getattr(self._recorders, "active", None)
+        if active is None:
+            active = self._recorders.active = []
+        active.append(stored)
+        try:
+            yield stored
+        finally:
+            active.remove(stored)
+
+    def release_stream(self, symbols: Iterable[str]):
+        """Returns entries of symbols no longer streamed to normal TTL expiry."""
+        released = [qualify_symbol(symbol) for symbol in symbols]
+        with self._lock:
+            for key in released:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["streamed"] = False
+        for callback in list(self._release_listeners):
+            try:
+                callback(released)
+            except Exception as e:
+                logger.warning(f"Quote release listener failed: {e}")
+
+    def get_or_fetch(
+        self,
+        symbols: Iterable[str],
+        fetcher: Callable[[List[str]], Dict[str, Optional[float]]],
+        source: str = None,
+    ) -> Dict[str, float]:
+        """
+        Returns {symbol: pct} for the requested symbols (as passed in) that have a quote.
+        fetcher(symbols) is called at most once, with only the symbols that are neither
+        fresh in the table nor already being fetched by another thread.
+        """
+        symbols = [s for s in dict.fromkeys(symbols) if s]
+        keys = {s: qualify_symbol(s) for s in symbols}
+
+        to_fetch: List[str] = []  # symbols this call fetches
+        waits: Dict[str, threading.Event] = {}  # key -> other thread's in-flight fetch
+        claimed: Dict[str, threading.Event] = {}
+        with self._lock:
+            started = self._clock()
+            for sym in symbols:
+                key = keys[sym]
+                if self._fresh(self._entries.get(key), started):
+                    self.hits += 1
+                    continue
+                self.misses += 1
+                if key in claimed or key in waits:
+                    continue
+                event = self._inflight.get(key)
+                if event is not None:
+                    waits[key] = event
+                else:
+                    claimed[key] = self._inflight[key] = threading.Event()
+                    to_fetch.append(sym)
+
+        if to_fetch:
+            try:
+                self.fetches += 1
+                fetched = fetcher(to_fetch) or {}
+                # Symbols the fetcher could not price are remembered as None for this window
+                self.put_many({sym: fetched.get(sym) for sym in to_fetch}, source=source)
+            except Exception as e:
+                logger.warning(f"Quote fetch failed for {len(to_fetch)} symbols: {e}")
+            finally:
+                with self._lock:
+                    for key, event in claimed.items():
+                        self._inflight.pop(key, None)
+                        event.set()
+
+        for event in waits.values():
+            event.wait(_INFLIGHT_WAIT_SECONDS)
+
+        # Entries from a previous window are not served, even if this round's fetch failed
+        result: Dict[str, float] = {}
+        with self._lock:
+            for sym in symbols:
+                entry = self._entries.get(keys[sym])
+                if self._fresh(entry, started) and entry["pct"] is not None:
+                    result[sym] = entry["pct"]
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "generation": self.generation,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "fetches": self.fetches,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Singleton instance
+quote_table = QuoteTable()
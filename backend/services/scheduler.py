@@ -0,0 +1,166 @@
+"""
+Scheduler - In-process asyncio background jobs.
+
+Each job is a plain (blocking) function paired with a trigger that says when it
+should fire next. Jobs run in a worker thread so the event loop keeps serving
+requests, and a failing run is logged and retried at the next fire time.
+
+Triggers are pluggable: anything with next_fire_time(after) -> datetime works.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from core.logging import get_logger
+from utils.date_utils import IST, get_current_ist_time, is_trading_day
+
+logger = get_logger("Scheduler")
+
+# Long sleeps are split so clock jumps (suspend/resume, NTP) are noticed quickly
+_MAX_SLEEP_SECONDS = 300
+
+
+def parse_times(values: Iterable[str]) -> list:
+    """Parses "HH:MM" strings (e.g. from settings) into time objects, skipping blanks."""
+    times = []
+    for value in values:
+        value = (value or "").strip()
+        if value:
+            hour, minute = value.split(":")
+            times.append(time(int(hour), int(minute)))
+    return times
+
+
+class DailyTimesTrigger:
+    """Fires at fixed wall-clock times every day (IST by default)."""
+
+    def __init__(self, times: Iterable[time], tz=IST, trading_days_only: bool = False):
+        self.times = sorted(times)
+        if not self.times:
+            raise ValueError("DailyTimesTrigger needs at least one time")
+        self.tz = tz
+        self.trading_days_only = trading_days_only
+
+    def next_fire_time(self, after: datetime) -> datetime:
+        after = after.astimezone(self.tz)
+        day = after.date()
+        # Bounded search: at most a couple of weeks of holidays/weekends
+        for _ in range(15):
+            if not self.trading_days_only or is_trading_day(day):
+                for t in self.times:
+                    candidate = self.tz.localize(datetime.combine(day, t))
+                    if candidate > after:
+                        return candidate
+            day += timedelta(days=1)
+        raise RuntimeError("No fire time found in the next 15 days")
+
+
+class IntervalTrigger:
+    """Fires every `interval` after the previous fire time."""
+
+    def __init__(self, interval: timedelta):
+        if interval.total_seconds() <= 0:
+            raise ValueError("IntervalTrigger needs a positive interval")
+        self.interval = interval
+
+    def next_fire_time(self, after: datetime) -> datetime:
+        return after + self.interval
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    func: Callable[[], object]
+    trigger: object
+    next_run: Optional[datetime] = None
+    last_run: Optional[datetime] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    runs: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+
+class Scheduler:
+    """Runs registered jobs on their triggers inside the application's event loop."""
+
+    def __init__(self, clock: Callable[[], datetime] = get_current_ist_time):
+        self._clock = clock
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def add_job(self, name: str, func: Callable[[], object], trigger) -> ScheduledJob:
+        if name in self._jobs:
+            raise ValueError(f"Job '{name}' is already registered")
+        job = ScheduledJob(name=name, func=func, trigger=trigger)
+        self._jobs[name] = job
+        if self.running:
+            self._tasks[name] = asyncio.get_running_loop().create_task(self._job_loop(job))
+        return job
+
+    def start(self):
+        """Starts one task per job. Must be called from within the running event loop."""
+        loop = asyncio.get_running_loop()
+        for name, job in self._jobs.items():
+            if name not in self._tasks:
+                self._tasks[name] = loop.create_task(self._job_loop(job))
+        logger.info(f"Scheduler started with {len(self._jobs)} job(s)")
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Scheduler stopped")
+
+    async def run_job(self, name: str):
+        """Runs a job now (in a worker thread). Overlapping runs of the same job are skipped."""
+        job = self._jobs[name]
+        if job.lock.locked():
+            logger.warning(f"Job '{name}' is still running, skipping this run")
+            return
+        async with job.lock:
+            started = self._clock()
+            try:
+                await asyncio.to_thread(job.func)
+                job.last_error = None
+            except Exception as e:
+                job.last_error = str(e)
+                logger.error(f"Job '{name}' failed: {e}", exc_info=True)
+            job.last_run = started
+            job.last_duration = (self._clock() - started).total_seconds()
+            job.runs += 1
+            logger.info(f"Job '{name}' finished in {job.last_duration:.2f}s")
+
+    async def _job_loop(self, job: ScheduledJob):
+        while True:
+            job.next_run = job.trigger.next_fire_time(self._clock())
+            logger.info(f"Job '{job.name}' next run at {job.next_run}")
+            while True:
+                delay = (job.next_run - self._clock()).total_seconds()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(min(delay, _MAX_SLEEP_SECONDS))
+            await self.run_job(job.name)
+
+    def status(self) -> list:
+        return [
+            {
+                "name": job.name,
+                "next_run": job.next_run.isoformat() if job.next_run else None,
+                "last_run": job.last_run.isoformat() if job.last_run else None,
+                "last_duration": job.last_duration,
+                "last_error": job.last_error,
+                "runs": job.runs,
+            }
+            for job in self._jobs.values()
+        ]
+
+
+# Singleton instance
+scheduler = Scheduler()
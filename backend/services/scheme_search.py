@@ -0,0 +1,254 @@
+"""
+Scheme Search - Local fund-name lookup over every AMFI scheme.
+
+Auto-lookup on upload used to send each fund name to the mfapi search endpoint
+and score the hits with difflib. The scheme names now live in an in-memory index
+built from the AMFI scheme list (the 'amfi_navs' collection, or NAVAll itself
+when that is empty) and rebuilt daily after the NAVAll ingestion:
+
+ - token postings: word -> scheme ids, weighted by rarity (IDF), pick candidates;
+ - trigram postings: trigram -> vocabulary words, map misspelt or abbreviated
+   query words ("flexicap", "nasdaq100") onto indexed words;
+ - only the best few candidates get the difflib score plus the Direct / Growth /
+   IDCW heuristics, so a lookup needs no network call and under a millisecond.
+"""
+import difflib
+import heapq
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.logging import get_logger
+
+logger = get_logger("SchemeSearch")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Words in more than this share of schemes ("fund", "plan", "direct", ...) do not pick
+# candidates (the final score still sees them)
+_COMMON_WORD_SHARE = 0.1
+# Shortlist re-ranked on every query word, and the part of it that gets the difflib score
+_CANDIDATES = 48
+_SCORED = 6
+# Trigram similarity (Dice) for a query word to stand in for an indexed word
+_MIN_WORD_SIMILARITY = 0.5
+_MAX_SIMILAR_WORDS = 3
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _trigrams(word: str) -> set:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _name_bias(name: str) -> float:
+    """Query-independent part of the scheme-name heuristics."""
+    bias = 0.0
+    if "Direct" in name: bias += 0.05
+    if "Growth" in name: bias += 0.05
+    if "Regular" in name: bias -= 0.05
+    if "IDCW" in name or "Dividend" in name: bias -= 0.05
+    return bias
+
+
+def score_scheme_name(query: str, name: str) -> float:
+    """difflib similarity of query and scheme name, nudged towards Direct / Growth plans."""
+    ratio = difflib.SequenceMatcher(None, query.lower(), name.lower()).ratio()
+    ratio += _name_bias(name)
+    # Strict Penalty for 'Bonus' unless query has it
+    if "Bonus" in name and "Bonus" not in query: ratio -= 0.2
+    return ratio
+
+
+class _Index:
+    """Immutable postings over one scheme list; rebuilt whole on refresh."""
+
+    def __init__(self, schemes: Iterable[Tuple[str, str]]):
+        self.codes: List[str] = []
+        self.names: List[str] = []
+        seen = set()
+        for code, name in schemes:
+            code, name = str(code).strip(), (name or "").strip()
+            if code and name and code not in seen:
+                seen.add(code)
+                self.codes.append(code)
+                self.names.append(name)
+
+        # Space-padded word string per scheme, for cheap whole-word checks on candidates
+        self.keys = [f" {' '.join(_words(name))} " for name in self.names]
+
+        # Postings list likelier picks (Direct / Growth, no Bonus) first; candidates with
+        # equal weights keep this order
+        prior = [_name_bias(name) - (0.2 if "Bonus" in name else 0.0) for name in self.names]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for doc in sorted(range(len(self.names)), key=prior.__getitem__, reverse=True):
+            for word in set(self.keys[doc].split()):
+                postings[word].append(doc)
+        self.postings: Dict[str, Tuple[int, ...]] = {w: tuple(docs) for w, docs in postings.items()}
+
+        total = len(self.names)
+        self.idf = {w: math.log(1 + total / len(docs)) for w, docs in self.postings.items()}
+        self.common_df = max(1, int(total * _COMMON_WORD_SHARE))
+
+        grams: Dict[str, List[str]] = defaultdict(list)
+        self.gram_counts: Dict[str, int] = {}
+        for word in self.postings:
+            word_grams = _trigrams(word)
+            self.gram_counts[word] = len(word_grams)
+            for gram in word_grams:
+                grams[gram].append(word)
+        self.grams: Dict[str, Tuple[str, ...]] = {g: tuple(words) for g, words in grams.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _similar_words(self, word: str) -> List[Tuple[str, float]]:
+        """Indexed words sharing enough trigrams with an unknown query word, with their Dice similarity."""
+        query_grams = _trigrams(word)
+        hits: Dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for candidate in self.grams.get(gram, ()):
+                hits[candidate] += 1
+        similar = []
+        for candidate, shared in hits.items():
+            similarity = 2 * shared / (len(query_grams) + self.gram_counts[candidate])
+            if similarity >= _MIN_WORD_SIMILARITY:
+                similar.append((candidate, similarity))
+        return heapq.nlargest(_MAX_SIMILAR_WORDS, similar, key=lambda x: x[1])
+
+    def candidates(self, query: str) -> List[int]:
+        """Scheme ids ranked by the summed IDF of the query words they contain, best first."""
+        terms: List[Tuple[str, float]] = []
+        for word in dict.fromkeys(_words(query)):
+            if word in self.postings:
+                terms.append((word, 1.0))
+            else:
+                terms.extend(self._similar_words(word))
+
+        rare = [t for t in terms if len(self.postings[t[0]]) <= self.common_df]
+        common = [t for t in terms if len(self.postings[t[0]]) > self.common_df]
+        if not rare:
+            rare, common = common, []
+
+        # Only rare words walk their postings ...
+        weights: Dict[int, float] = {}
+        for word, similarity in rare:
+            weight = self.idf[word] * similarity
+            for doc in self.postings[word]:
+                weights[doc] = weights.get(doc, 0.0) + weight
+        ranked = sorted(weights, key=weights.get, reverse=True)[:_CANDIDATES]
+
+        # ... common ones ("fund", "direct", "growth") only re-rank the shortlist
+        if common:
+            for doc in ranked:
+                key = self.keys[doc]
+                weights[doc] += sum(self.idf[w] * s for w, s in common if f" {w} " in key)
+            ranked.sort(key=weights.get, reverse=True)
+        return ranked[:_SCORED]
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        scored = [
+            {"schemeCode": self.codes[doc], "schemeName": self.names[doc], "score": score_scheme_name(query, self.names[doc])}
+            for doc in self.candidates(query)
+        ]
+        scored.sort(key=lambda x: x["score"], reverse=True)
+        return scored[:limit]
+
+
+def _load_amfi_schemes() -> List[Tuple[str, str]]:
+    """Scheme list from the last NAVAll ingestion; straight from AMFI if nothing is stored yet."""
+    from services.amfi_service import amfi_service
+
+    schemes = amfi_service.list_schemes()
+    if not schemes:
+        schemes = [(row["scheme_code"], row["scheme_name"]) for row in amfi_service.iter_navall()]
+    return schemes
+
+
+class SchemeSearchIndex:
+    """
+    Thread-safe scheme-name search over the AMFI scheme list.
+
+    The index is rebuilt at most once per TTL and swapped in whole; a stale index keeps
+    answering while a background refresh builds the next one. A failed build keeps the
+    previous index and is retried after retry_seconds. Before the first index exists,
+    searches made while a refresh is running return [] instead of waiting for it.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[Tuple[str, str]]] = None,
+        ttl_seconds: float = 24 * 60 * 60,
+        retry_seconds: float = 5 * 60,
+    ):
+        self._loader = loader or _load_amfi_schemes
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self._index: Optional[_Index] = None
+        self._expires_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index) if self._index else 0
+
+    def search(self, query: str, limit: int = 5) -> List[dict]:
+        """Top matches for a fund name: [{schemeCode, schemeName, score}], best first."""
+        index = self._current()
+        if not index or not (query or "").strip():
+            return []
+        return index.search(query, limit)
+
+    def _current(self) -> Optional[_Index]:
+        if time.monotonic() >= self._expires_at:
+            if self._index is None:
+                # The warm-start download may take a while; callers fall back (mfapi) meanwhile
+                if self._refresh_lock.locked():
+                    return None
+                self.refresh()
+            elif not self._refresh_lock.locked():
+                self.refresh_in_background()
+        return self._index
+
+    def refresh(self, force: bool = False) -> int:
+        """Rebuilds the index from the scheme list. Returns the number of schemes indexed."""
+        with self._refresh_lock:
+            # Another thread may have refreshed while this one waited
+            if not force and time.monotonic() < self._expires_at:
+                return len(self)
+            started = time.perf_counter()
+            try:
+                index = _Index(self._loader())
+            except Exception as e:
+                logger.error(f"Scheme list unavailable: {e}")
+                index = None
+
+            if index:
+                self._index = index
+                self._expires_at = time.monotonic() + self.ttl_seconds
+                logger.info(f"Scheme search index built: {len(index)} schemes in {time.perf_counter() - started:.2f}s")
+            else:
+                logger.warning("Scheme list empty; keeping the previous search index")
+                self._expires_at = time.monotonic() + self.retry_seconds
+            return len(self)
+
+    def warm_start(self):
+        """Startup hook: builds the index in the background so the first upload does not wait."""
+        self.refresh_in_background()
+
+    def refresh_in_background(self, force: bool = False):
+        threading.Thread(target=self.refresh, args=(force,), name="scheme-search-refresh", daemon=True).start()
+
+    def clear(self):
+        with self._refresh_lock:
+            self._index = None
+            self._expires_at = 0.0
+
+
+# Singleton instance
+scheme_search_index = SchemeSearchIndex()
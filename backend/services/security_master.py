@@ -0,0 +1,285 @@
+"""
+Security Master - One ISIN-keyed table of every listed equity.
+
+Merges the three symbol sources used for holdings resolution:
+ - NSE EQUITY_L (authoritative NSE symbol / series)
+ - FYERS NSE_CM (tradable NSE tickers, incl. listings missing from EQUITY_L)
+ - FYERS BSE_CM (BSE tickers for BSE-only holdings)
+into ISIN -> {nse, nse_series, bse, fyers_nse, fyers_bse, name}. The merged
+table is saved as a gzipped JSON snapshot, so a restart loads it from disk in
+milliseconds; the downloads run in the background on a daily schedule (or when
+the snapshot is older than max_age_seconds).
+
+FYERS symbol master layout (CSV, no header; only these columns are used):
+    col 1: name, col 5: ISIN, col 9: ticker (NSE:RELIANCE-EQ), col 13: symbol (RELIANCE)
+"""
+import csv
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from core.config import settings
+from core.logging import get_logger
+from core.http_client import http_client
+from utils.common import FYERS_BSE_CM_URL, FYERS_NSE_CM_URL
+
+logger = get_logger("SecurityMaster")
+
+SNAPSHOT_VERSION = 1
+
+# Record fields, in snapshot column order
+FIELDS = ("nse", "nse_series", "bse", "fyers_nse", "fyers_bse", "name")
+
+# Preferred NSE series when FYERS lists several tickers for one ISIN
+_SERIES_RANK = {"EQ": 0, "BE": 1, "BZ": 2, "SM": 3, "ST": 4}
+
+_FYERS_NAME, _FYERS_ISIN, _FYERS_TICKER, _FYERS_SYMBOL = 1, 5, 9, 13
+
+
+def _clean_isin(value: str) -> Optional[str]:
+    value = (value or "").strip().upper()
+    return value if len(value) == 12 and value.isalnum() else None
+
+
+def parse_fyers_master(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """Stream-parses a FYERS symbol master. Yields {isin, ticker, symbol, name} for rows with an ISIN."""
+    for row in csv.reader(lines):
+        if len(row) <= _FYERS_SYMBOL:
+            continue
+        isin = _clean_isin(row[_FYERS_ISIN])
+        ticker = row[_FYERS_TICKER].strip().upper()
+        if not isin or ":" not in ticker:
+            continue
+        yield {
+            "isin": isin,
+            "ticker": ticker,
+            "symbol": row[_FYERS_SYMBOL].strip().upper() or None,
+            "name": row[_FYERS_NAME].strip() or None,
+        }
+
+
+def _series_of(ticker: str) -> str:
+    """NSE:BAJAJ-AUTO-EQ -> EQ"""
+    return ticker.rsplit("-", 1)[-1] if "-" in ticker else ""
+
+
+def merge_security_master(
+    nse_listings: Dict[str, Tuple[str, Optional[str]]],
+    fyers_nse: Iterable[Dict[str, str]],
+    fyers_bse: Iterable[Dict[str, str]],
+) -> Dict[str, dict]:
+    """
+    Merges NSE EQUITY_L listings (ISIN -> (symbol, series)) with FYERS NSE_CM and
+    BSE_CM rows into ISIN -> record. EQUITY_L wins for the NSE symbol / series.
+    """
+    records: Dict[str, dict] = {}
+
+    def record(isin):
+        return records.setdefault(isin, dict.fromkeys(FIELDS))
+
+    for row in fyers_nse:
+        rec = record(row["isin"])
+        current = rec["fyers_nse"]
+        if current is None or _SERIES_RANK.get(_series_of(row["ticker"]), 99) < _SERIES_RANK.get(_series_of(current), 99):
+            rec["fyers_nse"] = row["ticker"]
+            rec["nse"] = row["symbol"]
+            rec["nse_series"] = _series_of(row["ticker"]) or None
+        rec["name"] = rec["name"] or row["name"]
+
+    for row in fyers_bse:
+        rec = record(row["isin"])
+        if rec["fyers_bse"] is None:
+            rec["fyers_bse"] = row["ticker"]
+            rec["bse"] = row["symbol"]
+        rec["name"] = rec["name"] or row["name"]
+
+    for isin, (symbol, series) in nse_listings.items():
+        rec = record(isin)
+        symbol = symbol.strip().upper()
+        series = (series or "").strip().upper() or "EQ"
+        rec["nse"], rec["nse_series"] = symbol, series
+        rec["fyers_nse"] = f"NSE:{symbol}-{series}"
+
+    return records
+
+
+class SecurityMaster:
+    """
+    Thread-safe ISIN -> security record table with an on-disk snapshot.
+
+    The first lookup loads the snapshot (or, without one, downloads the sources once);
+    a stale snapshot keeps serving while a background refresh builds the new table,
+    which is swapped in whole and written back to disk.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str = None,
+        max_age_seconds: float = 24 * 60 * 60,
+        retry_seconds: float = 5 * 60,
+        sources=None,
+    ):
+        self.snapshot_path = Path(snapshot_path or settings.SECURITY_MASTER_PATH)
+        self.max_age_seconds = max_age_seconds
+        self.retry_seconds = retry_seconds
+        self._sources = sources
+        self._retry_at = 0.0
+        self._records: Optional[Dict[str, dict]] = None
+        self._nse_view: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._bse_view: Dict[str, str] = {}
+        self.built_at: Optional[float] = None
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    # ---------- lookups ----------
+
+    def records(self) -> Dict[str, dict]:
+        if not self._records and time.monotonic() >= self._retry_at:
+            self._warm_start()
+        return self._records or {}
+
+    def lookup(self, isin) -> Optional[dict]:
+        return self.records().get((isin or "").strip().upper())
+
+    def nse_listings(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        """ISIN -> (NSE symbol, series) for every NSE-listed security."""
+        self.records()
+        return self._nse_view
+
+    def bse_symbols(self) -> Dict[str, str]:
+        """ISIN -> FYERS BSE symbol (e.g. 'BSE:SBICARD-A')."""
+        self.records()
+        return self._bse_view
+
+    # ---------- loading ----------
+
+    def _swap(self, records: Dict[str, dict], built_at: float):
+        nse_view = {isin: (r["nse"], r["nse_series"]) for isin, r in records.items() if r["nse"]}
+        bse_view = {isin: r["fyers_bse"] for isin, r in records.items() if r["fyers_bse"]}
+        # Views first, records last: a reader that sees the new records also sees their views
+        self._nse_view, self._bse_view = nse_view, bse_view
+        self.built_at = built_at
+        self._records = records
+
+    def _warm_start(self):
+        with self._load_lock:
+            if self._records or time.monotonic() < self._retry_at:
+                return
+            if self.load_snapshot():
+                if time.time() - self.built_at > self.max_age_seconds:
+                    self.refresh_in_background()
+            else:
+                self.refresh()
+
+    def warm_start(self):
+        """Startup hook: loads the snapshot now; downloads in the background if it is missing or stale."""
+        with self._load_lock:
+            if not self._records and not self.load_snapshot():
+                self.refresh_in_background()
+                return
+        if time.time() - (self.built_at or 0) > self.max_age_seconds:
+            self.refresh_in_background()
+
+    def load_snapshot(self) -> bool:
+        """Loads the on-disk snapshot. Returns False if it is missing or unreadable."""
+        started = time.perf_counter()
+        try:
+            with gzip.open(self.snapshot_path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != SNAPSHOT_VERSION:
+                return False
+            records = {isin: dict(zip(FIELDS, values)) for isin, values in payload["records"].items()}
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Security master snapshot unreadable ({self.snapshot_path}): {e}")
+            return False
+        self._swap(records, payload["built_at"])
+        logger.info(f"Security master loaded from snapshot: {len(records)} ISINs in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return True
+
+    def save_snapshot(self):
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "built_at": self.built_at,
+            "records": {isin: [rec[f] for f in FIELDS] for isin, rec in (self._records or {}).items()},
+        }
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp, self.snapshot_path)
+
+    def _download_sources(self):
+        if self._sources is not None:
+            return self._sources()
+
+        # Imported here: holdings_service resolves symbols through this module
+        from services.holdings_service import nse_isin_index
+
+        def fyers_rows(url):
+            with http_client.get(url, stream=True) as r:
+                r.raise_for_status()
+                return list(parse_fyers_master(r.iter_lines(decode_unicode=True)))
+
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="security-master") as pool:
+            nse = pool.submit(nse_isin_index.get, True)
+            fyers_nse = pool.submit(fyers_rows, FYERS_NSE_CM_URL)
+            fyers_bse = pool.submit(fyers_rows, FYERS_BSE_CM_URL)
+            return nse.result(), fyers_nse.result(), fyers_bse.result()
+
+    def refresh(self) -> Dict[str, int]:
+        """Downloads and merges every source, swaps the table in and writes the snapshot."""
+        seen = self.built_at
+        with self._refresh_lock:
+            if self._records and self.built_at != seen:
+                # Another refresh finished while this one waited
+                return {"isins": len(self._records)}
+            started = time.perf_counter()
+            try:
+                nse, fyers_nse, fyers_bse = self._download_sources()
+            except Exception as e:
+                logger.error(f"Security master refresh failed: {e}")
+                records = {}
+            else:
+                records = merge_security_master(nse, fyers_nse, fyers_bse)
+
+            if not records:
+                # Keep serving the current table; lookups retry an empty one after retry_seconds
+                self._retry_at = time.monotonic() + self.retry_seconds
+                logger.warning("Security master sources unavailable; keeping the current table")
+                return {"isins": len(self._records or {})}
+
+            self._swap(records, time.time())
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                logger.warning(f"Failed to write security master snapshot: {e}")
+            logger.info(
+                f"Security master refreshed: {len(records)} ISINs "
+                f"({len(self._nse_view)} NSE, {len(self._bse_view)} BSE) in {time.perf_counter() - started:.2f}s"
+            )
+            return {"isins": len(records), "nse": len(self._nse_view), "bse": len(self._bse_view)}
+
+    def refresh_in_background(self):
+        threading.Thread(target=self.refresh, name="security-master-refresh", daemon=True).start()
+
+    def run_scheduled_refresh(self):
+        """Scheduler job: rebuild the table from today's source files."""
+        return self.refresh()
+
+    def stats(self) -> dict:
+        return {
+            "isins": len(self._records or {}),
+            "built_at": datetime.fromtimestamp(self.built_at).isoformat() if self.built_at else None,
+        }
+
+
+# Singleton instance
+security_master = SecurityMaster()
@@ -0,0 +1,198 @@
+"""
+yfinance Close Cache - Shared close-price panel for the historical D-1 fallback.
+
+Closes are kept in one date x ticker panel. Funds asking for the same target
+date at about the same time (e.g. the per-fund workers of a portfolio summary)
+are coalesced into a single yf.download over the union of their tickers;
+every later lookup only slices the panel.
+"""
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Set, Tuple
+
+from core.logging import get_logger
+
+logger = get_logger("YfCloseCache")
+
+# Download window around the target date: enough sessions back for the previous close
+_LOOKBACK_DAYS = 7
+_LOOKAHEAD_DAYS = 2  # yfinance end is exclusive, be generous
+
+_TZ_CACHE_DIR = Path(__file__).resolve().parents[1] / "logs" / "py-yfinance"
+_tz_cache_lock = threading.Lock()
+_tz_cache_set = False
+
+
+def _configure_yfinance(yf):
+    """
+    Points yfinance's timezone cache at a project-local directory, once per process.
+    Its default Windows cache dir fails to initialise if a file exists where it expects
+    a folder (e.g. %LOCALAPPDATA%\\py-yfinance).
+    """
+    global _tz_cache_set
+    with _tz_cache_lock:
+        if _tz_cache_set:
+            return
+        try:
+            _TZ_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            yf.set_tz_cache_location(str(_TZ_CACHE_DIR))
+        except Exception:
+            pass
+        _tz_cache_set = True
+
+
+def download_closes(tickers, start: date, end: date):
+    """One yf.download for all tickers; returns a date x ticker DataFrame of closes (may be empty)."""
+    import yfinance as yf
+    import pandas as pd
+
+    _configure_yfinance(yf)
+    data = yf.download(list(tickers), start=start, end=end, progress=False, threads=True, group_by='column')
+    if data is None or data.empty:
+        return pd.DataFrame()
+    # 'Close' may be a DataFrame or a MultiIndex DataFrame depending on tickers count
+    close_df = data["Close"] if "Close" in data else data
+    if isinstance(close_df, pd.Series):
+        close_df = close_df.to_frame(next(iter(tickers)))
+    close_df.index = pd.to_datetime(close_df.index).tz_localize(None).normalize()
+    return close_df
+
+
+class YfCloseCache:
+    """
+    Thread-safe close panel keyed by (ticker, date).
+
+    Tickers are fetched once per target date; concurrent requests for the same
+    target wait batch_window seconds for each other and share one download.
+    A ticker the download had no target-date close for (yfinance answers rate limits
+    with empty frames) is asked for again after miss_ttl seconds.
+    Rows older than max_age_days are dropped as the panel grows.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable = download_closes,
+        batch_window: float = 0.05,
+        max_age_days: int = 30,
+        wait_timeout: float = 60.0,
+        miss_ttl: float = 5 * 60,
+    ):
+        self._fetch = fetch
+        self.batch_window = batch_window
+        self.max_age_days = max_age_days
+        self.wait_timeout = wait_timeout
+        self.miss_ttl = miss_ttl
+        self._panel = None
+        # (ticker, target) -> monotonic time until which it is not fetched again
+        self._fetched: Dict[Tuple[str, date], float] = {}
+        self._pending: Dict[date, Set[str]] = {}
+        self._inflight: Dict[date, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.downloads = 0
+
+    def ensure(self, tickers: Iterable[str], target: date, timeout: float = None):
+        """
+        Makes sure each ticker's closes around target have been fetched (or found missing).
+        Waits at most timeout seconds (wait_timeout by default); a download still running
+        then finishes in the background for later lookups.
+        """
+        tickers = set(tickers)
+        give_up_at = time.monotonic() + (self.wait_timeout if timeout is None else timeout)
+        for _ in range(3):
+            with self._lock:
+                now = time.monotonic()
+                missing = {t for t in tickers if self._fetched.get((t, target), 0.0) <= now}
+                if not missing:
+                    return
+                self._pending.setdefault(target, set()).update(missing)
+                event = self._inflight.get(target)
+                if event is None:
+                    event = self._inflight[target] = threading.Event()
+                    threading.Thread(target=self._download, args=(target, event), name="yf-close-download", daemon=True).start()
+            # Tickers added after the leader took its batch go out in the next round
+            if not event.wait(max(0.0, give_up_at - time.monotonic())):
+                return
+
+    def _download(self, target: date, event: threading.Event):
+        try:
+            time.sleep(self.batch_window)  # let concurrent funds join the batch
+            with self._lock:
+                batch = self._pending.pop(target, set())
+            if not batch:
+                return
+            started = time.monotonic()
+            try:
+                closes = self._fetch(
+                    sorted(batch),
+                    target - timedelta(days=_LOOKBACK_DAYS),
+                    target + timedelta(days=_LOOKAHEAD_DAYS),
+                )
+            except Exception as e:
+                logger.error(f"yfinance download failed for {len(batch)} tickers: {e}")
+                return
+            self.downloads += 1
+            logger.info(f"yfinance closes for {len(batch)} tickers around {target} in {time.monotonic() - started:.2f}s")
+            with self._lock:
+                self._merge(closes)
+                hits = self._tickers_with_close(batch, target)
+                retry_at = time.monotonic() + self.miss_ttl
+                self._fetched.update(((t, target), float("inf") if t in hits else retry_at) for t in batch)
+        finally:
+            with self._lock:
+                self._inflight.pop(target, None)
+            event.set()
+
+    def _merge(self, closes):
+        import pandas as pd
+
+        if closes is None or closes.empty:
+            return
+        panel = closes if self._panel is None else closes.combine_first(self._panel)
+        cutoff = pd.Timestamp(date.today() - timedelta(days=self.max_age_days))
+        self._panel = panel[panel.index >= cutoff].sort_index()
+        self._fetched = {(t, d): until for (t, d), until in self._fetched.items() if pd.Timestamp(d) >= cutoff}
+
+    def _tickers_with_close(self, tickers: Iterable[str], target: date) -> Set[str]:
+        import pandas as pd
+
+        target_ts = pd.Timestamp(target)
+        if self._panel is None or target_ts not in self._panel.index:
+            return set()
+        row = self._panel.loc[target_ts]
+        return {t for t in tickers if t in row.index and pd.notna(row[t])}
+
+    def pct_changes(self, tickers: Iterable[str], target: date, timeout: float = None) -> Dict[str, float]:
+        """
+        Percent change of each ticker on target vs its previous cached close, fetching on a
+        miss for at most timeout seconds.
+        """
+        import pandas as pd
+
+        tickers = list(dict.fromkeys(tickers))
+        self.ensure(tickers, target, timeout)
+        with self._lock:
+            panel = self._panel
+        if panel is None:
+            return {}
+        target_ts = pd.Timestamp(target)
+        if target_ts not in panel.index:
+            return {}
+
+        cols = [t for t in tickers if t in panel.columns]
+        window = panel.loc[target_ts - pd.Timedelta(days=_LOOKBACK_DAYS):target_ts, cols]
+        if len(window) < 2:
+            return {}
+        prev = window.iloc[:-1].ffill().iloc[-1]
+        pct = ((window.iloc[-1] / prev - 1) * 100).replace([float("inf"), float("-inf")], float("nan"))
+        return {t: float(v) for t, v in pct.dropna().items()}
+
+    def clear(self):
+        with self._lock:
+            self._panel = None
+            self._fetched.clear()
+
+
+# Singleton instance
+yf_close_cache = YfCloseCache()
@@ -0,0 +1,70 @@
+"""
+AMFI NAVAll Ingestion Tests
+
+Parses the local NAVAll fixture (stand-in for the daily AMFI download) and
+checks that ingestion upserts one row per scheme in a single pass.
+"""
+
+import sys
+import os
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB BEFORE importing services
+sys.modules['db'] = MagicMock()
+
+from services.amfi_service import parse_navall, AmfiService
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "NAVAll_sample.txt")
+
+
+class TestNavAllParser(unittest.TestCase):
+
+    def setUp(self):
+        with open(FIXTURE, encoding="utf-8") as f:
+            self.rows = list(parse_navall(f))
+
+    def test_skips_headers_and_na_navs(self):
+        codes = [r["scheme_code"] for r in self.rows]
+        self.assertEqual(codes, ["119018", "119019", "122639", "145552"])
+
+    def test_row_fields(self):
+        row = self.rows[0]
+        self.assertEqual(row["nav"], 1245.871)
+        self.assertEqual(row["date"], date(2026, 10, 14))
+        self.assertEqual(row["isin_growth"], "INF179K01YV8")
+        self.assertIsNone(row["isin_reinvestment"])
+        self.assertEqual(row["fund_house"], "HDFC Mutual Fund")
+        self.assertEqual(row["category"], "Open Ended Schemes(Equity Scheme - Large Cap Fund)")
+
+    def test_section_headers_carry_forward(self):
+        fof = self.rows[-1]
+        self.assertEqual(fof["fund_house"], "Motilal Oswal Mutual Fund")
+        self.assertEqual(fof["date"], date(2026, 10, 13))
+
+
+class TestNavAllIngestion(unittest.TestCase):
+
+    def test_ingest_upserts_every_scheme_in_one_batch(self):
+        collection = MagicMock()
+        summary = AmfiService(collection=collection).ingest_navall(FIXTURE)
+
+        self.assertEqual(summary, {"schemes": 4, "latest_date": "14-10-2026"})
+        collection.bulk_write.assert_called_once()
+        ops = collection.bulk_write.call_args[0][0]
+        self.assertEqual(len(ops), 4)
+
+    def test_get_latest_nav_formats_date(self):
+        from datetime import datetime
+        collection = MagicMock()
+        collection.find_one.return_value = {"nav": 92.4415, "date": datetime(2026, 10, 14)}
+        nav = AmfiService(collection=collection).get_latest_nav("122639")
+        self.assertEqual(nav, {"nav": 92.4415, "date": "14-10-2026"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Bhavcopy Ingestion Tests
+
+Parses the local UDiFF fixture (stand-in for the exchange's end-of-day file)
+and checks that ingestion writes every close to the store in one pass.
+"""
+
+import sys
+import os
+import io
+import threading
+import time
+import unittest
+import zipfile
+import tempfile
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB BEFORE importing services
+sys.modules['db'] = MagicMock()
+
+from services.bhavcopy_service import parse_bhavcopy, BhavcopyService
+from services.close_store import ClosePriceStore
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "BhavCopy_NSE_CM_sample.csv")
+TRADE_DATE = date(2026, 10, 14)
+
+
+class TestBhavcopyParser(unittest.TestCase):
+
+    def setUp(self):
+        with open(FIXTURE, encoding="utf-8", newline="") as f:
+            self.rows = list(parse_bhavcopy(f))
+
+    def test_keys_rows_by_fyers_symbol(self):
+        symbols = [r["symbol"] for r in self.rows]
+        # The zero-close (untraded) row is skipped
+        self.assertEqual(symbols, ["NSE:TCS-EQ", "NSE:INFY-EQ", "NSE:BAJAJ-AUTO-EQ", "NSE:SMALLCO-BE"])
+
+    def test_row_fields(self):
+        row = self.rows[0]
+        self.assertEqual(row["date"], TRADE_DATE)
+        self.assertEqual(row["close"], 4105.5)
+        self.assertEqual(row["prev_close"], 4051.2)
+        self.assertEqual(row["isin"], "INE467B01029")
+
+
+class TestBhavcopyIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.closes = MagicMock()
+        self.state = MagicMock()
+        self.service = BhavcopyService(store=ClosePriceStore(collection=self.closes, state_collection=self.state))
+
+    def test_ingest_writes_every_row_in_one_batch(self):
+        summary = self.service.ingest(TRADE_DATE, source=FIXTURE)
+
+        self.assertEqual(summary, {"exchange": "NSE", "rows": 4, "date": "2026-10-14"})
+        self.closes.bulk_write.assert_called_once()
+        self.assertEqual(len(self.closes.bulk_write.call_args[0][0]), 4)
+        # Every ingested symbol is marked synced, so Fyers is not asked for it
+        self.assertEqual(len(self.state.bulk_write.call_args[0][0]), 4)
+
+    def test_reads_zipped_download(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.write(FIXTURE, "BhavCopy_NSE_CM_0_0_0_20261014_F_0000.csv")
+        with tempfile.NamedTemporaryFile(suffix=".csv.zip", delete=False) as f:
+            f.write(buf.getvalue())
+        try:
+            self.assertEqual(self.service.ingest(TRADE_DATE, source=f.name)["rows"], 4)
+        finally:
+            os.unlink(f.name)
+
+    def test_ensure_ingested_once_per_day(self):
+        with patch.object(self.service, "ingest", return_value={"rows": 4}) as mock_ingest:
+            self.assertEqual(self.service.ensure_ingested(TRADE_DATE, exchanges=("NSE",)), 4)
+            self.assertEqual(self.service.ensure_ingested(TRADE_DATE, exchanges=("NSE",)), 0)
+        mock_ingest.assert_called_once_with(TRADE_DATE, "NSE")
+
+    def test_failed_download_is_not_retried_immediately(self):
+        with patch.object(self.service, "ingest", side_effect=IOError("404")) as mock_ingest:
+            self.assertEqual(self.service.ensure_ingested(TRADE_DATE, exchanges=("NSE",)), 0)
+            self.service.ensure_ingested(TRADE_DATE, exchanges=("NSE",))
+        mock_ingest.assert_called_once()
+
+    def test_bounded_ingest_returns_at_timeout(self):
+        release = threading.Event()
+
+        def slow_ingest(trade_date, exchange):
+            release.wait(5)
+            return {"rows": 4}
+
+        with patch.object(self.service, "ingest", side_effect=slow_ingest) as mock_ingest:
+            started = time.monotonic()
+            self.assertEqual(self.service.ensure_ingested_within(TRADE_DATE, 0.05), 0)
+            self.assertLess(time.monotonic() - started, 1.0)
+            release.set()
+            # The download kept going in the background and is not started again
+            self.service.ensure_ingested_within(TRADE_DATE, 5)
+        self.assertEqual(mock_ingest.call_count, 2)  # NSE + BSE once each
+
+
+if __name__ == "__main__":
+    unittest.main()
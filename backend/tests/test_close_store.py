@@ -0,0 +1,177 @@
+"""
+Close Price Store Tests
+
+Verifies D-1 percent changes from stored closes, incremental and deadline-bound
+concurrent sync, and that NavService reads the store before asking Fyers for candles.
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing nav_service
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from services.close_store import ClosePriceStore
+from services.nav_service import NavService
+
+TARGET = date(2024, 1, 5)
+
+
+def close_rows(*rows):
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value = [
+        {"symbol": sym, "date": datetime(2024, 1, day), "close": close, **extra}
+        for sym, day, close, extra in rows
+    ]
+    return collection
+
+
+def sync_state(**checked):
+    state = MagicMock()
+    state.find.return_value = [
+        {"symbol": sym, "checked_through": datetime.combine(d, datetime.min.time())}
+        for sym, d in checked.items()
+    ]
+    return state
+
+
+class TestClosePriceStore(unittest.TestCase):
+
+    def test_pct_change_from_previous_close(self):
+        store = ClosePriceStore(collection=close_rows(
+            ("NSE:TCS-EQ", 4, 100.0, {}),
+            ("NSE:TCS-EQ", 5, 102.0, {}),
+            ("NSE:INFY-EQ", 5, 99.0, {"prev_close": 100.0}),
+            ("NSE:SBIN-EQ", 4, 50.0, {}),  # no close on the target date
+        ), state_collection=MagicMock())
+
+        result = store.pct_changes_on(["TCS", "NSE:INFY-EQ", "SBIN"], TARGET)
+
+        self.assertEqual(set(result), {"TCS", "NSE:INFY-EQ"})
+        self.assertAlmostEqual(result["TCS"], 2.0)
+        self.assertAlmostEqual(result["NSE:INFY-EQ"], -1.0)
+
+    def test_sync_fetches_only_unsynced_tail(self):
+        store = ClosePriceStore(collection=MagicMock(), state_collection=sync_state(**{"NSE:TCS-EQ": date(2024, 1, 3), "NSE:INFY-EQ": TARGET}))
+        fetch = MagicMock(side_effect=[[{"date": date(2024, 1, 4), "close": 10.0}], None])
+
+        written = store.sync(["NSE:TCS-EQ", "NSE:INFY-EQ", "NSE:SBIN-EQ"], TARGET, fetch)
+
+        self.assertEqual(written, 1)
+        self.assertEqual([c.args for c in fetch.call_args_list], [
+            ("NSE:TCS-EQ", date(2024, 1, 4), TARGET),
+            ("NSE:SBIN-EQ", date(2023, 12, 6), TARGET),  # first fill backfills
+        ])
+        # The failed SBIN fetch is not marked, so it is retried next time
+        self.assertEqual(store.state_collection.bulk_write.call_count, 1)
+
+    @patch('services.close_store.get_current_ist_time', return_value=datetime(2024, 1, 5, 15, 0))
+    def test_today_is_checked_only_through_returned_candles(self, _now):
+        store = ClosePriceStore(collection=MagicMock(), state_collection=sync_state(**{"NSE:TCS-EQ": date(2024, 1, 3)}))
+        # Today's candle is not published yet
+        fetch = MagicMock(return_value=[{"date": date(2024, 1, 4), "close": 10.0}])
+
+        store.sync(["NSE:TCS-EQ"], TARGET, fetch)
+
+        (ops,), _ = store.state_collection.bulk_write.call_args
+        self.assertEqual(ops[0]._doc["$max"]["checked_through"], datetime(2024, 1, 4))
+
+    def test_concurrent_sync_returns_at_deadline(self):
+        store = ClosePriceStore(collection=MagicMock(), state_collection=sync_state())
+        release = threading.Event()
+
+        def fetch(sym, start, end):
+            if sym != "FAST":
+                release.wait(5)
+            return [{"date": TARGET, "close": 10.0}]
+
+        started = time.monotonic()
+        written = store.sync(["FAST", "SLOW1", "SLOW2", "SLOW3"], TARGET, fetch, deadline=0.2, max_workers=4)
+        elapsed = time.monotonic() - started
+        release.set()
+
+        self.assertEqual(written, 1)
+        self.assertLess(elapsed, 1.0)
+
+
+class TestHistoricalChangeFromStore(unittest.TestCase):
+
+    HOLDINGS = [{"Symbol": "TCS", "Weight": 50}, {"Symbol": "INFY", "FyersSymbol": "NSE:INFY-EQ", "Weight": 50}]
+
+    @patch('services.nav_service.NavService._get_historical_portfolio_change_yfinance')
+    @patch('services.nav_service.fyers_service')
+    @patch('services.nav_service.close_price_store')
+    def test_covered_store_skips_fyers(self, mock_store, mock_fyers, mock_yf):
+        mock_store.pct_changes_on.return_value = {"TCS": 1.0, "NSE:INFY-EQ": 3.0}
+
+        change = NavService.get_historical_portfolio_change(self.HOLDINGS, datetime(2024, 1, 5))
+
+        self.assertAlmostEqual(change, 2.0)
+        mock_store.pct_changes_on.assert_called_once_with(["TCS", "NSE:INFY-EQ"], TARGET)
+        mock_store.sync.assert_not_called()
+        mock_yf.assert_not_called()
+
+    @patch('services.nav_service.NavService._get_historical_portfolio_change_yfinance')
+    @patch('services.nav_service.bhavcopy_service')
+    @patch('services.nav_service.fyers_service')
+    @patch('services.nav_service.close_price_store')
+    def test_missing_symbols_are_synced_then_reread(self, mock_store, mock_fyers, mock_bhav, mock_yf):
+        mock_fyers.is_authenticated.return_value = True
+        mock_bhav.ensure_ingested_within.return_value = 0  # not published
+        mock_store.pct_changes_on.side_effect = [{"TCS": 1.0}, {"TCS": 1.0, "NSE:INFY-EQ": 3.0}]
+        mock_store.sync.return_value = 5
+
+        change = NavService.get_historical_portfolio_change(self.HOLDINGS, TARGET)
+
+        self.assertAlmostEqual(change, 2.0)
+        args, kwargs = mock_store.sync.call_args
+        self.assertEqual(args, (["NSE:INFY-EQ"], TARGET, mock_fyers.get_daily_closes))
+        self.assertGreater(kwargs["deadline"], 0)
+        mock_yf.assert_not_called()
+
+    @patch('services.nav_service.NavService._get_historical_portfolio_change_yfinance')
+    @patch('services.nav_service.bhavcopy_service')
+    @patch('services.nav_service.fyers_service')
+    @patch('services.nav_service.close_price_store')
+    def test_bhavcopy_fills_gaps_before_fyers(self, mock_store, mock_fyers, mock_bhav, mock_yf):
+        mock_fyers.is_authenticated.return_value = True
+        mock_bhav.ensure_ingested_within.return_value = 2000
+        mock_store.pct_changes_on.side_effect = [{}, {"TCS": 1.0, "NSE:INFY-EQ": 3.0}]
+
+        self.assertAlmostEqual(NavService.get_historical_portfolio_change(self.HOLDINGS, TARGET), 2.0)
+        args, _ = mock_bhav.ensure_ingested_within.call_args
+        self.assertEqual(args[0], TARGET)
+        self.assertGreater(args[1], 0)  # bounded by the remaining budget
+        mock_store.sync.assert_not_called()
+
+    @patch('services.nav_service.NavService._get_historical_portfolio_change_yfinance')
+    @patch('services.nav_service.bhavcopy_service')
+    @patch('services.nav_service.fyers_service')
+    @patch('services.nav_service.close_price_store')
+    def test_deadline_returns_best_so_far_with_coverage(self, mock_store, mock_fyers, mock_bhav, mock_yf):
+        mock_fyers.is_authenticated.return_value = True
+        mock_bhav.ensure_ingested_within.return_value = 0
+        mock_store.pct_changes_on.return_value = {"TCS": 1.0}
+        mock_store.sync.side_effect = lambda *a, **kw: time.sleep(0.1) or 0
+        mock_yf.return_value = (None, 0.0)
+
+        change, coverage = NavService.estimate_historical_change(self.HOLDINGS, TARGET, deadline=0.05)
+
+        self.assertAlmostEqual(change, 1.0)
+        self.assertAlmostEqual(coverage, 0.5)
+        mock_yf.assert_not_called()
+        # Below the coverage bar the plain estimate reports nothing
+        self.assertIsNone(NavService.get_historical_portfolio_change(self.HOLDINGS, TARGET))
+
+
+if __name__ == "__main__":
+    unittest.main()
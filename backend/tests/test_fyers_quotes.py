@@ -0,0 +1,156 @@
+"""
+Fyers Quotes Tests
+
+Runs the async Fyers quote path against a fake async model and verifies that
+50-symbol batches go out concurrently under the shared rate limiter, that
+failed or timed-out batches do not sink the rest, and that quotes land in the
+quote table once, through get_or_fetch.
+"""
+
+import sys
+import os
+import asyncio
+import importlib.util
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.quote_table import QuoteTable
+from utils.rate_limit import TokenBucket
+
+# Other suites replace services.fyers_service in sys.modules; load the real module privately
+_spec = importlib.util.spec_from_file_location(
+    "fyers_service_under_test",
+    os.path.join(os.path.dirname(__file__), "..", "services", "fyers_service.py"),
+)
+fyers_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(fyers_module)
+
+
+class FakeAsyncModel:
+    """Answers quotes() after a delay; symbols containing BAD make the whole batch fail, SLOW ones hang."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def quotes(self, data):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            symbols = data["symbols"].split(",")
+            await asyncio.sleep(10 if any("SLOW" in s for s in symbols) else self.delay)
+            if any("BAD" in s for s in symbols):
+                return {"s": "error", "code": 429}
+            return {"s": "ok", "d": [{"n": s, "v": {"chp": 1.5}} for s in symbols]}
+        finally:
+            self.in_flight -= 1
+
+
+def make_service(model):
+    service = fyers_module.FyersService()
+    service._access_token = "token"
+    service._token_expiry = datetime.now() + timedelta(hours=1)
+    service._async_fyers = model
+    return service
+
+
+class TestAsyncFyersQuotes(unittest.TestCase):
+
+    def test_batches_run_concurrently_and_fill_table(self):
+        model = FakeAsyncModel(delay=0.2)
+        service = make_service(model)
+        symbols = [f"NSE:S{i}-EQ" for i in range(200)]
+        table = QuoteTable(ttl_seconds=60)
+
+        with patch.object(fyers_module, "_QUOTE_LIMITS", (TokenBucket(100, 100),)):
+            start = time.monotonic()
+            result = table.get_or_fetch(symbols, service._get_pct_change_for_formatted_symbols, source="fyers")
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(model.calls, 4)
+        self.assertEqual(model.max_in_flight, 4)
+        self.assertLess(elapsed, 0.6)  # 4 serial batches would take 0.8s
+        self.assertEqual(len(result), 200)
+        self.assertEqual(table.get("NSE:S199-EQ")["source"], "fyers")
+        self.assertEqual(table.generation, 1)  # stored once, not per batch and again by get_or_fetch
+
+    def test_rate_limiter_spaces_batches(self):
+        model = FakeAsyncModel(delay=0)
+        service = make_service(model)
+        symbols = [f"NSE:S{i}-EQ" for i in range(150)]
+
+        with patch.object(fyers_module, "_QUOTE_LIMITS", (TokenBucket(10, 1),)):
+            start = time.monotonic()
+            service._get_pct_change_for_formatted_symbols(symbols)
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(model.calls, 3)
+        self.assertGreaterEqual(elapsed, 0.18)  # 1 token burst, then 10/s
+
+    def test_failed_batch_keeps_others(self):
+        model = FakeAsyncModel(delay=0)
+        service = make_service(model)
+        symbols = ["NSE:BAD-EQ"] + [f"NSE:S{i}-EQ" for i in range(60)]
+
+        with patch.object(fyers_module, "_QUOTE_LIMITS", (TokenBucket(100, 100),)):
+            result = service._get_bulk_quotes_for_exchange([s[4:-3] for s in symbols], "NSE")
+
+        self.assertEqual(len(result), 11)  # second batch only
+        self.assertEqual(result["S59"], 1.5)
+
+    def test_timeout_keeps_finished_batches(self):
+        model = FakeAsyncModel(delay=0)
+        service = make_service(model)
+        symbols = [f"NSE:S{i}-EQ" for i in range(50)] + ["NSE:SLOW-EQ"]
+        table = QuoteTable(ttl_seconds=60)
+
+        with patch.object(fyers_module, "_QUOTE_LIMITS", (TokenBucket(100, 100),)), \
+             patch.object(fyers_module.settings, "FYERS_QUOTE_TIMEOUT_SECONDS", 0.2):
+            start = time.monotonic()
+            result = table.get_or_fetch(symbols, service._get_pct_change_for_formatted_symbols, source="fyers")
+            elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 2)
+        self.assertEqual(len(result), 50)
+        self.assertEqual(table.get("NSE:S0-EQ")["pct"], 1.5)
+        self.assertIsNone(table.get("NSE:SLOW-EQ")["pct"])
+
+    def test_overall_timeout_returns_partial_results(self):
+        service = make_service(FakeAsyncModel(delay=0))
+        symbols = [f"NSE:S{i}-EQ" for i in range(50)] + ["NSE:SLOW-EQ"]
+
+        async def run():
+            with patch.object(fyers_module, "_QUOTE_LIMITS", (TokenBucket(100, 100),)):
+                return await service.fetch_quotes_pct_change_async(symbols, timeout=0.3)
+
+        result = asyncio.run(run())
+        self.assertEqual(len(result), 50)
+        self.assertNotIn("NSE:SLOW-EQ", result)
+
+
+class TestSingleQuote(unittest.TestCase):
+
+    def test_plain_symbol_is_one_qualified_request(self):
+        service = make_service(FakeAsyncModel())
+        service._fyers = MagicMock()
+        service._fyers.quotes.return_value = {"s": "no_data", "d": []}
+
+        self.assertIsNone(service.get_quote_pct_change("reliance.ns"))
+        service._fyers.quotes.assert_called_once_with({"symbols": "NSE:RELIANCE-EQ"})
+
+        service._fyers.quotes.reset_mock()
+        service._fyers.quotes.return_value = {"s": "ok", "d": [{"n": "BSE:SBICARD-A", "v": {"chp": -0.4}}]}
+        self.assertEqual(service.get_quote_pct_change("BSE:SBICARD-A"), -0.4)
+        service._fyers.quotes.assert_called_once_with({"symbols": "BSE:SBICARD-A"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+FYERS Symbol Tests
+
+Verifies holdings are resolved to exchange-qualified FYERS symbols, the repair
+job fills and re-resolves them with batched probes (matching positions by ISIN,
+never trusting a failed probe), and the live path sends qualified symbols
+upstream as-is.
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing the services
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from services.holdings_service import HoldingsService, NseIsinIndex, build_nse_isin_index, nse_fyers_symbol, resolve_fyers_symbols
+from services.nav_service import NavService
+from services.quote_table import QuoteTable, nse_plain_symbol
+from utils.portfolio_matrix import quote_symbol
+
+NSE_TABLE = [
+    {"SYMBOL": "RELIANCE", " SERIES": "EQ", " ISIN NUMBER": "INE002A01018"},
+    {"SYMBOL": "SMALLBE", " SERIES": "BE", " ISIN NUMBER": "INE000B01011"},
+]
+BSE_MAP = {"INE000C01011": "BSE:SBICARD-A", "INE002A01018": "BSE:RELIANCE-A"}
+
+
+class TestResolution(unittest.TestCase):
+
+    def test_nse_listing_keeps_series(self):
+        self.assertEqual(nse_fyers_symbol("reliance"), "NSE:RELIANCE-EQ")
+        self.assertEqual(resolve_fyers_symbols("INE000B01011", NSE_TABLE, BSE_MAP), ("SMALLBE", ["NSE:SMALLBE-BE"]))
+        self.assertEqual(resolve_fyers_symbols("INE002A01018", NSE_TABLE, BSE_MAP)[1], ["NSE:RELIANCE-EQ", "BSE:RELIANCE-A"])
+        self.assertEqual(resolve_fyers_symbols("INE000C01011", NSE_TABLE, BSE_MAP), (None, ["BSE:SBICARD-A"]))
+
+    def test_quote_symbol_prefers_persisted(self):
+        self.assertEqual(quote_symbol({"Symbol": "TCS", "FyersSymbol": "NSE:TCS-EQ"}), "NSE:TCS-EQ")
+        self.assertEqual(quote_symbol({"Symbol": "TCS"}), "TCS")
+
+    def test_nse_plain_symbol(self):
+        self.assertEqual(nse_plain_symbol("NSE:BAJAJ-AUTO-EQ"), "BAJAJ-AUTO")
+        self.assertEqual(nse_plain_symbol("tcs.ns"), "TCS")
+        self.assertIsNone(nse_plain_symbol("BSE:SBICARD-A"))
+
+
+class TestNseIsinIndex(unittest.TestCase):
+
+    def test_loads_once_per_ttl(self):
+        loader = MagicMock(return_value=NSE_TABLE)
+        index = NseIsinIndex(loader=loader, ttl_seconds=60)
+
+        self.assertEqual(index.get()["INE002A01018"], ("RELIANCE", "EQ"))
+        self.assertEqual(index.get().get("INE000B01011"), ("SMALLBE", "BE"))
+        loader.assert_called_once()
+
+    def test_failed_refresh_keeps_previous_index(self):
+        loader = MagicMock(side_effect=[NSE_TABLE, []])
+        index = NseIsinIndex(loader=loader, ttl_seconds=0, retry_seconds=60)
+
+        first = index.get()
+        self.assertIs(index.get(), first)
+        self.assertIs(index.get(), first)  # failure is not retried within retry_seconds
+        self.assertEqual(loader.call_count, 2)
+
+
+class TestRepair(unittest.TestCase):
+
+    @patch('services.holdings_service.security_master')
+    @patch('services.holdings_service.holdings_collection')
+    def test_fills_missing_and_replaces_dead(self, mock_coll, mock_master):
+        mock_master.nse_listings.return_value = build_nse_isin_index(NSE_TABLE)
+        mock_master.bse_symbols.return_value = BSE_MAP
+        mock_coll.find.return_value = [
+            {"_id": "d1", "holdings": [
+                {"ISIN": "INE002A01018", "Symbol": "RELIANCE", "FyersSymbol": "NSE:RELIANCE-EQ"},
+                {"ISIN": "INE000C01011", "Symbol": "BSE:SBICARD-A"},
+                {"ISIN": "INE467B01029", "Symbol": "TCS", "FyersSymbol": "NSE:TCS-EQ"},
+            ]},
+        ]
+        probe = MagicMock(side_effect=[
+            {"NSE:RELIANCE-EQ": None, "NSE:TCS-EQ": 1.0},     # one stored symbol no longer quotes
+            {"BSE:RELIANCE-A": 0.5, "BSE:SBICARD-A": -1.0},   # candidates
+        ])
+
+        result = HoldingsService.repair_fyers_symbols(quote_probe=probe)
+
+        self.assertEqual(probe.call_count, 2)
+        self.assertNotIn("NSE:RELIANCE-EQ", probe.call_args_list[1].args[0])
+        mock_coll.update_one.assert_called_once_with(
+            {"_id": "d1", "holdings.0.ISIN": "INE002A01018", "holdings.1.ISIN": "INE000C01011"},
+            {"$set": {"holdings.0.FyersSymbol": "BSE:RELIANCE-A", "holdings.1.FyersSymbol": "BSE:SBICARD-A"}},
+        )
+        self.assertEqual(result, {"holdings": 3, "repaired": 2, "unresolved": []})
+
+    @patch('services.holdings_service.holdings_collection')
+    def test_failed_probe_marks_nothing_dead(self, mock_coll):
+        mock_coll.find.return_value = [
+            {"_id": "d1", "holdings": [
+                {"ISIN": "INE002A01018", "FyersSymbol": "NSE:RELIANCE-EQ"},
+                {"ISIN": "INE467B01029", "FyersSymbol": "NSE:TCS-EQ"},
+            ]},
+        ]
+        for outcome in ({}, {"NSE:RELIANCE-EQ": None, "NSE:TCS-EQ": None}, TimeoutError("fyers down")):
+            probe = MagicMock(side_effect=[outcome])
+            with patch('services.holdings_service.security_master') as mock_master:
+                result = HoldingsService.repair_fyers_symbols(quote_probe=probe)
+            mock_master.nse_listings.assert_not_called()
+            self.assertEqual(result["repaired"], 0)
+        mock_coll.update_one.assert_not_called()
+
+    @patch('services.holdings_service.holdings_collection')
+    def test_reupload_during_repair_is_not_written(self, mock_coll):
+        mock_coll.find.return_value = [{"_id": "d1", "holdings": [{"ISIN": "INE002A01018", "Symbol": "RELIANCE"}]}]
+        mock_coll.update_one.return_value.matched_count = 0  # holdings.0 is another stock by now
+        with patch('services.holdings_service.security_master') as mock_master:
+            mock_master.nse_listings.return_value = build_nse_isin_index(NSE_TABLE)
+            mock_master.bse_symbols.return_value = {}
+            result = HoldingsService.repair_fyers_symbols()
+
+        mock_coll.update_one.assert_called_once_with(
+            {"_id": "d1", "holdings.0.ISIN": "INE002A01018"},
+            {"$set": {"holdings.0.FyersSymbol": "NSE:RELIANCE-EQ"}},
+        )
+        self.assertEqual(result["repaired"], 0)
+
+    @patch('services.holdings_service.holdings_collection')
+    def test_backfills_older_doc_after_one_with_symbol(self, mock_coll):
+        mock_coll.find.return_value = [
+            {"_id": "new", "holdings": [{"ISIN": "INE002A01018", "FyersSymbol": "NSE:RELIANCE-EQ"}]},
+            {"_id": "old", "holdings": [{"ISIN": "INE002A01018", "Symbol": "RELIANCE"}]},
+        ]
+        with patch('services.holdings_service.security_master') as mock_master:
+            result = HoldingsService.repair_fyers_symbols()
+
+        mock_coll.update_one.assert_called_once_with(
+            {"_id": "old", "holdings.0.ISIN": "INE002A01018"}, {"$set": {"holdings.0.FyersSymbol": "NSE:RELIANCE-EQ"}}
+        )
+        mock_master.nse_listings.assert_not_called()  # the known-good symbol is reused
+        self.assertEqual(result, {"holdings": 1, "repaired": 1, "unresolved": []})
+
+    @patch('services.holdings_service.holdings_collection')
+    def test_nothing_to_repair_skips_masters(self, mock_coll):
+        mock_coll.find.return_value = [{"_id": "d1", "holdings": [{"ISIN": "X", "FyersSymbol": "NSE:X-EQ"}]}]
+        with patch('services.holdings_service.security_master') as mock_master:
+            result = HoldingsService.repair_fyers_symbols()
+        mock_master.nse_listings.assert_not_called()
+        self.assertEqual(result["repaired"], 0)
+
+
+class TestLivePath(unittest.TestCase):
+
+    @patch('services.nav_service.fyers_service')
+    @patch('services.nav_service.nse_client')
+    def test_qualified_symbols_single_fyers_call(self, mock_nse, mock_fyers):
+        mock_fyers.is_authenticated.return_value = True
+        mock_fyers.get_bulk_quotes_pct_change.return_value = {"NSE:TCS-EQ": 1.0, "NSE:M&M-EQ": None, "BSE:SBICARD-A": None}
+        mock_nse.get_index_snapshots.return_value = {}
+        mock_nse.get_pct_changes.return_value = {"M&M": 0.7}
+
+        with patch('services.nav_service.quote_table', QuoteTable(ttl_seconds=60)):
+            result = NavService._fetch_live_pct_changes_upstream(["NSE:TCS-EQ", "NSE:M&M-EQ", "BSE:SBICARD-A"])
+
+        mock_fyers.get_bulk_quotes_pct_change.assert_called_once_with(["NSE:TCS-EQ", "NSE:M&M-EQ", "BSE:SBICARD-A"])
+        # NSE fallback gets the plain trading symbol; BSE listings are not sent to NSE
+        mock_nse.get_pct_changes.assert_called_once_with(["M&M"])
+        self.assertEqual(result, {"NSE:TCS-EQ": 1.0, "NSE:M&M-EQ": 0.7})
+
+
+if __name__ == "__main__":
+    unittest.main()
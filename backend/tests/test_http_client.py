@@ -0,0 +1,51 @@
+"""
+Shared HTTP Client Tests
+
+Verifies host -> policy routing, session reuse and default timeouts.
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.http_client import HttpClient
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = HttpClient()
+
+    def test_policy_routing_by_host(self):
+        self.assertEqual(self.client.policy_for("https://api.mfapi.in/mf/100").name, "mfapi")
+        self.assertEqual(self.client.policy_for("https://www.nseindia.com/api/quote-equity").name, "nse")
+        self.assertEqual(self.client.policy_for("https://nsearchives.nseindia.com/x.csv").name, "nse")
+        self.assertEqual(self.client.policy_for("https://public.fyers.in/sym_details/BSE_CM.csv").name, "fyers_public")
+        self.assertEqual(self.client.policy_for("https://api.brevo.com/v3/smtp/email").name, "brevo")
+        self.assertEqual(self.client.policy_for("https://example.com/").name, "default")
+
+    def test_sessions_are_shared_per_policy(self):
+        self.assertIs(self.client.session("nse"), self.client.session("nse"))
+        self.assertIsNot(self.client.session("nse"), self.client.session("mfapi"))
+        self.assertIn("User-Agent", self.client.session("nse").headers)
+
+    def test_default_timeout_applied(self):
+        session = self.client.session("mfapi")
+        with patch.object(session, "request") as mock_request:
+            self.client.get("https://api.mfapi.in/mf/100")
+            self.client.get("https://api.mfapi.in/mf/100", timeout=1)
+        self.assertEqual(mock_request.call_args_list[0].kwargs["timeout"], (3.05, 10))
+        self.assertEqual(mock_request.call_args_list[1].kwargs["timeout"], 1)
+
+    def test_post_is_not_retried_on_status(self):
+        retry = self.client.session("brevo").get_adapter("https://api.brevo.com/").max_retries
+        self.assertFalse(retry.is_retry("POST", 503))
+        self.assertTrue(retry.is_retry("GET", 503))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Incremental Estimator Tests
+
+Verifies running weighted sums follow streamed ticks (never fetched quotes),
+touch only the funds holding the updated symbol, and match a full recompute
+after a long random tick stream. Streamed values are forgotten when the feed releases
+their symbols, and a thinly ticked fund falls back to fetching its quotes.
+"""
+
+import sys
+import os
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing nav_service
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from services.incremental_estimator import IncrementalEstimator
+from services.live_estimate_cache import LiveEstimateCache
+from services.nav_service import NavService
+from services.quote_table import QuoteTable
+from utils.portfolio_matrix import FundWeights, SymbolUniverse
+
+FUND_A = [{"Symbol": "TCS", "Weight": 60}, {"Symbol": "INFY", "Weight": 40}]
+FUND_B = [{"Symbol": "INFY", "Weight": 50}, {"Symbol": "SBIN", "FyersSymbol": "NSE:SBIN-EQ", "Weight": 50}]
+
+
+def full_recompute(holdings, quotes):
+    universe = SymbolUniverse()
+    return FundWeights.compile(holdings, universe).change(universe.quote_vector(quotes))
+
+
+class TestIncrementalEstimator(unittest.TestCase):
+
+    def setUp(self):
+        self.table = QuoteTable(ttl_seconds=60)
+        self.estimator = IncrementalEstimator(self.table)
+        self.estimator.register("A", FUND_A)
+        self.estimator.register("B", FUND_B)
+
+    def test_follows_quote_updates(self):
+        self.assertEqual(self.estimator.estimate("A"), (None, 0.0))
+        self.table.put_tick("NSE:TCS-EQ", 1.0)
+        change, covered = self.estimator.estimate("A")
+        self.assertAlmostEqual(change, 1.0)
+        self.assertAlmostEqual(covered, 0.6)
+
+        self.table.put_tick("NSE:INFY-EQ", -1.0)
+        self.assertAlmostEqual(self.estimator.estimate("A")[0], 0.2)
+        self.table.put_tick("NSE:INFY-EQ", None)  # lost quote leaves coverage
+        self.assertAlmostEqual(self.estimator.estimate("A")[1], 0.6)
+        self.assertIsNone(self.estimator.estimate("missing"))
+
+    def test_updates_touch_only_affected_funds(self):
+        self.table.put_tick("NSE:TCS-EQ", 1.0)
+        self.assertEqual(self.estimator.fund_updates, 1)
+        self.table.put_tick("NSE:INFY-EQ", 2.0)
+        self.assertEqual(self.estimator.fund_updates, 3)
+        self.table.put_tick("NSE:INFY-EQ", 2.0)  # unchanged pct
+        self.assertEqual(self.estimator.fund_updates, 3)
+
+    def test_matches_full_recompute_after_tick_stream(self):
+        rng = random.Random(7)
+        estimator = IncrementalEstimator(self.table, rebuild_every=50)
+        symbols = [f"S{i}" for i in range(30)]
+        funds = {f: [{"Symbol": s, "Weight": rng.uniform(1, 10)} for s in rng.sample(symbols, 10)] for f in range(20)}
+        for key, holdings in funds.items():
+            estimator.register(key, holdings)
+
+        quotes = {}
+        for _ in range(2000):
+            sym = rng.choice(symbols)
+            pct = None if rng.random() < 0.05 else rng.uniform(-5, 5)
+            quotes[sym] = pct
+            self.table.put_tick(sym, pct)
+
+        for key, holdings in funds.items():
+            expected, covered, _ = full_recompute(holdings, quotes)
+            change, cov = estimator.estimate(key)
+            self.assertAlmostEqual(cov, covered, places=9)
+            if expected is None:
+                self.assertIsNone(change)
+            else:
+                self.assertAlmostEqual(change, expected, places=9)
+
+    def test_ignores_older_generation_and_seeds_from_table(self):
+        self.estimator.on_quotes({"NSE:TCS-EQ": 3.0}, 10)
+        self.estimator.on_quotes({"NSE:TCS-EQ": 9.0}, 5)
+        self.assertAlmostEqual(self.estimator.estimate("A")[0], 3.0)
+
+        table = QuoteTable(ttl_seconds=60)
+        table.put_tick("NSE:TCS-EQ", 2.0)
+        table.put_tick("NSE:INFY-EQ", 2.0)
+        late = IncrementalEstimator(table)
+        late.register("A", FUND_A)
+        self.assertEqual(late.estimate("A"), (2.0, 1.0))
+
+    def test_fetched_quotes_are_not_summed(self):
+        now = [0.0]
+        table = QuoteTable(ttl_seconds=5, clock=lambda: now[0])
+        table.attach_stream(lambda: True)
+        estimator = IncrementalEstimator(table)
+        table.put_many({"TCS": 3.0}, source="live")
+        estimator.register("A", FUND_A)
+        table.put_many({"INFY": 1.0}, source="live")
+        self.assertEqual(estimator.estimate("A"), (None, 0.0))
+
+        # Once the REST quote has expired from the table it cannot linger in coverage either
+        now[0] = 3600.0
+        self.assertIsNone(table.get("TCS"))
+        table.put_tick("NSE:INFY-EQ", 1.0)
+        change, covered = estimator.estimate("A")
+        self.assertAlmostEqual(change, 1.0)
+        self.assertAlmostEqual(covered, 0.4)
+
+    def test_evicts_least_recently_read(self):
+        estimator = IncrementalEstimator(self.table, max_funds=2)
+        estimator.register("A", FUND_A)
+        estimator.register("B", FUND_B)
+        estimator.estimate("A")
+        estimator.register("C", FUND_A)
+        self.assertNotIn("B", estimator)
+        self.assertIn("A", estimator)
+
+    def test_nav_service_uses_running_sums_while_streaming(self):
+        self.table.attach_stream(lambda: True)
+        with patch('services.nav_service.quote_table', self.table), \
+             patch('services.nav_service.incremental_estimator', self.estimator), \
+             patch('services.nav_service.NavService._live_portfolio_change') as mock_change:
+            self.table.put_tick("NSE:TCS-EQ", 1.0)
+            self.table.put_tick("NSE:INFY-EQ", 1.0)
+            live = NavService.get_live_estimate("100", FUND_A)
+        mock_change.assert_not_called()
+        self.assertAlmostEqual(live["change_pct"], 1.0)
+        self.assertAlmostEqual(live["coverage"], 1.0)
+
+    def test_release_forgets_streamed_values(self):
+        self.table.put_tick("NSE:TCS-EQ", 1.0)
+        self.table.put_tick("NSE:INFY-EQ", 2.0)
+        self.table.release_stream(["NSE:TCS-EQ"])
+        change, covered = self.estimator.estimate("A")
+        self.assertAlmostEqual(change, 2.0)
+        self.assertAlmostEqual(covered, 0.4)
+
+        # The next session's ticks start from what was actually streamed again
+        self.table.put_tick("NSE:TCS-EQ", -1.0)
+        self.assertAlmostEqual(self.estimator.estimate("A")[0], 0.2)
+
+    def test_nav_service_fetches_when_stream_coverage_is_low(self):
+        self.table.attach_stream(lambda: True)
+        with patch('services.nav_service.quote_table', self.table), \
+             patch('services.nav_service.incremental_estimator', self.estimator), \
+             patch('services.nav_service.live_estimate_cache', LiveEstimateCache(self.table)), \
+             patch('services.nav_service.NavService._live_portfolio_change', return_value=(0.8, 1.0)) as mock_change:
+            self.table.put_tick("NSE:INFY-EQ", 1.0)  # 40% of the fund has ticked
+            live = NavService.get_live_estimate("101", FUND_A)
+        mock_change.assert_called_once()
+        self.assertAlmostEqual(live["change_pct"], 0.8)
+        self.assertAlmostEqual(live["coverage"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
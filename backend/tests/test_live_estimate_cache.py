@@ -0,0 +1,115 @@
+"""
+Live Estimate Cache Tests
+
+Verifies the per-scheme live estimate is computed once for a burst of callers,
+recomputed when one of its own quotes changes (including a tick landing during
+the computation, but not the computation's own fetch) or it ages out, and keyed
+by holdings content.
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing nav_service
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from services.live_estimate_cache import LiveEstimateCache, holdings_version
+from services.nav_service import NavService
+from services.quote_table import QuoteTable
+
+HOLDINGS = [{"Symbol": "TCS", "Weight": 60}, {"Symbol": "INFY", "Weight": 40}]
+
+
+class TestLiveEstimateCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.table = QuoteTable(ttl_seconds=5, clock=lambda: self.now[0])
+        self.cache = LiveEstimateCache(self.table, clock=lambda: self.now[0])
+
+    def test_holdings_version_is_content_hash(self):
+        self.assertEqual(holdings_version(HOLDINGS), holdings_version(list(reversed(HOLDINGS))))
+        changed = [{"Symbol": "TCS", "Weight": 61}, {"Symbol": "INFY", "Weight": 40}]
+        self.assertNotEqual(holdings_version(HOLDINGS), holdings_version(changed))
+
+    def test_burst_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 1.2, 0.9
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_compute("100", HOLDINGS, compute)))
+                   for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({r["change_pct"] for r in results}, {1.2})
+
+    def test_invalidated_by_own_quotes_and_age(self):
+        compute = MagicMock(return_value=(None, 0.5))
+        self.cache.get_or_compute("100", HOLDINGS, compute)
+        self.cache.get_or_compute("100", HOLDINGS, compute)
+        self.assertEqual(compute.call_count, 1)
+
+        # Quotes of symbols this fund does not hold leave its estimate valid
+        self.table.put_many({"SBIN": 0.4})
+        self.table.put_tick("NSE:HDFCBANK-EQ", 0.2)
+        self.cache.get_or_compute("100", HOLDINGS, compute)
+        self.assertEqual(compute.call_count, 1)
+
+        self.table.put_many({"TCS": 1.0})
+        self.cache.get_or_compute("100", HOLDINGS, compute)
+        self.assertEqual(compute.call_count, 2)
+
+        self.now[0] = 6.0
+        self.assertIsNone(self.cache.get("100", HOLDINGS))
+
+    def test_tick_during_compute_is_not_counted_as_included(self):
+        def compute_with_own_fetch():
+            self.table.put_many({"TCS": 1.0, "INFY": 0.5})  # the compute's own quote fetch
+            return 0.8, 1.0
+
+        self.cache.get_or_compute("100", HOLDINGS, compute_with_own_fetch)
+        self.assertIsNotNone(self.cache.get("100", HOLDINGS))
+
+        def compute_racing_a_tick():
+            self.table.put_many({"TCS": 2.0})
+            self.table.put_tick("NSE:INFY-EQ", 3.0)  # streamed while the compute was running
+            return 1.4, 1.0
+
+        self.cache.invalidate("100")
+        self.cache.get_or_compute("100", HOLDINGS, compute_racing_a_tick)
+        self.assertIsNone(self.cache.get("100", HOLDINGS))
+
+    def test_reupload_uses_new_version(self):
+        self.cache.put("100", HOLDINGS, 1.0, 1.0)
+        self.assertIsNone(self.cache.get("100", HOLDINGS[:1]))
+        self.cache.invalidate("100")
+        self.assertIsNone(self.cache.get("100", HOLDINGS))
+
+    def test_nav_service_shares_estimate(self):
+        with patch('services.nav_service.live_estimate_cache', self.cache), \
+             patch('services.nav_service.NavService._live_portfolio_change', return_value=(0.5, 1.0)) as mock_change:
+            first = NavService.get_live_estimate("100", HOLDINGS)
+            second = NavService.get_live_estimate("100", [dict(h) for h in HOLDINGS])
+        mock_change.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(first["coverage"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,34 +11,14 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import time
-from services.holdings_service import session
 from services.nav_service import NavService
-from utils.common import NSE_BASE_URL
-
-def test_cookie_status():
-    """Test 1: Check current cookie state"""
-    print("\n" + "="*60)
-    print("TEST 1: Cookie Status")
-    print("="*60)
-    
-    print(f"Current cookies: {len(session.cookies)}")
-    for cookie in session.cookies:
-        print(f"  - {cookie.name}: {cookie.value[:20]}..." if len(cookie.value) > 20 else f"  - {cookie.name}: {cookie.value}")
-    
-    if len(session.cookies) == 0:
-        print("⚠️  No cookies - will be initialized on first request")
-    else:
-        print("✅ Cookies already present")
 
 def test_single_stock_fetch():
-    """Test 2: Fetch a single stock to verify basic functionality"""
+    """Test 1: Fetch a single stock to verify basic functionality"""
     print("\n" + "="*60)
-    print("TEST 2: Single Stock Fetch (RELIANCE)")
+    print("TEST 1: Single Stock Fetch (RELIANCE)")
     print("="*60)
     
-    NavService.ensure_nse_cookies()
-    print(f"Cookies after ensure: {len(session.cookies)}")
-    
     start = time.time()
     result = NavService.get_live_price_change("RELIANCE")
     duration = time.time() - start
@@ -49,9 +29,9 @@ def test_single_stock_fetch():
         print(f"❌ Failed to fetch RELIANCE (took {duration:.2f}s)")
 
 def test_multiple_stocks_sequential():
-    """Test 3: Fetch multiple stocks sequentially to test rate limiting"""
+    """Test 2: Fetch multiple stocks sequentially to test rate limiting"""
     print("\n" + "="*60)
-    print("TEST 3: Sequential Fetch (10 stocks)")
+    print("TEST 2: Sequential Fetch (10 stocks)")
     print("="*60)
     
     test_symbols = ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", 
@@ -74,30 +54,10 @@ def test_multiple_stocks_sequential():
     if failed:
         print(f"Failed symbols: {failed}")
 
-def test_cookie_clear_and_refetch():
-    """Test 4: Clear cookies and verify re-initialization"""
-    print("\n" + "="*60)
-    print("TEST 4: Cookie Clear & Re-fetch")
-    print("="*60)
-    
-    print("Clearing all cookies...")
-    session.cookies.clear()
-    print(f"Cookies after clear: {len(session.cookies)}")
-    
-    print("Fetching INFY (should auto-initialize cookies)...")
-    NavService.ensure_nse_cookies()
-    result = NavService.get_live_price_change("INFY")
-    
-    print(f"Cookies after fetch: {len(session.cookies)}")
-    if result is not None:
-        print(f"✅ INFY pChange: {result:+.2f}%")
-    else:
-        print("❌ Failed - cookies may not be initializing properly")
-
 def test_invalid_symbol():
-    """Test 5: Test behavior with invalid symbol"""
+    """Test 3: Test behavior with invalid symbol"""
     print("\n" + "="*60)
-    print("TEST 5: Invalid Symbol Handling")
+    print("TEST 3: Invalid Symbol Handling")
     print("="*60)
     
     result = NavService.get_live_price_change("INVALIDSYMBOL123")
@@ -107,9 +67,9 @@ def test_invalid_symbol():
         print(f"⚠️  Unexpected result: {result}")
 
 def test_portfolio_change_mock():
-    """Test 6: Test calculate_portfolio_change with mock holdings"""
+    """Test 4: Test calculate_portfolio_change with mock holdings"""
     print("\n" + "="*60)
-    print("TEST 6: Portfolio Change Calculation (Mini Test)")
+    print("TEST 4: Portfolio Change Calculation (Mini Test)")
     print("="*60)
     
     # Mock holdings with 5 major stocks
@@ -133,9 +93,9 @@ def test_portfolio_change_mock():
         print("   This could mean coverage < 75% threshold")
 
 def test_rate_limit_stress():
-    """Test 7: Stress test to check rate limiting behavior"""
+    """Test 5: Stress test to check rate limiting behavior"""
     print("\n" + "="*60)
-    print("TEST 7: Rate Limit Stress Test (20 rapid requests)")
+    print("TEST 5: Rate Limit Stress Test (20 rapid requests)")
     print("="*60)
     
     symbols = ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK"] * 4  # 20 requests
@@ -163,10 +123,8 @@ def run_all_tests():
     print("   NSE LIVE FETCH ROBUSTNESS TEST SUITE")
     print("🔧 "*20)
     
-    test_cookie_status()
     test_single_stock_fetch()
     test_multiple_stocks_sequential()
-    test_cookie_clear_and_refetch()
     test_invalid_symbol()
     test_portfolio_change_mock()
     test_rate_limit_stress()
@@ -175,7 +133,7 @@ def run_all_tests():
     print("ALL TESTS COMPLETED")
     print("="*60)
     print("\nCheck the results above to identify any weak points.")
-    print("If TEST 6 fails, your real portfolio fetch will also fail.")
+    print("If TEST 4 fails, your real portfolio fetch will also fail.")
 
 if __name__ == "__main__":
     run_all_tests()
@@ -0,0 +1,114 @@
+"""
+Market Feed Tests
+
+Replays recorded ticks through the streaming feed and verifies the quote table
+is filled, subscriptions follow the holdings universe, and the feed reconnects
+after the source drops.
+"""
+
+import sys
+import os
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing the feed
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from services.market_feed import MarketFeed, ReplayTickSource, parse_tick
+from services.quote_table import QuoteTable
+
+TICKS_FILE = os.path.join(os.path.dirname(__file__), "fixtures", "ticks_sample.jsonl")
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestParseTick(unittest.TestCase):
+
+    def test_parses_chp_and_prev_close(self):
+        self.assertEqual(parse_tick({"symbol": "NSE:TCS-EQ", "ltp": 10, "chp": 1.5}), {"symbol": "NSE:TCS-EQ", "pct": 1.5, "ltp": 10.0})
+        self.assertAlmostEqual(parse_tick({"symbol": "NSE:X-EQ", "ltp": 99, "prev_close_price": 100})["pct"], -1.0)
+
+    def test_ignores_control_messages(self):
+        self.assertIsNone(parse_tick({"type": "cn", "code": 200}))
+        self.assertIsNone(parse_tick("ping"))
+
+
+class TestMarketFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.table = QuoteTable(ttl_seconds=0.05)
+        self.symbols = ["TCS", "INFY"]
+        self.sources = []
+
+    def make_feed(self, hold_open=True, interval=0.0):
+        def factory():
+            source = ReplayTickSource(TICKS_FILE, interval=interval, hold_open=hold_open)
+            self.sources.append(source)
+            return source
+
+        return MarketFeed(
+            table=self.table,
+            source_factory=factory,
+            symbol_provider=lambda: list(self.symbols),
+            backoff_initial=0.01,
+            backoff_max=0.05,
+        )
+
+    def test_ticks_fill_table_for_subscribed_symbols(self):
+        feed = self.make_feed(interval=0.01)
+        feed.start()
+        try:
+            self.assertTrue(wait_for(lambda: self.sources and self.sources[0].done.is_set()))
+            self.assertEqual(feed.subscribed, {"NSE:TCS-EQ", "NSE:INFY-EQ"})
+            self.assertEqual(self.table.get("TCS")["pct"], 1.5)
+            self.assertAlmostEqual(self.table.get("INFY")["pct"], -3.333333, places=4)
+            self.assertIsNone(self.table.get("SBIN"))  # Not held, not subscribed
+
+            # Streamed quotes stay fresh past the TTL while connected: no REST fetch
+            time.sleep(0.1)
+            fetcher = MagicMock(return_value={})
+            self.assertEqual(self.table.get_or_fetch(["TCS"], fetcher), {"TCS": 1.5})
+            fetcher.assert_not_called()
+        finally:
+            feed.stop()
+
+        # Disconnected: streamed entries expire normally again
+        time.sleep(0.1)
+        self.assertIsNone(self.table.get("TCS"))
+
+    def test_resync_diffs_subscriptions(self):
+        feed = self.make_feed()
+        feed.start()
+        try:
+            self.assertTrue(wait_for(lambda: feed.subscribed == {"NSE:TCS-EQ", "NSE:INFY-EQ"}))
+            self.symbols = ["TCS", "SBIN"]
+            feed.request_resync()
+            self.assertTrue(wait_for(lambda: feed.subscribed == {"NSE:TCS-EQ", "NSE:SBIN-EQ"}))
+            self.assertEqual(self.sources[-1]._subscribed, {"NSE:TCS-EQ", "NSE:SBIN-EQ"})
+        finally:
+            feed.stop()
+
+    def test_reconnects_after_disconnect(self):
+        feed = self.make_feed(hold_open=False)
+        feed.start()
+        try:
+            self.assertTrue(wait_for(lambda: feed.reconnects >= 2 and len(self.sources) >= 3))
+        finally:
+            feed.stop()
+        self.assertFalse(feed.is_live())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+NAV History Cache Tests
+
+Verifies TTL expiry at the publish checkpoint, LRU eviction under the memory cap,
+hit/miss accounting and single-load behaviour of get_or_load.
+"""
+
+import sys
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nav_history_cache import NavHistoryCache
+from utils.date_utils import IST, get_next_nav_refresh_time
+
+
+def _history(rows):
+    return {"meta": {}, "data": [{"date": "01-01-2024", "nav": "10.0"}] * rows}
+
+
+class TestNavRefreshTime(unittest.TestCase):
+    """Tests for the AMFI publish-cycle TTL."""
+
+    def test_daytime_expires_at_evening_window(self):
+        now = IST.localize(datetime(2024, 3, 4, 11, 30))
+        self.assertEqual(get_next_nav_refresh_time(now), IST.localize(datetime(2024, 3, 4, 20, 0)))
+
+    def test_early_morning_expires_at_morning_checkpoint(self):
+        now = IST.localize(datetime(2024, 3, 5, 2, 0))
+        self.assertEqual(get_next_nav_refresh_time(now), IST.localize(datetime(2024, 3, 5, 9, 0)))
+
+    def test_publish_window_rechecks_soon(self):
+        now = IST.localize(datetime(2024, 3, 4, 21, 0))
+        self.assertEqual(get_next_nav_refresh_time(now), now + timedelta(minutes=15))
+
+
+class TestNavHistoryCache(unittest.TestCase):
+    """Tests for cache hits, expiry and eviction."""
+
+    def setUp(self):
+        self.now = IST.localize(datetime(2024, 3, 4, 11, 0))
+        patcher = patch('services.nav_history_cache.get_current_ist_time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_and_miss_counters(self):
+        cache = NavHistoryCache(max_bytes=10**9)
+        self.assertIsNone(cache.get("100"))
+        cache.put("100", _history(5), expires_at=self.now + timedelta(hours=1))
+        self.assertIsNotNone(cache.get(100))
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_entry_expires(self):
+        cache = NavHistoryCache(max_bytes=10**9)
+        cache.put("100", _history(5), expires_at=self.now + timedelta(minutes=5))
+        self.now = self.now + timedelta(minutes=6)
+        self.assertIsNone(cache.get("100"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_lru_eviction_under_memory_cap(self):
+        cache = NavHistoryCache(max_bytes=2500, sizeof=lambda v: 1000)
+        expiry = self.now + timedelta(hours=1)
+        cache.put("A", _history(1), expires_at=expiry)
+        cache.put("B", _history(1), expires_at=expiry)
+        cache.get("A")  # A becomes most recently used
+        cache.put("C", _history(1), expires_at=expiry)
+
+        self.assertIsNone(cache.get("B"))
+        self.assertIsNotNone(cache.get("A"))
+        self.assertIsNotNone(cache.get("C"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_get_or_load_calls_loader_once(self):
+        cache = NavHistoryCache(max_bytes=10**9)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return _history(3)
+
+        first = cache.get_or_load("200", loader)
+        second = cache.get_or_load("200", loader)
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_load_is_not_cached(self):
+        cache = NavHistoryCache(max_bytes=10**9)
+        self.assertIsNone(cache.get_or_load("300", lambda: None))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+NAV Series Tests
+
+Verifies parsing of newest-first mfapi payloads and the binary-search
+"on or before" / "on or after" lookups used for purchase and SIP NAVs.
+"""
+
+import sys
+import os
+import unittest
+from datetime import date
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.nav_series import NavSeries
+
+
+PAYLOAD = {
+    "meta": {"scheme_code": 100},
+    "data": [  # mfapi order: newest first, weekends missing
+        {"date": "08-01-2024", "nav": "12.0"},
+        {"date": "05-01-2024", "nav": "11.5"},
+        {"date": "04-01-2024", "nav": "11.0"},
+        {"date": "bad-date", "nav": "1.0"},
+        {"date": "03-01-2024", "nav": "10.5"},
+    ],
+}
+
+
+class TestNavSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.series = NavSeries.from_mfapi(PAYLOAD, scheme_code="100")
+
+    def test_parses_and_sorts_ascending(self):
+        self.assertEqual(len(self.series), 4)
+        self.assertTrue((self.series.ordinals[1:] > self.series.ordinals[:-1]).all())
+        self.assertEqual(self.series.meta, {"scheme_code": 100})
+
+    def test_latest_is_newest_first(self):
+        self.assertEqual(self.series.latest(2), [(12.0, "08-01-2024"), (11.5, "05-01-2024")])
+        self.assertEqual(len(self.series.latest(10)), 4)
+
+    def test_on_or_before_exact_and_weekend(self):
+        self.assertEqual(self.series.on_or_before("04-01-2024"), (11.0, "04-01-2024"))
+        # Sunday -> previous Friday
+        self.assertEqual(self.series.on_or_before("2024-01-07"), (11.5, "05-01-2024"))
+        self.assertIsNone(self.series.on_or_before(date(2024, 1, 1)))
+
+    def test_on_or_after_exact_and_weekend(self):
+        self.assertEqual(self.series.on_or_after("05/01/2024"), (11.5, "05-01-2024"))
+        # Saturday -> next Monday
+        self.assertEqual(self.series.on_or_after("06-01-2024"), (12.0, "08-01-2024"))
+        self.assertIsNone(self.series.on_or_after("09-01-2024"))
+
+    def test_duplicate_dates_keep_newest_listed(self):
+        series = NavSeries.from_mfapi({"data": [
+            {"date": "03-01-2024", "nav": "10.6"},
+            {"date": "03-01-2024", "nav": "10.5"},
+        ]})
+        self.assertEqual(series.latest(5), [(10.6, "03-01-2024")])
+
+    def test_lookup_many_matches_single_lookups(self):
+        targets = ["2024-01-02", "04-01-2024", "06-01-2024", date(2024, 1, 9)]
+        results = self.series.lookup_many(targets)
+        self.assertEqual(len(results), len(targets))
+        for target, res in zip(targets, results):
+            self.assertEqual(res["on_or_before"], self.series.on_or_before(target))
+            self.assertEqual(res["on_or_after"], self.series.on_or_after(target))
+
+    def test_empty_payload(self):
+        series = NavSeries.from_mfapi({"data": []})
+        self.assertEqual(len(series), 0)
+        self.assertEqual(series.latest(1), [])
+        self.assertIsNone(series.on_or_before("03-01-2024"))
+        self.assertIsNone(series.on_or_after("03-01-2024"))
+
+
+if __name__ == "__main__":
+    unittest.main()
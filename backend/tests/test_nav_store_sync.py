@@ -0,0 +1,78 @@
+"""
+NAV Store Sync Tests
+
+Verifies that NavService reads the persistent NAV store first and only asks
+mfapi for the tail newer than the last stored row.
+"""
+
+import sys
+import os
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing nav_service
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from services.nav_service import NavService
+
+
+STORED = {"meta": {"scheme_name": "Test Fund"}, "data": [{"date": "02-01-2024", "nav": 11.0}], "status": "SUCCESS"}
+
+
+class TestNavStoreSync(unittest.TestCase):
+
+    @patch('services.nav_service.NavService._fetch_nav_history')
+    @patch('services.nav_service.nav_history_store')
+    def test_fresh_store_skips_network(self, mock_store, mock_fetch):
+        mock_store.needs_sync.return_value = False
+        mock_store.load_history.return_value = STORED
+
+        result = NavService._load_nav_history("100")
+
+        self.assertEqual(result, STORED)
+        mock_fetch.assert_not_called()
+
+    @patch('services.nav_service.NavService._fetch_nav_history')
+    @patch('services.nav_service.nav_history_store')
+    def test_stale_store_fetches_only_tail(self, mock_store, mock_fetch):
+        mock_store.needs_sync.return_value = True
+        mock_store.get_last_date.return_value = date(2024, 1, 2)
+        tail = {"meta": STORED["meta"], "data": [{"date": "03-01-2024", "nav": "11.5"}], "status": "SUCCESS"}
+        mock_fetch.return_value = tail
+        mock_store.load_history.return_value = STORED
+
+        NavService._load_nav_history("100")
+
+        mock_fetch.assert_called_once_with("100", start_date=date(2024, 1, 3))
+        mock_store.append.assert_called_once_with("100", tail["data"], meta=tail["meta"])
+
+    @patch('services.nav_service.NavService._fetch_nav_history')
+    @patch('services.nav_service.nav_history_store')
+    def test_first_sync_backfills_full_history(self, mock_store, mock_fetch):
+        mock_store.needs_sync.return_value = True
+        mock_store.get_last_date.return_value = None
+        mock_fetch.return_value = None
+        mock_store.load_history.return_value = None
+
+        self.assertIsNone(NavService._load_nav_history("100"))
+        mock_fetch.assert_called_once_with("100", start_date=None)
+
+    @patch('services.nav_service.NavService._fetch_nav_history')
+    @patch('services.nav_service.nav_history_store')
+    def test_network_failure_serves_stored_rows(self, mock_store, mock_fetch):
+        mock_store.needs_sync.return_value = True
+        mock_store.get_last_date.return_value = date(2024, 1, 2)
+        mock_fetch.return_value = None
+        mock_store.load_history.return_value = STORED
+
+        self.assertEqual(NavService._load_nav_history("100"), STORED)
+        mock_store.append.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
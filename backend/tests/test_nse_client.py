@@ -0,0 +1,133 @@
+"""
+NSE Client Tests
+
+Runs the async NSE client against a local aiohttp server that mimics NSE's
+throttling, HTML overload pages and cookie rejection, and checks the token
+bucket and the per-batch latency budget.
+"""
+
+import sys
+import os
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from aiohttp import web
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nse_client import AsyncNseClient
+from utils.rate_limit import TokenBucket
+from utils.async_bridge import run_sync
+
+
+class FakeNse:
+    """Scripted responses per symbol: a list of 'json' / 429 / 'html' / 403 / 'slow' steps."""
+
+    def __init__(self, script):
+        self.script = {sym: list(steps) for sym, steps in script.items()}
+        self.home_visits = 0
+        self.quote_calls = 0
+
+    async def home(self, request):
+        self.home_visits += 1
+        return web.Response(text="<html></html>", content_type="text/html")
+
+    async def quote(self, request):
+        self.quote_calls += 1
+        sym = request.query["symbol"]
+        steps = self.script.get(sym) or ["json"]
+        step = steps.pop(0) if len(steps) > 1 else steps[0]
+        if step == 429:
+            return web.Response(status=429)
+        if step == 403:
+            return web.Response(status=403)
+        if step == "html":
+            return web.Response(text="<html>busy</html>", content_type="text/html")
+        if step == "slow":
+            await asyncio.sleep(2)
+        return web.json_response({"priceInfo": {"pChange": 1.25}})
+
+
+async def run_against(fake, coro_factory):
+    app = web.Application()
+    app.router.add_get("/", fake.home)
+    app.router.add_get("/api/quote-equity", fake.quote)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+    client = AsyncNseClient(rate_per_second=100, burst=100, max_concurrency=5, backoff_base=0.01)
+    try:
+        with patch("services.nse_client.NSE_BASE_URL", base), \
+             patch("services.nse_client.NSE_API_URL", base + "/api/quote-equity"):
+            return await coro_factory(client)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+class TestAsyncNseClient(unittest.TestCase):
+
+    def test_retries_throttling_and_html_then_succeeds(self):
+        fake = FakeNse({"TCS": [429, "html", "json"], "INFY": ["json"]})
+        result = asyncio.run(run_against(fake, lambda c: c.fetch_pct_changes(["TCS", "INFY"], budget=5)))
+        self.assertEqual(result, {"TCS": 1.25, "INFY": 1.25})
+        self.assertEqual(fake.home_visits, 1)  # Cookies primed once for the whole batch
+
+    def test_reprimes_cookies_once_on_403(self):
+        fake = FakeNse({"TCS": [403, "json"]})
+        result = asyncio.run(run_against(fake, lambda c: c.fetch_pct_changes(["TCS"], budget=5)))
+        self.assertEqual(result, {"TCS": 1.25})
+        self.assertEqual(fake.home_visits, 2)
+
+    def test_gives_up_after_max_retries(self):
+        fake = FakeNse({"BAD": [429]})
+        result = asyncio.run(run_against(fake, lambda c: c.fetch_pct_changes(["BAD"], budget=5, max_retries=2)))
+        self.assertEqual(result, {})
+        self.assertEqual(fake.quote_calls, 2)
+
+    def test_budget_drops_slow_symbols(self):
+        fake = FakeNse({"SLOW": ["slow"], "TCS": ["json"]})
+
+        async def timed(client):
+            start = time.monotonic()
+            result = await client.fetch_pct_changes(["SLOW", "TCS"], budget=0.5)
+            return result, time.monotonic() - start
+
+        result, elapsed = asyncio.run(run_against(fake, timed))
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(result, {"TCS": 1.25})
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_refill(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+        now[0] = 0.5
+        self.assertEqual(bucket.try_acquire(), 0)
+
+    def test_acquire_sync_timeout(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+        self.assertTrue(bucket.acquire_sync())
+        self.assertFalse(bucket.acquire_sync(timeout=0.05))
+
+
+class TestAsyncBridge(unittest.TestCase):
+
+    def test_run_sync_returns_result_and_times_out(self):
+        self.assertEqual(run_sync(asyncio.sleep(0, result=5)), 5)
+        with self.assertRaises(Exception):
+            run_sync(asyncio.sleep(1), timeout=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
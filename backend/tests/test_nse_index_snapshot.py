@@ -0,0 +1,62 @@
+"""
+NSE Index Snapshot Tests
+
+Parses a recorded equity-stockIndices (NIFTY 500) response and verifies the
+live-quote fallback uses the snapshot first and per-symbol calls only for leftovers.
+"""
+
+import sys
+import os
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing nav_service
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from services.nse_client import parse_index_snapshot
+from services.nav_service import NavService
+from services.quote_table import QuoteTable
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "nse_index_nifty500_sample.json")
+
+
+class TestIndexSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        with open(FIXTURE, "r", encoding="utf-8") as f:
+            self.payload = json.load(f)
+
+    def test_parse_skips_index_row_and_unpriced(self):
+        quotes = parse_index_snapshot(self.payload)
+        self.assertEqual(sorted(quotes), ["HDFCBANK", "M&M", "RELIANCE", "TCS"])
+        self.assertEqual(quotes["TCS"], {"pct": 1.08, "ltp": 3912.0})
+        self.assertNotIn("NIFTY 500", quotes)
+
+    def test_parse_handles_empty_payload(self):
+        self.assertEqual(parse_index_snapshot(None), {})
+        self.assertEqual(parse_index_snapshot({"data": []}), {})
+
+    @patch('services.nav_service.fyers_service')
+    @patch('services.nav_service.nse_client')
+    def test_upstream_uses_snapshot_then_leftovers(self, mock_nse, mock_fyers):
+        mock_fyers.is_authenticated.return_value = False
+        mock_nse.get_index_snapshots.return_value = parse_index_snapshot(self.payload)
+        mock_nse.get_pct_changes.return_value = {"SMALLCO": 2.5}
+        table = QuoteTable(ttl_seconds=60)
+
+        with patch('services.nav_service.quote_table', table):
+            result = NavService._fetch_live_pct_changes_upstream(["TCS", "reliance", "SMALLCO"])
+
+        self.assertEqual(result, {"TCS": 1.08, "reliance": 0.42, "SMALLCO": 2.5})
+        mock_nse.get_pct_changes.assert_called_once_with(["SMALLCO"])
+        # Every constituent is shared through the quote table, not just the requested ones
+        self.assertEqual(table.get("HDFCBANK")["pct"], -0.88)
+
+
+if __name__ == "__main__":
+    unittest.main()
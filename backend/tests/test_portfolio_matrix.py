@@ -0,0 +1,80 @@
+"""
+Portfolio Matrix Tests
+
+Verifies weight normalisation, per-fund weighted change with NaN masks, and
+that the funds x symbols matrix product matches the per-fund computation, and
+that funds are compiled once per holdings version.
+"""
+
+import sys
+import os
+import unittest
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.portfolio_matrix import FundWeights, FundWeightsCache, PortfolioMatrix, SymbolUniverse, normalize_weights
+
+
+FUND_A = [{"Symbol": "TCS", "Weight": 60}, {"Symbol": "INFY", "Weight": 40}]
+FUND_B = [{"Symbol": "INFY", "Weight": 0.5}, {"Symbol": "SBIN", "Weight": 0.3}, {"Symbol": None, "Weight": 0.2}]
+FUND_C = [{"Symbol": "HDFC", "Weight": 0}]
+
+
+class TestPortfolioMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.universe = SymbolUniverse()
+        self.funds = [FundWeights.compile(h, self.universe) for h in (FUND_A, FUND_B, FUND_C)]
+
+    def test_normalize_weights(self):
+        np.testing.assert_allclose(normalize_weights([8.5, 0.2, 1.0, 100]), [0.085, 0.2, 1.0, 1.0])
+
+    def test_compile_assigns_stable_columns(self):
+        self.assertEqual(self.universe.symbols, ["TCS", "INFY", "SBIN"])
+        self.assertEqual(self.funds[1].columns.tolist(), [1, 2])
+        self.assertEqual(len(self.funds[2]), 0)  # zero weight skipped
+
+    def test_fund_change_ignores_missing_quotes(self):
+        quotes = self.universe.quote_vector({"TCS": 2.0, "SBIN": -1.0})
+        change, covered, priced = self.funds[0].change(quotes)
+        self.assertAlmostEqual(change, 2.0)
+        self.assertAlmostEqual(covered, 0.6)
+        self.assertEqual(priced, 1)
+        self.assertEqual(self.funds[2].change(quotes), (None, 0.0, 0))
+
+    def test_matrix_matches_per_fund(self):
+        quotes = self.universe.quote_vector({"TCS": 2.0, "INFY": 1.0, "UNKNOWN": 9.0})
+        changes, covered, counts = PortfolioMatrix(self.universe, self.funds).weighted_changes(quotes)
+        for i, fund in enumerate(self.funds):
+            change, cov, priced = fund.change(quotes)
+            self.assertAlmostEqual(covered[i], cov)
+            self.assertEqual(counts[i], priced)
+            if change is None:
+                self.assertTrue(np.isnan(changes[i]))
+            else:
+                self.assertAlmostEqual(changes[i], change)
+
+    def test_matrix_tolerates_universe_growth(self):
+        matrix = PortfolioMatrix(self.universe, self.funds[:1])
+        FundWeights.compile([{"Symbol": "NEWCO", "Weight": 10}], self.universe)
+        changes, _, _ = matrix.weighted_changes(self.universe.quote_vector({"TCS": 1.0, "INFY": 1.0, "NEWCO": 5.0}))
+        self.assertAlmostEqual(changes[0], 1.0)
+
+    def test_change_from_mapping_matches_vector(self):
+        quotes = {"TCS": 2.0, "INFY": None, "UNKNOWN": 9.0}
+        for fund in self.funds:
+            self.assertEqual(fund.change_from(quotes), fund.change(self.universe.quote_vector(quotes)))
+
+    def test_cache_compiles_once_per_holdings_version(self):
+        cache = FundWeightsCache(self.universe, max_entries=1)
+        first = cache.get("100", FUND_A)
+        self.assertIs(cache.get("100", list(reversed(FUND_A))), first)
+        self.assertIsNot(cache.get("100", [{"Symbol": "TCS", "Weight": 100}]), first)
+        self.assertIsNot(cache.get("100", FUND_A), first)  # evicted beyond max_entries
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+"""
+Portfolio Stream Tests
+
+Drives the SSE generator with a scripted compute and verifies the snapshot /
+delta framing, recomputes on the user's own quote changes only, one shared
+computation per user across connections, throttling and heartbeats, and that
+the stream only accepts its short-lived stream token.
+"""
+
+import sys
+import os
+import asyncio
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing nav_service
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from fastapi import HTTPException
+
+from routes.auth import get_current_user, get_current_user_from_query
+from services.auth_service import auth_service
+from services.portfolio_stream import PortfolioStream, StreamSummaryCache, diff_views
+from services.quote_table import QuoteTable
+
+
+def summary(nav, day_pnl=1.0):
+    return {
+        "funds": [{"fund_id": "f1", "current_nav": nav, "day_pnl": day_pnl, "note": "Estimated (Live Est)", "units": 10}],
+        "totals": {"day_pnl": day_pnl},
+    }
+
+
+def make_stream(compute, table, summaries=None, **kwargs):
+    kwargs = {"min_interval": 0.01, "refresh_interval": 60, "heartbeat": 60, **kwargs}
+    return PortfolioStream("u1", compute=compute, symbols=lambda: ["TCS"], table=table,
+                           summaries=summaries if summaries is not None else StreamSummaryCache(), **kwargs)
+
+
+def parse(frame):
+    lines = frame.strip().split("\n")
+    return lines[0][len("event: "):], json.loads(lines[1][len("data: "):])
+
+
+async def collect(stream, count, on_frame=None):
+    frames = []
+    agen = stream.events()
+    try:
+        async for frame in agen:
+            frames.append(frame)
+            if on_frame:
+                on_frame(len(frames))
+            if len(frames) >= count:
+                break
+    finally:
+        await agen.aclose()
+    return frames
+
+
+class TestPortfolioStream(unittest.TestCase):
+
+    def test_diff_views(self):
+        changed, removed = diff_views(
+            {"f1": {"current_nav": 10, "note": "a"}, "f2": {"current_nav": 5}},
+            {"f1": {"current_nav": 11, "note": "a"}, "f3": {"current_nav": 7}},
+        )
+        self.assertEqual(changed, {"f1": {"current_nav": 11}, "f3": {"current_nav": 7}})
+        self.assertEqual(removed, ["f2"])
+
+    def test_snapshot_then_delta_on_quote_change(self):
+        table = QuoteTable(ttl_seconds=60)
+        results = iter([summary(10.0), summary(10.0), summary(10.5, 6.0)])
+        stream = make_stream(lambda: next(results), table)
+
+        def advance(n):
+            # Two quote updates: the first leaves values unchanged (no frame), the second moves them
+            table.put_many({"TCS": 1.0})
+            asyncio.get_running_loop().call_later(0.05, table.put_many, {"TCS": 2.0})
+
+        frames = asyncio.run(asyncio.wait_for(collect(stream, 2, advance), 5))
+
+        event, data = parse(frames[0])
+        self.assertEqual(event, "snapshot")
+        self.assertEqual(data["funds"]["f1"]["current_nav"], 10.0)
+        self.assertNotIn("units", data["funds"]["f1"])
+        event, data = parse(frames[1])
+        self.assertEqual(event, "delta")
+        self.assertEqual(data, {"funds": {"f1": {"current_nav": 10.5, "day_pnl": 6.0}}, "removed": [], "totals": {"day_pnl": 6.0}})
+
+    def test_throttles_recomputes(self):
+        table = QuoteTable(ttl_seconds=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return summary(10.0 + len(calls))
+
+        stream = make_stream(compute, table, min_interval=0.2)
+
+        async def run():
+            task = asyncio.ensure_future(collect(stream, 100))
+            for i in range(25):  # quotes move every 20ms
+                table.put_many({"TCS": float(i)})
+                await asyncio.sleep(0.02)
+            task.cancel()
+
+        asyncio.run(run())
+        self.assertGreaterEqual(len(calls), 2)
+        self.assertLessEqual(len(calls), 4)
+
+    def test_own_fetches_do_not_retrigger(self):
+        table = QuoteTable(ttl_seconds=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            table.put_many({"TCS": float(len(calls))})  # this compute's own quote fetch
+            return summary(10.0)
+
+        stream = make_stream(compute, table)
+
+        async def run():
+            task = asyncio.ensure_future(collect(stream, 100))
+            await asyncio.sleep(0.3)
+            task.cancel()
+
+        asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+
+    def test_other_users_quotes_do_not_retrigger(self):
+        table = QuoteTable(ttl_seconds=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return summary(10.0)
+
+        stream = make_stream(compute, table)
+
+        async def run():
+            task = asyncio.ensure_future(collect(stream, 100))
+            for i in range(10):
+                table.put_many({"SBIN": float(i)})
+                table.put_tick("NSE:INFY-EQ", float(i))
+                await asyncio.sleep(0.02)
+            table.put_many({"TCS": 1.0})
+            await asyncio.sleep(0.1)
+            task.cancel()
+
+        asyncio.run(run())
+        self.assertEqual(len(calls), 2)
+
+    def test_connections_share_one_computation(self):
+        table = QuoteTable(ttl_seconds=60)
+        summaries = StreamSummaryCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return summary(10.0 + len(calls))
+
+        streams = [make_stream(compute, table, summaries) for _ in range(5)]
+
+        async def run():
+            tasks = [asyncio.ensure_future(collect(s, 100)) for s in streams]
+            await asyncio.sleep(0.1)
+            table.put_many({"TCS": 1.0})
+            await asyncio.sleep(0.1)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run(run())
+        self.assertEqual(len(calls), 2)
+        # The last connection to close drops the shared entry
+        self.assertEqual(summaries.stats()["entries"], 0)
+
+    def test_heartbeat_when_idle(self):
+        stream = make_stream(lambda: summary(10.0), QuoteTable(ttl_seconds=60), heartbeat=0.05)
+        frames = asyncio.run(asyncio.wait_for(collect(stream, 2), 5))
+        self.assertEqual(frames[1], ": keep-alive\n\n")
+
+
+class TestStreamToken(unittest.TestCase):
+
+    @patch('routes.auth.auth_service.get_user', return_value={"username": "alice"})
+    def test_stream_accepts_only_stream_tokens(self, _):
+        stream_token = auth_service.create_stream_token("alice")
+        login_token = auth_service.create_access_token(data={"sub": "alice"})
+
+        self.assertEqual(asyncio.run(get_current_user_from_query(stream_token))["username"], "alice")
+        with self.assertRaises(HTTPException):
+            asyncio.run(get_current_user_from_query(login_token))
+        # A leaked stream URL cannot be replayed as a login token either
+        with self.assertRaises(HTTPException):
+            asyncio.run(get_current_user(stream_token))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Portfolio Summary Tests
+
+Verifies that the portfolio-wide summary loads each scheme once, fetches live
+quotes in a single round for the union of symbols, and aggregates fund totals.
+"""
+
+import sys
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytz
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB and fyers_service BEFORE importing nav_service
+sys.modules['db'] = MagicMock()
+sys.modules['services.fyers_service'] = MagicMock()
+
+from services.nav_service import NavService
+from services.live_estimate_cache import live_estimate_cache
+from utils.nav_series import NavSeries
+
+IST = pytz.timezone("Asia/Kolkata")
+# Tuesday, during market hours
+NOW = IST.localize(datetime(2024, 1, 9, 11, 0))
+
+DOCS = [
+    {"_id": "f1", "scheme_code": "100", "holdings": [{"Symbol": "TCS", "Weight": 60}, {"Symbol": "INFY", "Weight": 40}]},
+    {"_id": "f2", "scheme_code": "100", "holdings": [{"Symbol": "TCS", "Weight": 100}]},
+    {"_id": "f3", "scheme_code": "200", "holdings": [{"Symbol": "SBIN", "Weight": 100}]},
+]
+
+
+def _series(last_date):
+    return NavSeries.from_mfapi({"data": [{"date": last_date, "nav": "10"}]})
+
+
+class TestPortfolioSummary(unittest.TestCase):
+
+    def setUp(self):
+        live_estimate_cache.invalidate()
+
+    @patch('services.nav_service.get_current_ist_time', return_value=NOW)
+    @patch('services.nav_service.NavService.calculate_pnl')
+    @patch('services.nav_service.NavService.fetch_live_pct_changes')
+    @patch('services.nav_service.NavService.get_nav_history')
+    @patch('services.nav_service.holdings_service')
+    def test_shared_loads_and_totals(self, mock_holdings, mock_history, mock_quotes, mock_pnl, _now):
+        mock_holdings.get_user_holdings_docs.return_value = DOCS
+        # Scheme 200 already has today's official NAV, so its symbols need no quotes
+        mock_history.side_effect = lambda code: _series("08-01-2024" if code == "100" else "09-01-2024")
+        mock_quotes.return_value = {"TCS": 1.0, "INFY": -1.0}
+        mock_pnl.side_effect = lambda fund_id, user_id, doc=None, **kwargs: {
+            "invested_amount": 100.0, "current_value": 110.0, "day_pnl": 10.0,
+        } if fund_id != "f3" else {"error": "No NAV data available."}
+
+        result = NavService.calculate_portfolio_summary("u1")
+
+        self.assertEqual(sorted(c.args[0] for c in mock_history.call_args_list), ["100", "200"])
+        mock_quotes.assert_called_once()
+        self.assertEqual(sorted(set(mock_quotes.call_args.args[0])), ["INFY", "TCS"])
+        # Live changes for both pending funds come from one matrix product
+        estimates = {call.args[0]: call.kwargs.get("live_change") for call in mock_pnl.call_args_list}
+        self.assertAlmostEqual(estimates["f1"], 0.2)  # 0.6 * 1.0 + 0.4 * -1.0
+        self.assertAlmostEqual(estimates["f2"], 1.0)
+        self.assertNotIn("live_change", next(c for c in mock_pnl.call_args_list if c.args[0] == "f3").kwargs)
+
+        totals = result["totals"]
+        self.assertEqual(totals["fund_count"], 2)
+        self.assertEqual(totals["invested_amount"], 200.0)
+        self.assertEqual(totals["pnl"], 20.0)
+        self.assertEqual(totals["pnl_pct"], 10.0)
+        self.assertEqual(totals["day_pnl"], 20.0)
+        self.assertEqual(totals["day_pnl_pct"], 10.0)
+        self.assertEqual(result["errors"], [{"fund_id": "f3", "error": "No NAV data available."}])
+
+    def test_prefetched_quotes_respect_coverage(self):
+        holdings = [{"Symbol": "TCS", "Weight": 80}, {"Symbol": "INFY", "Weight": 20}]
+        self.assertAlmostEqual(NavService.calculate_portfolio_change(holdings, live_changes={"TCS": 1.0, "INFY": 2.0}), 1.2)
+        self.assertEqual(NavService.calculate_portfolio_change(holdings, live_changes={"INFY": 2.0}), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Quote Table Tests
+
+Verifies symbol qualification, TTL reuse across callers, negative caching of
+unpriced symbols and single-flight fetching of the same symbol across threads.
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.quote_table import QuoteTable, qualify_symbol
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQuoteTable(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.table = QuoteTable(ttl_seconds=5, clock=self.clock)
+        self.calls = []
+
+    def fetcher(self, symbols):
+        self.calls.append(list(symbols))
+        return {s: 1.5 for s in symbols if s != "DEAD"}
+
+    def test_qualify_symbol(self):
+        self.assertEqual(qualify_symbol("reliance"), "NSE:RELIANCE-EQ")
+        self.assertEqual(qualify_symbol("TCS.NS"), "NSE:TCS-EQ")
+        self.assertEqual(qualify_symbol("BSE:SBICARD-A"), "BSE:SBICARD-A")
+
+    def test_fresh_quotes_are_shared_across_symbol_forms(self):
+        self.assertEqual(self.table.get_or_fetch(["TCS", "INFY"], self.fetcher), {"TCS": 1.5, "INFY": 1.5})
+        # Same window, different spelling of the same instrument: no new fetch
+        self.assertEqual(self.table.get_or_fetch(["NSE:TCS-EQ"], self.fetcher), {"NSE:TCS-EQ": 1.5})
+        self.assertEqual(self.calls, [["TCS", "INFY"]])
+
+    def test_expired_quotes_are_refetched(self):
+        self.table.get_or_fetch(["TCS"], self.fetcher)
+        self.clock.now = 6
+        self.table.get_or_fetch(["TCS", "INFY"], self.fetcher)
+        self.assertEqual(self.calls, [["TCS"], ["TCS", "INFY"]])
+        self.assertEqual(self.table.generation, 2)
+
+    def test_unpriced_symbols_are_remembered_for_the_window(self):
+        self.assertEqual(self.table.get_or_fetch(["DEAD", "TCS"], self.fetcher), {"TCS": 1.5})
+        self.assertEqual(self.table.get_or_fetch(["DEAD"], self.fetcher), {})
+        self.assertEqual(len(self.calls), 1)
+
+    def test_failed_fetch_does_not_serve_previous_window(self):
+        self.table.get_or_fetch(["TCS"], self.fetcher)
+        self.clock.now = 10
+
+        def broken(symbols):
+            raise RuntimeError("upstream down")
+
+        self.assertEqual(self.table.get_or_fetch(["TCS"], broken), {})
+
+    def test_concurrent_callers_share_one_fetch(self):
+        table = QuoteTable(ttl_seconds=5)
+        started = threading.Event()
+        calls = []
+
+        def slow_fetcher(symbols):
+            calls.append(list(symbols))
+            started.set()
+            time.sleep(0.1)
+            return {s: 2.0 for s in symbols}
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(table.get_or_fetch(["TCS"], slow_fetcher)))
+        first.start()
+        started.wait(1)
+        second = threading.Thread(target=lambda: results.append(table.get_or_fetch(["TCS"], slow_fetcher)))
+        second.start()
+        first.join()
+        second.join()
+
+        self.assertEqual(calls, [["TCS"]])
+        self.assertEqual(results, [{"TCS": 2.0}, {"TCS": 2.0}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Scheduler Tests
+
+Verifies trigger fire-time computation and that the asyncio scheduler runs
+jobs on their trigger, keeps going after a failing run, and stops cleanly.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from datetime import datetime, time, timedelta
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.scheduler import Scheduler, DailyTimesTrigger, IntervalTrigger, parse_times
+from utils.date_utils import IST
+
+
+class TestTriggers(unittest.TestCase):
+
+    def test_daily_times_same_day_and_rollover(self):
+        trigger = DailyTimesTrigger(parse_times(["09:05", "00:05"]))
+        after = IST.localize(datetime(2024, 1, 9, 8, 0))
+        self.assertEqual(trigger.next_fire_time(after), IST.localize(datetime(2024, 1, 9, 9, 5)))
+        after = IST.localize(datetime(2024, 1, 9, 9, 5))
+        self.assertEqual(trigger.next_fire_time(after), IST.localize(datetime(2024, 1, 10, 0, 5)))
+
+    def test_trading_days_only_skips_weekend(self):
+        trigger = DailyTimesTrigger([time(9, 5)], trading_days_only=True)
+        friday_evening = IST.localize(datetime(2024, 1, 5, 18, 0))
+        self.assertEqual(trigger.next_fire_time(friday_evening), IST.localize(datetime(2024, 1, 8, 9, 5)))
+
+    def test_invalid_triggers(self):
+        with self.assertRaises(ValueError):
+            DailyTimesTrigger([])
+        with self.assertRaises(ValueError):
+            IntervalTrigger(timedelta(0))
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_runs_jobs_and_survives_failures(self):
+        calls = {"ok": 0, "bad": 0}
+
+        def ok_job():
+            calls["ok"] += 1
+
+        def bad_job():
+            calls["bad"] += 1
+            raise RuntimeError("boom")
+
+        async def scenario():
+            scheduler = Scheduler()
+            scheduler.add_job("ok", ok_job, IntervalTrigger(timedelta(milliseconds=20)))
+            scheduler.add_job("bad", bad_job, IntervalTrigger(timedelta(milliseconds=20)))
+            scheduler.start()
+            await asyncio.sleep(0.2)
+            await scheduler.stop()
+            return scheduler.status()
+
+        status = {s["name"]: s for s in asyncio.run(scenario())}
+        self.assertGreaterEqual(calls["ok"], 2)
+        self.assertGreaterEqual(calls["bad"], 2)
+        self.assertIsNone(status["ok"]["last_error"])
+        self.assertEqual(status["bad"]["last_error"], "boom")
+
+    def test_duplicate_job_name_rejected(self):
+        scheduler = Scheduler()
+        scheduler.add_job("a", lambda: None, IntervalTrigger(timedelta(seconds=1)))
+        with self.assertRaises(ValueError):
+            scheduler.add_job("a", lambda: None, IntervalTrigger(timedelta(seconds=1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
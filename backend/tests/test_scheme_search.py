@@ -0,0 +1,122 @@
+"""
+Scheme Search Tests
+
+Builds the scheme-name index from the local NAVAll fixture plus a few more
+schemes and checks that auto-lookup ranks Direct Growth plans first, tolerates
+abbreviated names and never calls mfapi while the index is loaded, and that a
+cold-start search does not wait for the warm-start download.
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB BEFORE importing services
+sys.modules['db'] = MagicMock()
+
+from services.amfi_service import parse_navall
+from services.scheme_search import SchemeSearchIndex
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "NAVAll_sample.txt")
+MORE_SCHEMES = [
+    ("119020", "HDFC Large Cap Fund - Growth Option - Regular Plan"),
+    ("119021", "HDFC Mid Cap Fund - Growth Option - Direct Plan"),
+    ("119022", "HDFC Large Cap Fund - Bonus Option - Direct Plan"),
+    ("120503", "Axis ELSS Tax Saver Fund - Direct Plan - Growth Option"),
+    ("120504", "Axis Large Cap Fund - Direct Plan - Growth"),
+    ("125497", "SBI Small Cap Fund - Direct Plan - Growth"),
+]
+
+
+def amfi_schemes():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return [(row["scheme_code"], row["scheme_name"]) for row in parse_navall(f)] + MORE_SCHEMES
+
+
+class TestSchemeSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SchemeSearchIndex(loader=amfi_schemes)
+
+    def test_prefers_direct_growth_plan(self):
+        results = self.index.search("HDFC Large Cap Fund")
+
+        self.assertEqual(results[0]["schemeCode"], "119018")
+        self.assertEqual(set(results[0]), {"schemeCode", "schemeName", "score"})
+        scores = [r["score"] for r in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        # The Bonus variant is penalised out of the top matches
+        self.assertNotIn("119022", [r["schemeCode"] for r in results])
+
+    def test_abbreviated_names(self):
+        self.assertEqual(self.index.search("Parag Parikh Flexicap")[0]["schemeCode"], "122639")
+        self.assertEqual(self.index.search("Motilal Oswal Nasdaq100 FoF")[0]["schemeCode"], "145552")
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search("Completely Random Invalid Name"), [])
+        self.assertEqual(self.index.search(""), [])
+
+    def test_failed_refresh_keeps_previous_index(self):
+        loader = MagicMock(side_effect=[amfi_schemes(), IOError("down")])
+        index = SchemeSearchIndex(loader=loader)
+        self.assertEqual(index.refresh(), 10)
+        self.assertEqual(index.refresh(force=True), 10)
+        self.assertEqual(index.search("SBI Small Cap")[0]["schemeCode"], "125497")
+
+    def test_cold_search_does_not_wait_for_warm_start(self):
+        release = threading.Event()
+
+        def slow_loader():
+            release.wait(5)
+            return amfi_schemes()
+
+        index = SchemeSearchIndex(loader=slow_loader)
+        index.warm_start()
+        try:
+            for _ in range(100):
+                if index._refresh_lock.locked():
+                    break
+                time.sleep(0.01)
+            self.assertEqual(index.search("SBI Small Cap"), [])
+        finally:
+            release.set()
+        with index._refresh_lock:
+            pass  # warm start finished
+        self.assertEqual(index.search("SBI Small Cap")[0]["schemeCode"], "125497")
+
+
+class TestSchemeCandidates(unittest.TestCase):
+
+    @patch('services.holdings_service.http_client')
+    def test_lookup_uses_local_index(self, mock_http):
+        from services.holdings_service import get_scheme_candidates
+
+        with patch('services.holdings_service.scheme_search_index', SchemeSearchIndex(loader=amfi_schemes)):
+            candidates = get_scheme_candidates("Axis ELSS Tax Saver Fund Direct Growth")
+
+        self.assertEqual(candidates[0]["schemeCode"], "120503")
+        mock_http.get.assert_not_called()
+
+    @patch('services.holdings_service.http_client')
+    def test_empty_index_falls_back_to_mfapi(self, mock_http):
+        from services.holdings_service import get_scheme_candidates
+
+        mock_http.get.return_value.status_code = 200
+        mock_http.get.return_value.json.return_value = [
+            {"schemeCode": 122639, "schemeName": "Parag Parikh Flexi Cap Fund - Direct Plan - Growth"},
+        ]
+        with patch('services.holdings_service.scheme_search_index', SchemeSearchIndex(loader=list)):
+            candidates = get_scheme_candidates("Parag Parikh Flexi Cap")
+
+        self.assertEqual(candidates[0]["schemeCode"], "122639")
+        mock_http.get.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
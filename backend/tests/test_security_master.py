@@ -0,0 +1,86 @@
+"""
+Security Master Tests
+
+Merges the local FYERS NSE_CM / BSE_CM fixtures with NSE EQUITY_L rows and
+checks the gzipped snapshot round trip used for warm starts.
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Mock DB BEFORE importing services
+sys.modules['db'] = MagicMock()
+
+from services.security_master import SecurityMaster, merge_security_master, parse_fyers_master
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+NSE_LISTINGS = {"INE002A01018": ("RELIANCE", "EQ"), "INE009A01021": ("INFY", "EQ")}
+
+
+def fyers_rows(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8", newline="") as f:
+        return list(parse_fyers_master(f))
+
+
+def sources():
+    return NSE_LISTINGS, fyers_rows("fyers_NSE_CM_sample.csv"), fyers_rows("fyers_BSE_CM_sample.csv")
+
+
+class TestMerge(unittest.TestCase):
+
+    def test_parser_skips_rows_without_isin(self):
+        tickers = [r["ticker"] for r in fyers_rows("fyers_NSE_CM_sample.csv")]
+        self.assertNotIn("NSE:NIFTY50-INDEX", tickers)
+        self.assertEqual(len(tickers), 4)
+
+    def test_merges_all_sources_by_isin(self):
+        records = merge_security_master(*sources())
+
+        self.assertEqual(records["INE002A01018"], {
+            "nse": "RELIANCE", "nse_series": "EQ", "bse": "RELIANCE",
+            "fyers_nse": "NSE:RELIANCE-EQ", "fyers_bse": "BSE:RELIANCE-A",
+            "name": "RELIANCE INDUSTRIES LTD",
+        })
+        # Only in EQUITY_L / only on FYERS NSE_CM (preferred series) / BSE-only
+        self.assertEqual(records["INE009A01021"]["fyers_nse"], "NSE:INFY-EQ")
+        self.assertEqual(records["INE00LO01017"]["fyers_nse"], "NSE:SMALLCO-BE")
+        self.assertEqual(records["INE018E01016"]["nse"], None)
+        self.assertEqual(records["INE018E01016"]["fyers_bse"], "BSE:SBICARD-A")
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "security_master.json.gz")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_refresh_writes_snapshot_and_restart_loads_it(self):
+        download = MagicMock(side_effect=sources)
+        master = SecurityMaster(snapshot_path=self.path, sources=download)
+        self.assertEqual(master.nse_listings()["INE00LO01017"], ("SMALLCO", "BE"))
+        self.assertTrue(os.path.exists(self.path))
+
+        restarted = SecurityMaster(snapshot_path=self.path, sources=download)
+        self.assertEqual(restarted.bse_symbols()["INE018E01016"], "BSE:SBICARD-A")
+        self.assertEqual(restarted.lookup("ine002a01018")["fyers_bse"], "BSE:RELIANCE-A")
+        download.assert_called_once()
+
+    def test_failed_refresh_keeps_current_table(self):
+        download = MagicMock(side_effect=[sources(), IOError("down")])
+        master = SecurityMaster(snapshot_path=self.path, sources=download)
+        master.refresh()
+        master.refresh()
+        self.assertEqual(len(master.records()), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
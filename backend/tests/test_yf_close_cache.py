@@ -0,0 +1,105 @@
+"""
+yfinance Close Cache Tests
+
+Verifies D-1 changes are sliced from the shared close panel, that concurrent
+funds share one download over the union of their tickers, and that later
+lookups do not download again (unless the download came back without them).
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.yf_close_cache import YfCloseCache
+
+TARGET = date.today() - timedelta(days=3)
+CLOSES = {"TCS.NS": (100.0, 102.0), "INFY.NS": (200.0, 198.0), "SBIN.NS": (50.0, None)}
+
+
+def fake_download(calls):
+    def fetch(tickers, start, end):
+        calls.append(list(tickers))
+        index = pd.to_datetime([TARGET - timedelta(days=1), TARGET])
+        return pd.DataFrame({t: CLOSES[t] for t in tickers if t in CLOSES}, index=index, dtype=float)
+    return fetch
+
+
+class TestYfCloseCache(unittest.TestCase):
+
+    def test_slices_target_day_changes(self):
+        calls = []
+        cache = YfCloseCache(fetch=fake_download(calls), batch_window=0)
+
+        result = cache.pct_changes(["TCS.NS", "INFY.NS", "SBIN.NS", "GONE.NS"], TARGET)
+
+        self.assertEqual(set(result), {"TCS.NS", "INFY.NS"})
+        self.assertAlmostEqual(result["TCS.NS"], 2.0)
+        self.assertAlmostEqual(result["INFY.NS"], -1.0)
+
+        # Cached (including tickers yfinance had nothing for): no second download
+        cache.pct_changes(["TCS.NS", "GONE.NS"], TARGET)
+        self.assertEqual(len(calls), 1)
+
+    def test_empty_download_is_retried_after_miss_ttl(self):
+        calls = []
+        download = fake_download(calls)
+        responses = iter([pd.DataFrame(), None])  # rate-limited first, then real data
+
+        def flaky(tickers, start, end):
+            empty = next(responses)
+            return empty if empty is not None else download(tickers, start, end)
+
+        cache = YfCloseCache(fetch=flaky, batch_window=0, miss_ttl=0.05)
+        self.assertEqual(cache.pct_changes(["TCS.NS"], TARGET), {})
+        time.sleep(0.06)
+        self.assertAlmostEqual(cache.pct_changes(["TCS.NS"], TARGET)["TCS.NS"], 2.0)
+
+    def test_slow_download_is_bounded_by_timeout(self):
+        calls = []
+        release = threading.Event()
+        download = fake_download(calls)
+
+        def slow(tickers, start, end):
+            release.wait(5)
+            return download(tickers, start, end)
+
+        cache = YfCloseCache(fetch=slow, batch_window=0)
+        started = time.monotonic()
+        self.assertEqual(cache.pct_changes(["TCS.NS"], TARGET, timeout=0.05), {})
+        self.assertLess(time.monotonic() - started, 1.0)
+        release.set()
+        # The download finished in the background; the next lookup reads the panel
+        self.assertAlmostEqual(cache.pct_changes(["TCS.NS"], TARGET)["TCS.NS"], 2.0)
+        self.assertEqual(len(calls), 1)
+
+    def test_concurrent_funds_share_one_download(self):
+        calls = []
+        cache = YfCloseCache(fetch=fake_download(calls), batch_window=0.2)
+        results = {}
+
+        def fund(name, tickers):
+            results[name] = cache.pct_changes(tickers, TARGET)
+
+        threads = [
+            threading.Thread(target=fund, args=("a", ["TCS.NS", "INFY.NS"])),
+            threading.Thread(target=fund, args=("b", ["INFY.NS", "SBIN.NS"])),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(calls, [["INFY.NS", "SBIN.NS", "TCS.NS"]])
+        self.assertAlmostEqual(results["b"]["INFY.NS"], -1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,5 @@
 
-import requests
-from services.holdings_service import session
-from utils.common import NSE_API_URL, NSE_BASE_URL
-from core.logging import get_logger
+from services.nse_client import nse_client
 
 # Setup simpler logger for script
 import logging
@@ -12,25 +9,16 @@ logger = logging.getLogger("Verifier")
 def test_fetch(symbol="SBIN"):
     logger.info(f"Testing fetch for {symbol}...")
     try:
-        # 1. Inspect current session headers
-        logger.info(f"Session Headers: {session.headers}")
-        
-        # 2. Try fetching API directly
-        logger.info(f"Attempting GET {NSE_API_URL} params={{'symbol': '{symbol}'}}")
-        r = session.get(NSE_API_URL, params={"symbol": symbol}, timeout=10)
-        
-        logger.info(f"Status Code: {r.status_code}")
-        logger.info(f"Content-Type: {r.headers.get('Content-Type')}")
-        
-        if "application/json" in r.headers.get("Content-Type", ""):
-            data = r.json()
-            logger.info("Success! JSON received.")
-            p_change = data.get("priceInfo", {}).get("pChange")
-            logger.info(f"pChange: {p_change}")
+        # The async NSE client primes and refreshes its own cookies
+        logger.info(f"Fetching {symbol} through the NSE client")
+        quotes = nse_client.get_pct_changes([symbol])
+
+        if symbol in quotes:
+            logger.info("Success! Quote received.")
+            logger.info(f"pChange: {quotes[symbol]}")
         else:
-            logger.error("Failed: Non-JSON response")
-            logger.error(f"Response text snippet: {r.text[:200]}")
-            
+            logger.error("Failed: no quote returned (see NseClient logs for the HTTP status)")
+
     except Exception as e:
         logger.error(f"Exception: {e}")
 
@@ -0,0 +1,39 @@
+"""
+Async Bridge
+
+Runs coroutines from synchronous code on one long-lived background event loop.
+Sync services (and async routes that call them) can use asyncio clients without
+nesting event loops, and connection pools bound to that loop are reused across calls.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Returns the shared background loop, starting its thread on first use."""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-bridge", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coro: Awaitable[Any], timeout: float = None) -> Any:
+    """
+    Runs a coroutine on the background loop and blocks until it finishes.
+    Raises concurrent.futures.TimeoutError (after cancelling the coroutine) if timeout passes.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_background_loop())
+    try:
+        return future.result(timeout)
+    except Exception:
+        future.cancel()
+        raise
@@ -9,6 +9,8 @@ NSE_HEADERS = {
 
 NSE_BASE_URL = "https://www.nseindia.com"
 NSE_API_URL = NSE_BASE_URL + "/api/quote-equity"
+# Live quotes of every constituent of an index in one response (?index=NIFTY%20500)
+NSE_INDEX_API_URL = NSE_BASE_URL + "/api/equity-stockIndices"
 NSE_CSV_URL = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
 
 # FYERS public symbol master files (contain ISIN mappings).
@@ -17,3 +19,15 @@ FYERS_NSE_CM_URL = "https://public.fyers.in/sym_details/NSE_CM.csv"
 FYERS_BSE_CM_URL = "https://public.fyers.in/sym_details/BSE_CM.csv"
 
 MFAPI_BASE_URL = "https://api.mfapi.in/mf"
+
+# AMFI daily NAV file covering every scheme (semicolon separated)
+AMFI_NAVALL_URL = "https://www.amfiindia.com/spages/NAVAll.txt"
+
+# Exchange end-of-day bhavcopies (UDiFF common format, one row per listed security); date as YYYYMMDD
+NSE_BHAVCOPY_URL = "https://nsearchives.nseindia.com/content/cm/BhavCopy_NSE_CM_0_0_0_{date}_F_0000.csv.zip"
+BSE_BHAVCOPY_URL = "https://www.bseindia.com/download/BhavCopy/Equity/BhavCopy_BSE_CM_0_0_0_{date}_F_0000.CSV"
+BSE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+    "Accept": "text/csv,*/*",
+    "Referer": "https://www.bseindia.com/"
+}
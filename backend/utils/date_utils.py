@@ -8,6 +8,12 @@ IST = pytz.timezone('Asia/Kolkata')
 MARKET_OPEN_TIME = time(9, 15)
 MARKET_CLOSE_TIME = time(15, 30)
 
+# AMFI NAV publish cycle (IST). Most schemes land in the evening window;
+# a few (FoFs, overseas) trickle in the next morning.
+NAV_PUBLISH_WINDOW_START = time(20, 0)
+NAV_MORNING_REFRESH_TIME = time(9, 0)
+NAV_PUBLISH_WINDOW_RECHECK = timedelta(minutes=15)
+
 # Simple static holiday list for 2024-2025 (Example - should be dynamic in prod)
 # Format: YYYY-MM-DD
 NSE_HOLIDAYS = {
@@ -78,6 +84,24 @@ def get_previous_business_day(ref_date=None):
         
         return check_date
 
+def get_next_nav_refresh_time(now=None):
+    """
+    Returns the IST datetime after which cached NAV history should be refetched.
+    Inside the evening publish window NAVs can land at any moment, so we recheck
+    every few minutes; otherwise the data cannot change before the next checkpoint.
+    """
+    if not now:
+        now = get_current_ist_time()
+    elif now.tzinfo is None:
+        now = IST.localize(now)
+
+    current_time = now.time()
+    if current_time >= NAV_PUBLISH_WINDOW_START:
+        return now + NAV_PUBLISH_WINDOW_RECHECK
+    if current_time < NAV_MORNING_REFRESH_TIME:
+        return now.replace(hour=NAV_MORNING_REFRESH_TIME.hour, minute=NAV_MORNING_REFRESH_TIME.minute, second=0, microsecond=0)
+    return now.replace(hour=NAV_PUBLISH_WINDOW_START.hour, minute=NAV_PUBLISH_WINDOW_START.minute, second=0, microsecond=0)
+
 def format_date_for_api(dt_obj):
     """Formats date as DD-MM-YYYY for MFAPI."""
     return dt_obj.strftime("%d-%m-%Y")
@@ -0,0 +1,124 @@
+"""
+NAV Series
+
+Parsed, date-indexed NAV history for one scheme. Dates are stored as sorted
+proleptic ordinals (date.toordinal()) alongside a float NAV array, so
+"on or before" / "on or after" lookups are a single binary search.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.date_utils import parse_date_from_str
+
+DateLike = Union[str, date, datetime, int]
+
+
+def _mfapi_date_ordinal(date_str: str) -> int:
+    """DD-MM-YYYY -> ordinal, without strptime."""
+    return date(int(date_str[6:10]), int(date_str[3:5]), int(date_str[0:2])).toordinal()
+
+
+def to_ordinal(value: DateLike) -> int:
+    """Converts a date, datetime, ordinal or date string (any supported format) to an ordinal."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return parse_date_from_str(value).date().toordinal()
+
+
+def format_ordinal(ordinal: int) -> str:
+    """Ordinal -> DD-MM-YYYY (mfapi format)."""
+    return date.fromordinal(int(ordinal)).strftime("%d-%m-%Y")
+
+
+class NavSeries:
+    """Ascending date-indexed NAV history built once per fetch."""
+
+    __slots__ = ("scheme_code", "meta", "ordinals", "navs")
+
+    def __init__(self, ordinals: np.ndarray, navs: np.ndarray, meta: Optional[Dict[str, Any]] = None, scheme_code=None):
+        self.ordinals = ordinals
+        self.navs = navs
+        self.meta = meta
+        self.scheme_code = scheme_code
+
+    @classmethod
+    def from_mfapi(cls, payload: Dict[str, Any], scheme_code=None) -> "NavSeries":
+        """Builds a series from an mfapi-shaped payload ({"meta": ..., "data": [{"date", "nav"}, ...]})."""
+        ordinals = []
+        navs = []
+        for row in payload.get("data") or []:
+            try:
+                ordinal = _mfapi_date_ordinal(row["date"])
+                nav = float(row["nav"])
+            except Exception:
+                continue
+            ordinals.append(ordinal)
+            navs.append(nav)
+
+        ord_arr = np.asarray(ordinals, dtype=np.int64)
+        nav_arr = np.asarray(navs, dtype=np.float64)
+        if len(ord_arr):
+            # mfapi is newest-first; sort ascending and drop duplicate dates (keep the first seen)
+            order = np.argsort(ord_arr, kind="stable")
+            ord_arr = ord_arr[order]
+            nav_arr = nav_arr[order]
+            ord_arr, first_idx = np.unique(ord_arr, return_index=True)
+            nav_arr = nav_arr[first_idx]
+        return cls(ord_arr, nav_arr, meta=payload.get("meta"), scheme_code=scheme_code)
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.ordinals.nbytes + self.navs.nbytes)
+
+    def _entry(self, idx: int) -> Tuple[float, str]:
+        return (float(self.navs[idx]), format_ordinal(self.ordinals[idx]))
+
+    def latest(self, limit: int = 1) -> List[Tuple[float, str]]:
+        """Newest `limit` entries as (nav, DD-MM-YYYY), newest first."""
+        if limit <= 0 or not len(self):
+            return []
+        return [self._entry(i) for i in range(len(self) - 1, max(len(self) - limit, 0) - 1, -1)]
+
+    def on_or_before(self, target: DateLike) -> Optional[Tuple[float, str]]:
+        """NAV on the target date, else the nearest previous NAV. None if target predates the series."""
+        idx = int(np.searchsorted(self.ordinals, to_ordinal(target), side="right")) - 1
+        if idx < 0:
+            return None
+        return self._entry(idx)
+
+    def on_or_after(self, target: DateLike) -> Optional[Tuple[float, str]]:
+        """NAV on the target date, else the nearest following NAV. None if target is after the last NAV."""
+        idx = int(np.searchsorted(self.ordinals, to_ordinal(target), side="left"))
+        if idx >= len(self):
+            return None
+        return self._entry(idx)
+
+    def lookup_many(self, targets: List[DateLike]) -> List[Dict[str, Optional[Tuple[float, str]]]]:
+        """
+        Resolves many dates in one vectorised pass.
+        Returns, per target (input order): {"on_or_before": (nav, date) | None, "on_or_after": (nav, date) | None}.
+        """
+        if not targets:
+            return []
+        target_ords = np.fromiter((to_ordinal(t) for t in targets), dtype=np.int64, count=len(targets))
+        n = len(self)
+        before_idx = np.searchsorted(self.ordinals, target_ords, side="right") - 1
+        after_idx = np.searchsorted(self.ordinals, target_ords, side="left")
+
+        results = []
+        for b, a in zip(before_idx.tolist(), after_idx.tolist()):
+            results.append({
+                "on_or_before": self._entry(b) if b >= 0 else None,
+                "on_or_after": self._entry(a) if a < n else None,
+            })
+        return results
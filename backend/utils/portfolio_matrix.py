@@ -0,0 +1,204 @@
+"""
+Portfolio Matrix
+
+Vectorised weighted-change computation. Every stock symbol gets a stable column
+in a process-wide SymbolUniverse; each fund's holdings are compiled once per
+holdings version into (column, weight) arrays with weights already normalised to
+fractions. Quotes become one universe-aligned vector with NaN for missing symbols,
+so the weighted change and covered weight of many funds is one matrix-vector
+product; a single fund is priced from a vector of just its own symbols.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_weights(values) -> np.ndarray:
+    """Holding weights as fractions: uploads store percentages (8.5 -> 0.085), fractions stay as-is."""
+    arr = np.asarray(values, dtype=np.float64)
+    return np.where(arr > 1, arr / 100.0, arr)
+
+
+def quote_symbol(stock: Mapping) -> Optional[str]:
+    """Symbol a holding is quoted under: its persisted FyersSymbol, else the plain Symbol."""
+    return stock.get("FyersSymbol") or stock.get("Symbol")
+
+
+def _is_valid_holding(stock: Mapping) -> bool:
+    return bool(stock.get("Symbol")) and (stock.get("Weight", 0) or 0) > 0
+
+
+def holdings_version(holdings: Iterable[Mapping]) -> str:
+    """Order-independent content hash of a fund's holdings (quote symbol + weight)."""
+    rows = sorted(
+        (str(quote_symbol(h)), float(h.get("Weight") or 0))
+        for h in holdings if quote_symbol(h)
+    )
+    return hashlib.sha1(json.dumps(rows).encode("utf-8")).hexdigest()[:16]
+
+
+class SymbolUniverse:
+    """Append-only symbol -> column index shared by every compiled fund."""
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def get(self, symbol: str) -> Optional[int]:
+        return self._index.get(symbol)
+
+    def index_of(self, symbol: str) -> int:
+        """Column of a symbol, assigning the next free column the first time it is seen."""
+        idx = self._index.get(symbol)
+        if idx is not None:
+            return idx
+        with self._lock:
+            idx = self._index.get(symbol)
+            if idx is None:
+                idx = len(self._symbols)
+                self._symbols.append(symbol)
+                self._index[symbol] = idx
+            return idx
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    def quote_vector(self, quotes: Mapping[str, Optional[float]], size: int = None) -> np.ndarray:
+        """Universe-aligned percent changes; NaN where a symbol has no quote."""
+        vec = np.full(size if size is not None else len(self), np.nan)
+        for symbol, pct in quotes.items():
+            idx = self._index.get(symbol)
+            if idx is not None and idx < len(vec) and pct is not None:
+                vec[idx] = pct
+        return vec
+
+
+class FundWeights:
+    """One fund's holdings compiled to universe columns and fractional weights."""
+
+    __slots__ = ("columns", "weights", "symbols")
+
+    def __init__(self, columns: np.ndarray, weights: np.ndarray, symbols: Tuple[str, ...] = ()):
+        self.columns = columns
+        self.weights = weights
+        self.symbols = symbols
+
+    @classmethod
+    def compile(cls, holdings: Iterable[Mapping], universe: SymbolUniverse) -> "FundWeights":
+        """
+        Compiles holdings (dicts with Symbol / Weight, optionally FyersSymbol) keyed by their
+        quote symbol; rows without a symbol or weight are skipped.
+        """
+        valid = [s for s in holdings if _is_valid_holding(s)]
+        symbols = tuple(quote_symbol(s) for s in valid)
+        columns = np.fromiter((universe.index_of(sym) for sym in symbols), dtype=np.int64, count=len(valid))
+        weights = normalize_weights([float(s["Weight"]) for s in valid]) if valid else np.zeros(0)
+        return cls(columns, weights, symbols)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def change(self, quote_vec: np.ndarray) -> Tuple[Optional[float], float, int]:
+        """
+        Weighted average percent change over the priced holdings.
+        Returns (change or None, covered_weight, holdings_priced).
+        """
+        if not len(self):
+            return None, 0.0, 0
+        return self._change(quote_vec[self.columns])
+
+    def change_from(self, quotes: Mapping[str, Optional[float]]) -> Tuple[Optional[float], float, int]:
+        """change() from a symbol -> pct mapping, reading only this fund's symbols."""
+        if not len(self):
+            return None, 0.0, 0
+        pcts = np.fromiter(
+            (np.nan if (pct := quotes.get(sym)) is None else pct for sym in self.symbols),
+            dtype=np.float64, count=len(self.symbols),
+        )
+        return self._change(pcts)
+
+    def _change(self, pcts: np.ndarray) -> Tuple[Optional[float], float, int]:
+        priced = ~np.isnan(pcts)
+        covered = float(self.weights[priced].sum())
+        if covered <= 0:
+            return None, covered, int(priced.sum())
+        change = float(np.dot(self.weights[priced], pcts[priced]) / covered)
+        return change, covered, int(priced.sum())
+
+
+class PortfolioMatrix:
+    """Dense funds x symbols weight matrix for revaluing many funds at once."""
+
+    def __init__(self, universe: SymbolUniverse, funds: Sequence[FundWeights]):
+        self.universe = universe
+        self.width = len(universe)
+        self.weights = np.zeros((len(funds), self.width))
+        self.held = np.zeros((len(funds), self.width))
+        for row, fund in enumerate(funds):
+            # add.at so a symbol listed twice in one fund counts twice, as the per-holding sum did
+            np.add.at(self.weights[row], fund.columns, fund.weights)
+            np.add.at(self.held[row], fund.columns, 1.0)
+
+    def weighted_changes(self, quote_vec: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns (changes, covered_weights, holdings_priced) per fund; changes are NaN
+        where no weight is covered.
+        """
+        quote_vec = quote_vec[:self.width]
+        priced = ~np.isnan(quote_vec)
+        q = np.where(priced, quote_vec, 0.0)
+        mask = priced.astype(np.float64)
+
+        covered = self.weights @ mask
+        products = self.weights @ q
+        counts = self.held @ mask
+        with np.errstate(invalid="ignore", divide="ignore"):
+            changes = np.where(covered > 0, products / covered, np.nan)
+        return changes, covered, counts.astype(np.int64)
+
+
+class FundWeightsCache:
+    """
+    Thread-safe (scheme_code, holdings_version) -> FundWeights, so a fund is compiled once
+    per holdings file rather than on every estimate. Least recently used entries beyond
+    max_entries are dropped.
+    """
+
+    def __init__(self, universe: SymbolUniverse, max_entries: int = 4096):
+        self.universe = universe
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], FundWeights]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scheme_code, holdings: Sequence[Mapping], version: str = None) -> FundWeights:
+        key = (str(scheme_code or ""), version or holdings_version(holdings))
+        with self._lock:
+            fund = self._entries.get(key)
+            if fund is not None:
+                self._entries.move_to_end(key)
+                return fund
+        fund = FundWeights.compile(holdings, self.universe)
+        with self._lock:
+            self._entries[key] = fund
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fund
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared universe: column indices stay stable for the life of the process
+symbol_universe = SymbolUniverse()
+compiled_funds = FundWeightsCache(symbol_universe)
@@ -0,0 +1,62 @@
+"""
+Rate Limiting
+
+Token bucket shared by threads and coroutines: callers take one token per
+upstream request; tokens refill at a fixed rate up to a burst capacity.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """Thread-safe token bucket with blocking (acquire_sync) and asyncio (acquire) waits."""
+
+    def __init__(self, rate: float, capacity: float = None, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Takes tokens if available and returns 0, else returns the seconds to wait before retrying."""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        """Waits (without blocking the event loop) until tokens are available."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """Blocks until tokens are available. Returns False if timeout passes first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -46,6 +46,48 @@ const PortfolioAnalyzer = ({ fundId, onClose }) => {
         }
     }, []);
 
+    // Live updates: server pushes changed fields (NAV estimate, P&L, coverage) as quotes move
+    const resultLoaded = result !== null;
+    React.useEffect(() => {
+        if (!resultLoaded || !localStorage.getItem("token") || typeof EventSource === 'undefined') return;
+
+        let source = null;
+        let retryTimer = null;
+        let closed = false;
+        // The first frame is a full snapshot, then only changed fields arrive as deltas
+        const mergeFund = (e) => {
+            const fields = JSON.parse(e.data).funds?.[fundId];
+            if (fields) {
+                setResult((prev) => (prev ? { ...prev, ...fields } : prev));
+            }
+        };
+        // The login token never goes in the URL: a short-lived stream token is fetched per connection
+        const connect = async () => {
+            try {
+                const { data } = await api.post('/portfolio/stream-token');
+                if (closed) return;
+                const params = new URLSearchParams({ token: data.token, fund_id: fundId });
+                source = new EventSource(`${api.defaults.baseURL}/portfolio/stream?${params}`);
+                source.addEventListener('snapshot', mergeFund);
+                source.addEventListener('delta', mergeFund);
+                source.onerror = () => {
+                    // An expired stream token stops the browser's own retries; reconnect with a fresh one
+                    if (source.readyState === EventSource.CLOSED && !closed) {
+                        retryTimer = setTimeout(connect, 5000);
+                    }
+                };
+            } catch (err) {
+                console.error('Live updates unavailable:', err);
+            }
+        };
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retryTimer);
+            if (source) source.close();
+        };
+    }, [resultLoaded, fundId]);
+
     const handleAnalyze = async (skipSipModal = false) => {
         setLoading(true);
         setError(null);